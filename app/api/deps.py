@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+from fastapi import Depends, HTTPException, Query, Request, Response
+
+import app.core.storage as storage
+from app.core.config import HTTP_CACHE_MAX_AGE
+from app.core.errors import DatasetNotFoundError
+from app.core.storage import DatasetState
+from app.utils.etag import make_etag, matching_etag
+from app.utils.filters import FILTER_PARAMS, ReportFilters, build_report_filters
+
+
+def dataset_headers(ds: DatasetState) -> dict[str, str]:
+    """Identifica nos headers qual dataset (e versão) respondeu a request."""
+    return {"X-Dataset-Id": ds.dataset_id, "X-Dataset-Version": str(ds.version)}
+
+
+def require_dataset(
+    response: Response,
+    dataset_id: str | None = Query(
+        default=None,
+        description="ID do dataset (retornado pelo /upload). Se não informado, usa o último upload.",
+        examples=["20260103T120000000000_1a2b3c4d"],
+    ),
+) -> DatasetState:
+    """
+    Dependência das rotas de relatório: resolve o dataset da request (400/404 se não houver).
+    O DatasetState retornado fica fixo durante toda a request, mesmo que um upload termine no meio.
+    """
+    try:
+        ds = storage.get_dataset(dataset_id)
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if ds is None:
+        raise HTTPException(status_code=400, detail="Nenhum dataset carregado. Faça upload em /upload.")
+
+    response.headers.update(dataset_headers(ds))
+    return ds
+
+
+def _values_query(label: str, example: str):
+    return Query(
+        default=None,
+        description=f"Filtra por {label}. Aceita vários valores (repetindo o parâmetro ou separados por vírgula).",
+        examples=[[example]],
+    )
+
+
+def report_filters(
+    start_date: str | None = Query(
+        default=None,
+        description="Data inicial (inclusiva) no formato YYYY-MM-DD",
+        examples=["2023-01-01"],
+    ),
+    end_date: str | None = Query(
+        default=None,
+        description="Data final (inclusiva) no formato YYYY-MM-DD",
+        examples=["2023-12-31"],
+    ),
+    estado: list[str] | None = _values_query("UF do cliente (ex: SP, RJ)", "SP"),
+    regiao: list[str] | None = _values_query("região (ex: sudeste)", "sudeste"),
+    canal_venda: list[str] | None = _values_query("canal de venda (ex: online)", "online"),
+    categoria: list[str] | None = _values_query("categoria do produto", "smartphones"),
+    marca: list[str] | None = _values_query("marca do produto", "apple"),
+    forma_pagamento: list[str] | None = _values_query("forma de pagamento", "pix"),
+    status_entrega: list[str] | None = _values_query("status da entrega", "entregue"),
+) -> ReportFilters:
+    """
+    Filtros comuns de todos os relatórios. Valores do mesmo campo combinam com OR
+    (ex: estado=SP&estado=RJ); campos diferentes combinam com AND.
+    """
+    raw = {
+        "estado": estado,
+        "regiao": regiao,
+        "canal_venda": canal_venda,
+        "categoria": categoria,
+        "marca": marca,
+        "forma_pagamento": forma_pagamento,
+        "status_entrega": status_entrega,
+    }
+    try:
+        return build_report_filters(start_date, end_date, raw)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=str(ve))
+
+
+def cache_headers(request: Request, etag: str, cache_control: str | None = None) -> dict[str, str]:
+    """
+    ETag + Cache-Control da resposta. Com dataset_id explícito o conteúdo não muda (cada upload
+    tem um dataset_id novo), então um proxy pode servir a cópia por HTTP_CACHE_MAX_AGE segundos;
+    sem dataset_id a resposta segue o último upload e precisa ser revalidada a cada uso.
+    """
+    if cache_control is None:
+        explicit = request.query_params.get("dataset_id")
+        cache_control = f"public, max-age={HTTP_CACHE_MAX_AGE}" if explicit and HTTP_CACHE_MAX_AGE > 0 else "public, no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def check_not_modified(request: Request, response: Response, headers: dict[str, str], extra: dict[str, str] | None = None) -> None:
+    """
+    Responde 304 (levantando HTTPException, antes de qualquer cálculo) se o If-None-Match
+    corresponder ao ETag; senão coloca os headers de cache na resposta da rota.
+    """
+    matched = matching_etag(request.headers.get("if-none-match"), headers["ETag"])
+    if matched is not None:
+        raise HTTPException(
+            status_code=304,
+            headers={**headers, "ETag": matched, "Vary": "Accept-Encoding", **(extra or {})},
+        )
+    response.headers.update(headers)
+
+
+def report_etag_parts(request: Request, ds: DatasetState, filters: ReportFilters) -> dict:
+    """Identidade da consulta: dataset + versão + rota + filtros normalizados + demais parâmetros."""
+    ignored = {"dataset_id", "start_date", "end_date", *FILTER_PARAMS}
+    params: dict[str, list[str]] = {}
+    for key, value in request.query_params.multi_items():
+        if key not in ignored:
+            params.setdefault(key, []).append(value)
+
+    return {
+        "dataset_id": ds.dataset_id,
+        "versao": ds.version,
+        "rota": request.url.path,
+        "filtros": filters.cache_params(),
+        "params": sorted(params.items()),
+    }
+
+
+def report_conditional(
+    request: Request,
+    response: Response,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+) -> dict[str, str]:
+    """
+    Dependência dos relatórios e do download: ETag forte (o corpo, e o arquivo baixado, são os
+    mesmos bytes para a mesma consulta e versão) e 304 para If-None-Match correspondente, sem
+    rodar o relatório.
+    """
+    headers = cache_headers(request, make_etag(report_etag_parts(request, ds, filters)))
+    check_not_modified(request, response, headers, dataset_headers(ds))
+    return headers
+
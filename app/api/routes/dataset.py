@@ -1,33 +1,126 @@
 from __future__ import annotations
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from loguru import logger
+
 import app.core.storage as storage
+from app.api.deps import cache_headers, check_not_modified, dataset_headers, report_filters, require_dataset
+from app.core.cache import cache_stats
+from app.core.storage import DatasetState
+from app.services.row_export import MEDIA_TYPES, ROW_EXPORT_FORMATS, export_rows
+from app.utils.etag import make_etag
+from app.utils.filters import ReportFilters
 
-from app.docs.examples import DATASET_STATUS_EXAMPLE_LOADED
+from app.core.errors import DatasetNotFoundError
+from app.docs.examples import DATASET_EXPORT_ERROR_EXAMPLE, DATASET_STATS_EXAMPLE, DATASET_STATUS_EXAMPLE_LOADED
 
 router = APIRouter(tags=["dataset"])
 
 
 @router.get(
     "/dataset/status",
-    summary="Status do dataset carregado",
-    description="Indica se existe dataset carregado em memória e retorna metadados (arquivo, colunas, linhas).",
+    summary="Status dos datasets carregados",
+    description=(
+        "Indica se existe dataset carregado e retorna metadados (arquivo, colunas, linhas) do dataset informado "
+        "em dataset_id (ou do último upload), com sua versão, e a lista de todos os datasets do registro. "
+        "O ETag só muda quando o registro muda (upload novo ou retenção); uso de memória e cache ficam em /dataset/stats."
+    ),
     responses={
         200: {"content": {"application/json": {"example": DATASET_STATUS_EXAMPLE_LOADED}}},
+        304: {"description": "Não modificado: o status é o mesmo do ETag enviado em If-None-Match."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
     },
 )
-def dataset_status():
-    if storage.CURRENT_DATASET is None:
-        return {
+def dataset_status(
+    request: Request,
+    response: Response,
+    dataset_id: str | None = Query(
+        default=None,
+        description="ID do dataset detalhado na resposta. Se não informado, usa o último upload.",
+    ),
+):
+    try:
+        # Metadados do registro: consultar o status não recarrega o dataset nem conta como acesso
+        info = storage.dataset_info(dataset_id)
+    except DatasetNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # ETag pela identidade do registro (dataset_id e versão de cada dataset) e pela consulta:
+    # enquanto não houver upload novo, quem faz polling recebe 304 sem montar o corpo
+    etag = make_etag({"registro": storage.registry_versions(), "dataset_id": dataset_id})
+    check_not_modified(request, response, cache_headers(request, etag, "no-cache"))
+
+    if info is None:
+        content = {
             "loaded": False,
             "message": "Nenhum dataset carregado. Faça upload em /upload.",
         }
+    else:
+        content = {
+            "loaded": True,
+            **info,
+            "datasets": storage.list_datasets(),
+        }
+    return content
+
+
+@router.get(
+    "/dataset/stats",
+    summary="Uso de memória e cache",
+    description=(
+        "Orçamento e uso de memória dos datasets (se cada um está carregado, quanto ocupa e o último acesso) "
+        "e as estatísticas do cache de relatórios. Muda a cada consulta, então não tem ETag nem é guardado em cache."
+    ),
+    responses={200: {"content": {"application/json": {"example": DATASET_STATS_EXAMPLE}}}},
+)
+def dataset_stats(response: Response):
+    response.headers["Cache-Control"] = "no-store"
+    return {"memoria": storage.memory_usage(), "cache": cache_stats()}
+
+
+@router.get(
+    "/dataset/export",
+    summary="Exportação das linhas filtradas (CSV/NDJSON/Parquet)",
+    description=(
+        "Exporta as transações do dataset que atendem os filtros, em streaming: as linhas são serializadas em "
+        "lotes de tamanho fixo, então a memória fica constante e o download começa na hora, mesmo com milhões "
+        "de linhas. O total de linhas vai no header X-Total-Count. Parquet exige o pacote pyarrow no servidor. "
+        "Filtros opcionais: start_date e end_date (YYYY-MM-DD), estado, regiao, canal_venda, categoria, marca, "
+        "forma_pagamento e status_entrega (mesmos dos relatórios)."
+    ),
+    responses={
+        200: {"description": "Arquivo em streaming (download)."},
+        400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
+        422: {"content": {"application/json": {"example": DATASET_EXPORT_ERROR_EXAMPLE}}},
+    },
+)
+def dataset_export(
+    format: str = Query(
+        default="csv",
+        description="Formato do arquivo",
+        enum=list(ROW_EXPORT_FORMATS),
+    ),
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+):
+    fmt = (format or "").strip().lower()
+
+    try:
+        total, chunks = export_rows(ds, filters, fmt)
+    except ValueError as e:
+        logger.error(f"Exportação de linhas falhou. formato={fmt} erro={str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
+
+    logger.info(f"Exportação de linhas iniciada. formato={fmt} linhas={total} dataset_id={ds.dataset_id}")
 
-    ds = storage.CURRENT_DATASET
-    return {
-        "loaded": True,
-        "arquivo_original": ds.filename,
-        "uploaded_at": ds.uploaded_at.isoformat(),
-        "linhas_processadas": int(len(ds.df)),
-        "colunas": list(ds.df.columns),
-    }
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f"attachment; filename=dataset.{fmt}",
+            "X-Total-Count": str(total),
+            **dataset_headers(ds),
+        },
+    )
@@ -1,21 +1,37 @@
 from __future__ import annotations
 
-import json
 from io import BytesIO
 
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from loguru import logger
-from datetime import date
-
-import app.core.storage as storage
+from typing import Any
 
-from app.services.calculations import calculate_sales_metrics, calculate_financial_metrics
-from app.services.product_analysis import product_analysis
-from app.services.demographics_region import regional_metrics, customer_profile_as_object
-from app.services.report_builder import build_report_dict
-from app.services.report_export import export_report_pdf_bytes, version_export_file
-from app.utils.filters import parse_yyyy_mm_dd, filter_by_date_range, filter_by_estado
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from app.api.deps import dataset_headers, report_conditional, report_filters, require_dataset
+from app.core.storage import DatasetState
+
+from app.services.report_builder import (
+    customers_section,
+    financial_section,
+    pivot_section,
+    products_section,
+    regional_section,
+    sales_section,
+    server_timing_header,
+    timeseries_section,
+)
+from app.core.responses import json_response
+from app.core.export_store import EXPORT_FORMATS, get_export, is_export_id, list_exports, store_export
+from app.core.jobs import get_job_status
+from app.services.report_export import MEDIA_TYPES, create_export_job, export_report
+from app.core.config import BATCH_MAX_QUERIES, PIVOT_MAX_GROUPS
+from app.services.batch import REPORT_PARAMS, run_batch
+from app.services.timeseries import GRANULARITIES, METRICS
+from app.utils.columnar import LAYOUTS, columns_to_records
+from app.utils.filters import FILTER_PARAMS, ReportFilters
+from app.utils.pagination import decode_cursor, encode_cursor, query_fingerprint
 
 from app.docs.examples import (
     SALES_SUMMARY_EXAMPLE,
@@ -23,91 +39,115 @@ from app.docs.examples import (
     PRODUCT_ANALYSIS_EXAMPLE,
     REGIONAL_PERFORMANCE_EXAMPLE,
     CUSTOMER_PROFILE_EXAMPLE,
+    TIMESERIES_EXAMPLE,
+    TIMESERIES_BREAKDOWN_EXAMPLE,
+    PIVOT_EXAMPLE,
+    BATCH_REQUEST_EXAMPLE,
+    BATCH_RESPONSE_EXAMPLE,
     DOWNLOAD_ERROR_EXAMPLE,
+    EXPORT_JOB_EXAMPLE,
+    EXPORT_STATUS_EXAMPLE,
+    EXPORT_LIST_EXAMPLE,
 )
 
 router = APIRouter(tags=["reports"])
 
+LAYOUT_QUERY = Query(
+    default="linhas",
+    description='Formato da resposta: "linhas" (lista/objeto por item) ou "colunas" ({"campo": [valores...]})',
+    enum=list(LAYOUTS),
+)
+
+COMPACT_QUERY = Query(
+    default=False,
+    description="Só para format=json: JSON compacto (sem indentação), menor e mais rápido de gerar",
+)
+
+FILTERS_DESCRIPTION = (
+    "Filtros opcionais (comuns a todos os relatórios): start_date e end_date (YYYY-MM-DD), estado, regiao, "
+    "canal_venda, categoria, marca, forma_pagamento e status_entrega. Valores do mesmo filtro combinam com OU "
+    "(ex: estado=SP&estado=RJ); filtros diferentes combinam com E."
+)
+
 
 @router.get(
     "/reports/sales-summary",
+    dependencies=[Depends(report_conditional)],
     summary="Resumo de vendas",
     description=(
         "Retorna métricas consolidadas de vendas: total de vendas, número de transações e média por transação. "
-        "Filtros opcionais: start_date e end_date (YYYY-MM-DD) para filtrar por período."
+        + FILTERS_DESCRIPTION
     ),
     responses={
         200: {"content": {"application/json": {"example": SALES_SUMMARY_EXAMPLE}}},
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
         400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
         422: {"description": "Parâmetros inválidos (ex: data fora do formato YYYY-MM-DD)."},
     },
 )
 def sales_summary(
-    start_date: str | None = Query(
-        default=None,
-        description="Data inicial (inclusiva) no formato YYYY-MM-DD",
-        examples=["2023-01-01"],
-    ),
-    end_date: str | None = Query(
-        default=None,
-        description="Data final (inclusiva) no formato YYYY-MM-DD",
-        examples=["2023-12-31"],
-    ),
+    response: Response,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
 ):
-    if storage.CURRENT_DATASET is None:
-        raise HTTPException(status_code=400, detail="Nenhum dataset carregado. Faça upload em /upload.")
-
-    df = storage.CURRENT_DATASET.df
-
-    # Parse das datas
     try:
-        s: date | None = parse_yyyy_mm_dd(start_date) if start_date else None
-        e: date | None = parse_yyyy_mm_dd(end_date) if end_date else None
-    except ValueError as ve:
-        raise HTTPException(status_code=422, detail=str(ve))
-
-    # Validação de intervalo
-    if s and e and s > e:
-        raise HTTPException(status_code=422, detail="Intervalo inválido: start_date não pode ser maior que end_date.")
-
-    # Filtra por data_venda (assumindo que seu parser já converteu para datetime)
-    filtered = filter_by_date_range(df, date_col="data_venda", start=s, end=e)
-
-    return calculate_sales_metrics(filtered)
+        return json_response(sales_section(ds, filters), response)
+    except ValueError as e:
+        logger.error(f"Sales summary falhou. erro={str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @router.get(
     "/reports/financial-metrics",
+    dependencies=[Depends(report_conditional)],
     summary="Métricas financeiras",
     description=(
         "Retorna receita líquida, lucro bruto e custo total estimado. "
-        "Obs: custo_total = receita_liquida - lucro_bruto (estimado via margem_lucro)."
+        "Obs: custo_total = receita_liquida - lucro_bruto (estimado via margem_lucro). "
+        + FILTERS_DESCRIPTION
     ),
     responses={
         200: {"content": {"application/json": {"example": FINANCIAL_METRICS_EXAMPLE}}},
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
         400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
+        422: {"description": "Parâmetros inválidos (ex: data fora do formato YYYY-MM-DD)."},
     },
 )
-def financial_metrics():
-    if storage.CURRENT_DATASET is None:
-        raise HTTPException(status_code=400, detail="Nenhum dataset carregado. Faça upload em /upload.")
-    return calculate_financial_metrics(storage.CURRENT_DATASET.df)
+def financial_metrics(
+    response: Response,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+):
+    try:
+        return json_response(financial_section(ds, filters), response)
+    except ValueError as e:
+        logger.error(f"Financial metrics falhou. erro={str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
 
 
 @router.get(
     "/reports/product-analysis",
+    dependencies=[Depends(report_conditional)],
     summary="Análise de produtos",
     description=(
         "Retorna uma lista de produtos com quantidade vendida e total arrecadado. "
-        "Permite ordenação via query params."
+        "Permite ordenação via query params. Com layout=colunas retorna {\"nome_produto\": [...], ...}. "
+        "Paginação: limit/offset ou cursor (header X-Next-Cursor da página anterior); o total de produtos "
+        "vai no header X-Total-Count. "
+        + FILTERS_DESCRIPTION
     ),
     responses={
         200: {"content": {"application/json": {"example": PRODUCT_ANALYSIS_EXAMPLE}}},
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
         400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
         422: {"description": "Arquivo inválido (ex: colunas ausentes)."},
     },
 )
 def report_product_analysis(
+    response: Response,
     sort_by: str = Query(
         default="total_arrecadado",
         description="Campo de ordenação",
@@ -118,61 +158,73 @@ def report_product_analysis(
         description="Direção da ordenação",
         enum=["asc", "desc"],
     ),
+    layout: str = LAYOUT_QUERY,
+    limit: int | None = Query(default=None, ge=1, description="Máximo de produtos na página (padrão: todos)"),
+    offset: int = Query(default=0, ge=0, description="Posição do primeiro produto da página"),
+    cursor: str | None = Query(default=None, description="Cursor da próxima página (header X-Next-Cursor)"),
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
 ):
-    if storage.CURRENT_DATASET is None:
-        raise HTTPException(status_code=400, detail="Nenhum dataset carregado. Faça upload em /upload.")
-
-    df = storage.CURRENT_DATASET.df
+    fingerprint = query_fingerprint({**filters.cache_params(), "sort_by": sort_by, "order": order})
+
+    if cursor:
+        try:
+            state = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if (state.get("dataset_id"), state.get("versao"), state.get("consulta")) != (ds.dataset_id, ds.version, fingerprint):
+            raise HTTPException(
+                status_code=400,
+                detail="Cursor inválido para esta consulta (dataset, versão, filtros ou ordenação mudaram). Recomece sem cursor.",
+            )
+        offset = state["offset"]
+        limit = limit or state.get("limit")
 
     try:
-        result = product_analysis(df, sort_by=sort_by, order=order)
-        logger.info(f"Product analysis gerado. sort_by={sort_by} order={order} itens={len(result)}")
-        return result
+        result, total = products_section(ds, filters, sort_by=sort_by, order=order, layout=layout, limit=limit, offset=offset)
     except ValueError as e:
         logger.error(f"Product analysis falhou. erro={str(e)}")
         raise HTTPException(status_code=422, detail=str(e))
 
+    response.headers["X-Total-Count"] = str(total)
+    if limit is not None and offset + limit < total:
+        response.headers["X-Next-Cursor"] = encode_cursor(
+            {"dataset_id": ds.dataset_id, "versao": ds.version, "consulta": fingerprint, "offset": offset + limit, "limit": limit}
+        )
+
+    itens = len(result["nome_produto"]) if layout == "colunas" else len(result)
+    logger.info(f"Product analysis gerado. sort_by={sort_by} order={order} layout={layout} offset={offset} itens={itens} total={total}")
+    return json_response(result, response)
+
 
 @router.get(
     "/reports/regional-performance",
+    dependencies=[Depends(report_conditional)],
     summary="Performance por região",
     description=(
         "Retorna um JSON com cada região como chave e suas métricas (vendas, transações e média) como valor. "
-        "Filtro opcional: estado=UF para filtrar apenas clientes de um estado (ex: SP)."
+        "Ex: estado=SP para considerar apenas clientes de um estado. Com layout=colunas retorna {\"regiao\": [...], ...}. "
+        + FILTERS_DESCRIPTION
     ),
     responses={
         200: {"content": {"application/json": {"example": REGIONAL_PERFORMANCE_EXAMPLE}}},
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
         400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
         422: {"description": "Arquivo inválido (ex: colunas ausentes)."},
     },
 )
 def regional_performance(
-    estado: str | None = Query(
-        default=None,
-        description="Filtra por UF do cliente (ex: SP, RJ). Se não informado, retorna completo.",
-        enum=["AC","AL","AP","AM","BA","CE","DF","ES","GO","MA","MT","MS","MG","PA","PB","PR","PE","PI","RJ","RN","RS","RO","RR","SC","SP","SE","TO"],
-    ),
+    response: Response,
+    layout: str = LAYOUT_QUERY,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
 ):
-    if storage.CURRENT_DATASET is None:
-        raise HTTPException(status_code=400, detail="Nenhum dataset carregado. Faça upload em /upload.")
-
-    df = storage.CURRENT_DATASET.df
-
     try:
-        filtered = filter_by_estado(df, estado)
-        metrics_list = regional_metrics(filtered)
-
-        result = {
-            item["regiao"]: {
-                "total_vendas": float(item["total_vendas"]),
-                "numero_transacoes": int(item["numero_transacoes"]),
-                "media_por_transacao": float(item["media_por_transacao"]),
-            }
-            for item in metrics_list
-        }
-
-        logger.info(f"Regional performance gerado. estado={estado or 'ALL'} regioes={len(result)}")
-        return result
+        result = regional_section(ds, filters, layout=layout)
+        regioes = len(result["regiao"]) if layout == "colunas" else len(result)
+        logger.info(f"Regional performance gerado. filtros={filters.to_dict() or 'ALL'} layout={layout} regioes={regioes}")
+        return json_response(result, response)
 
     except ValueError as e:
         logger.error(f"Regional performance falhou. erro={str(e)}")
@@ -181,36 +233,191 @@ def regional_performance(
 
 @router.get(
     "/reports/customer-profile",
+    dependencies=[Depends(report_conditional)],
     summary="Perfil de clientes",
-    description="Distribuições demográficas: gênero, faixa etária e cidade. Retorna contagem e percentual.",
+    description=(
+        "Distribuições demográficas: gênero, faixa etária e cidade. Retorna contagem e percentual. "
+        + FILTERS_DESCRIPTION
+    ),
     responses={
         200: {"content": {"application/json": {"example": CUSTOMER_PROFILE_EXAMPLE}}},
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
         400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
         422: {"description": "Arquivo inválido (ex: colunas ausentes)."},
     },
 )
-def customer_profile():
-    if storage.CURRENT_DATASET is None:
-        raise HTTPException(status_code=400, detail="Nenhum dataset carregado. Faça upload em /upload.")
-
-    df = storage.CURRENT_DATASET.df
-
+def customer_profile(
+    response: Response,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+):
     try:
-        profile = customer_profile_as_object(df)
+        profile = customers_section(ds, filters)
         logger.info("Customer profile gerado.")
-        return profile
+        return json_response(profile, response)
     except ValueError as e:
         logger.error(f"Customer profile falhou. erro={str(e)}")
         raise HTTPException(status_code=422, detail=str(e))
 
 
+@router.get(
+    "/reports/timeseries",
+    dependencies=[Depends(report_conditional)],
+    summary="Série temporal",
+    description=(
+        "Retorna a evolução de uma métrica (valor_final, quantidade ou lucro) por dia, semana (início na segunda), "
+        "mês ou trimestre, no formato colunar: periodos (início de cada período) e valores. Com dimension "
+        "(ex: regiao), retorna uma série por valor da dimensão em series. Sem start_date/end_date, cobre do "
+        "primeiro ao último dia com vendas; o primeiro e o último período são cortados no intervalo pedido. "
+        + FILTERS_DESCRIPTION
+    ),
+    responses={
+        200: {
+            "content": {
+                "application/json": {
+                    "examples": {
+                        "total": {"summary": "Sem dimensão", "value": TIMESERIES_EXAMPLE},
+                        "por_dimensao": {"summary": "Com dimension=regiao", "value": TIMESERIES_BREAKDOWN_EXAMPLE},
+                    }
+                }
+            }
+        },
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
+        400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
+        422: {"description": "Parâmetros inválidos (ex: granularidade, métrica ou dimensão desconhecida)."},
+    },
+)
+def report_timeseries(
+    response: Response,
+    granularity: str = Query(default="month", description="Tamanho do período", enum=list(GRANULARITIES)),
+    metric: str = Query(default="valor_final", description="Métrica somada em cada período", enum=list(METRICS)),
+    dimension: str | None = Query(
+        default=None,
+        description="Quebra opcional por dimensão (uma série por valor)",
+        enum=list(FILTER_PARAMS),
+    ),
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+):
+    try:
+        result = timeseries_section(
+            ds,
+            filters,
+            granularity=(granularity or "").strip().lower(),
+            metric=(metric or "").strip().lower(),
+            dimension=(dimension or "").strip().lower() or None,
+        )
+        logger.info(f"Timeseries gerado. granularity={granularity} metric={metric} dimension={dimension} periodos={len(result['periodos'])}")
+        return json_response(result, response)
+    except ValueError as e:
+        logger.error(f"Timeseries falhou. erro={str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _split_values(values: list[str] | None) -> list[str]:
+    """Aceita valores repetidos (?x=a&x=b) ou separados por vírgula (?x=a,b), mantendo a ordem."""
+    return [item.strip() for value in values or [] for item in value.split(",") if item.strip()]
+
+
+@router.get(
+    "/reports/pivot",
+    dependencies=[Depends(report_conditional)],
+    summary="Agrupamento genérico (pivot)",
+    description=(
+        "Agrupa as vendas por uma ou mais dimensões (colunas do dataset, ex: categoria, regiao, vendedor_id, "
+        "periodo_dia) e calcula as medidas pedidas: coluna:agregação com agregação sum, count, mean, min ou max "
+        "(ex: valor_final:sum, quantidade:mean), ou count para o número de transações. Os grupos vêm na ordem "
+        f"das dimensões; resultados com mais de {PIVOT_MAX_GROUPS} grupos são recusados (PIVOT_MAX_GROUPS). "
+        + FILTERS_DESCRIPTION
+    ),
+    responses={
+        200: {"content": {"application/json": {"example": PIVOT_EXAMPLE}}},
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
+        400: {"description": "Nenhum dataset carregado. Faça upload em /upload."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
+        422: {"description": "Dimensão/medida inválida ou resultado acima do limite de grupos."},
+    },
+)
+def report_pivot(
+    response: Response,
+    dimensions: list[str] = Query(..., description="Dimensões do agrupamento, na ordem (ex: categoria&dimensions=regiao)"),
+    measures: list[str] = Query(
+        default=["valor_final:sum", "count"],
+        description="Medidas: coluna:agregação (sum, count, mean, min, max) ou count",
+    ),
+    layout: str = LAYOUT_QUERY,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+):
+    try:
+        columns = pivot_section(ds, filters, _split_values(dimensions), _split_values(measures))
+    except ValueError as e:
+        logger.error(f"Pivot falhou. erro={str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
+
+    grupos = len(next(iter(columns.values()), []))
+    logger.info(f"Pivot gerado. dimensions={dimensions} measures={measures} grupos={grupos}")
+    return json_response(columns if layout == "colunas" else columns_to_records(columns), response)
+
+
+class BatchQueryBody(BaseModel):
+    id: str | None = Field(default=None, description="Identificador livre, devolvido no resultado")
+    report: str = Field(description=f"Relatório: {', '.join(REPORT_PARAMS)}")
+    params: dict[str, Any] = Field(default_factory=dict, description="Mesmos query params do endpoint GET (inclui filtros)")
+
+
+class BatchBody(BaseModel):
+    queries: list[BatchQueryBody]
+
+
+@router.post(
+    "/reports/batch",
+    summary="Várias consultas em uma request",
+    description=(
+        "Executa uma lista de consultas dos relatórios acima sobre o mesmo dataset e devolve todos os resultados, "
+        "na ordem recebida. Consultas repetidas são calculadas uma vez; seções com os mesmos filtros "
+        "(sales-summary, financial-metrics, regional-performance, customer-profile) saem de uma única passada. "
+        f"Erros de uma consulta ficam no resultado dela (status 422). Máximo de {BATCH_MAX_QUERIES} consultas."
+    ),
+    responses={
+        200: {"content": {"application/json": {"example": BATCH_RESPONSE_EXAMPLE}}},
+        400: {"description": "Nenhum dataset carregado ou lote vazio/grande demais."},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
+    },
+)
+def report_batch(
+    response: Response,
+    body: BatchBody = Body(..., openapi_examples={"dashboard": {"summary": "Painel", "value": BATCH_REQUEST_EXAMPLE}}),
+    ds: DatasetState = Depends(require_dataset),
+):
+    if not body.queries:
+        raise HTTPException(status_code=400, detail="Lote vazio. Informe ao menos uma consulta em queries.")
+    if len(body.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"Lote com {len(body.queries)} consultas excede o limite de {BATCH_MAX_QUERIES}.")
+
+    resultados = run_batch(ds, [(q.id, q.report, q.params) for q in body.queries])
+    return json_response({"dataset_id": ds.dataset_id, "versao": ds.version, "resultados": resultados}, response)
+
+
 @router.get(
     "/reports/download",
     summary="Download de relatório (JSON/PDF)",
-    description="Gera e retorna um arquivo report.json ou report.pdf para download. O PDF inclui tabela e gráfico.",
+    description=(
+        "Gera e retorna um arquivo report.json ou report.pdf para download. O PDF inclui tabela e gráfico; "
+        "é renderizado num pool de processos e fica em cache por dataset, versão e filtros. "
+        "Para relatórios grandes, use o modo assíncrono em POST /reports/exports. "
+        "O arquivo traz o relatório sem generated_at e tempos_ms (mesma versão e filtros, mesmos bytes); "
+        "o tempo de cada etapa vai no header Server-Timing. "
+        + FILTERS_DESCRIPTION
+    ),
     responses={
         200: {"description": "Arquivo gerado com sucesso (download)."},
+        304: {"description": "Não modificado: o If-None-Match corresponde ao ETag (dataset, versão e consulta)."},
         400: {"content": {"application/json": {"example": DOWNLOAD_ERROR_EXAMPLE}}},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
+        422: {"description": "Parâmetros inválidos (ex: data fora do formato YYYY-MM-DD)."},
     },
 )
 def download_report(
@@ -218,30 +425,148 @@ def download_report(
         default="json",
         description="Formato do arquivo para download",
         enum=["json", "pdf"],
-    )
+    ),
+    compact: bool = COMPACT_QUERY,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+    cache: dict[str, str] = Depends(report_conditional),
 ):
     fmt = (format or "").strip().lower()
 
     if fmt not in ["json", "pdf"]:
         raise HTTPException(status_code=400, detail="Formato inválido. Use format=json ou format=pdf.")
 
-    if fmt == "json":
-        report_dict = build_report_dict()
-        content = json.dumps(report_dict, ensure_ascii=False, indent=2).encode("utf-8")
+    try:
+        content, timings = export_report(ds, filters, fmt, compact=compact)
+    except ValueError as e:
+        logger.error(f"Download de relatório falhou. formato={fmt} erro={str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
 
-        version_export_file(content, "json")
+    # Gravação no armazenamento de exportações fora da request; arquivo repetido não é regravado
+    export_id = store_export(content, fmt, ds.dataset_id, ds.version, filters.to_dict(), compact=compact)
+    headers = {"X-Export-Id": export_id} if export_id else {}
+
+    return StreamingResponse(
+        BytesIO(content),
+        media_type=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f"attachment; filename=report.{fmt}",
+            **headers,
+            **cache,
+            **dataset_headers(ds),
+            **server_timing_header(timings),
+        },
+    )
+
+
+@router.post(
+    "/reports/exports",
+    status_code=202,
+    summary="Exportação assíncrona de relatório (JSON/PDF)",
+    description=(
+        "Agenda a geração do report.json ou report.pdf em background e retorna imediatamente um job_id. "
+        "Acompanhe e baixe o arquivo em GET /reports/exports/{job_id}. "
+        + FILTERS_DESCRIPTION
+    ),
+    responses={
+        202: {"content": {"application/json": {"example": EXPORT_JOB_EXAMPLE}}},
+        400: {"content": {"application/json": {"example": DOWNLOAD_ERROR_EXAMPLE}}},
+        404: {"description": "Dataset não encontrado (dataset_id inválido)."},
+        422: {"description": "Parâmetros inválidos (ex: data fora do formato YYYY-MM-DD)."},
+    },
+)
+def create_report_export(
+    format: str = Query(
+        default="pdf",
+        description="Formato do arquivo",
+        enum=list(EXPORT_FORMATS),
+    ),
+    compact: bool = COMPACT_QUERY,
+    filters: ReportFilters = Depends(report_filters),
+    ds: DatasetState = Depends(require_dataset),
+):
+    fmt = (format or "").strip().lower()
+
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Formato inválido. Use format=json ou format=pdf.")
+
+    try:
+        job = create_export_job(ds, filters, fmt, compact=compact)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"Exportação agendada. formato={fmt} job={job.id} dataset_id={ds.dataset_id}")
+
+    return {
+        "status": job.status,
+        "job_id": job.id,
+        "dataset_id": ds.dataset_id,
+        "formato": fmt,
+        "acompanhar_em": f"/reports/exports/{job.id}",
+    }
+
+
+@router.get(
+    "/reports/exports",
+    summary="Exportações guardadas",
+    description=(
+        "Lista os arquivos exportados (downloads e exportações assíncronas) guardados no armazenamento de "
+        "exportações, mais recentes primeiro. Cada arquivo é identificado pelo hash do dataset, versão, formato e "
+        "filtros (export_id); exportações do mesmo relatório são guardadas uma vez."
+    ),
+    responses={200: {"content": {"application/json": {"example": EXPORT_LIST_EXAMPLE}}}},
+)
+def report_exports(
+    dataset_id: str | None = Query(default=None, description="Lista só as exportações deste dataset"),
+):
+    exports = list_exports(dataset_id)
+    return {"total": len(exports), "exports": exports}
+
+
+@router.get(
+    "/reports/exports/{export_id}",
+    summary="Status/download de exportação",
+    description=(
+        "Aceita o export_id de um arquivo guardado (retorna o arquivo) ou o job_id de uma exportação assíncrona. "
+        "Enquanto o job está pendente ou processando, retorna 202 com o status. Quando termina com sucesso, "
+        "retorna o arquivo para download; se o job falhou, retorna 422 com o status e o erro."
+    ),
+    responses={
+        200: {"description": "Arquivo gerado (download)."},
+        202: {"content": {"application/json": {"example": EXPORT_STATUS_EXAMPLE}}},
+        404: {"description": "Exportação não encontrada."},
+        410: {"description": "Arquivo da exportação não está mais disponível; gere novamente."},
+        422: {"description": "A exportação falhou (erro no status)."},
+    },
+)
+def get_report_export(export_id: str):
+    if is_export_id(export_id):
+        return _export_file_response(export_id)
+
+    status = get_job_status(export_id)
+    # Jobs de upload e de exportação compartilham o registro; exportações têm arquivo report.json/report.pdf
+    if status is None or status.get("arquivo_original") not in {f"report.{fmt}" for fmt in EXPORT_FORMATS}:
+        raise HTTPException(status_code=404, detail="Exportação não encontrada.")
+
+    if status["status"] == "erro":
+        return JSONResponse(status_code=422, content=status)
+    if status["status"] != "sucesso":
+        return JSONResponse(status_code=202, content=status)
+
+    # O arquivo pode ter saído pela retenção do armazenamento depois que o job terminou
+    return _export_file_response(
+        (status.get("resultado") or {}).get("export_id") or "",
+        missing=(410, "Arquivo da exportação não está mais disponível. Gere novamente."),
+    )
 
-        return StreamingResponse(
-            BytesIO(content),
-            media_type="application/json",
-            headers={"Content-Disposition": "attachment; filename=report.json"},
-        )
 
-    pdf_bytes = export_report_pdf_bytes()
-    version_export_file(pdf_bytes, "pdf")
+def _export_file_response(export_id: str, missing: tuple[int, str] = (404, "Exportação não encontrada.")) -> StreamingResponse:
+    export = get_export(export_id)
+    if export is None:
+        raise HTTPException(status_code=missing[0], detail=missing[1])
 
+    fmt, content = export
     return StreamingResponse(
-        BytesIO(pdf_bytes),
-        media_type="application/pdf",
-        headers={"Content-Disposition": "attachment; filename=report.pdf"},
+        BytesIO(content),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f"attachment; filename=report.{fmt}", "X-Export-Id": export_id},
     )
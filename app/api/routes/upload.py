@@ -1,36 +1,66 @@
 from __future__ import annotations
 
+import os
+from typing import BinaryIO
+
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from loguru import logger
 
 import app.core.storage as storage
-from app.services.parser import parse_upload_to_dataframe
+from app.core.jobs import Job, create_job, get_job_status, submit_job
+from app.services.parser import check_upload_format, parse_stream_to_dataframe
 from app.core.errors import DataValidationError
+from app.docs.examples import UPLOAD_ACCEPTED_EXAMPLE, UPLOAD_JOB_EXAMPLE
 
 router = APIRouter(tags=["upload"])
 
 
+def _process_upload(job: Job, stream: BinaryIO, dataset_id: str) -> dict:
+    """
+    Executa o parse do upload no pool de workers e só publica o dataset no final.
+    """
+    try:
+        df = parse_stream_to_dataframe(stream, job.filename, progress=job.update)
+
+        job.update("indexing", len(df))
+        ds = storage.publish_dataset(df=df, filename=job.filename, dataset_id=dataset_id)
+
+        logger.info(
+            f"Upload bem-sucedido. arquivo={job.filename} linhas_processadas={len(df)} job={job.id} dataset_id={dataset_id}"
+        )
+
+        return {
+            "status": "sucesso",
+            "dataset_id": dataset_id,
+            "versao": ds.version,
+            "linhas_processadas": int(len(df)),
+            "arquivo_original": job.filename,
+        }
+
+    except DataValidationError as e:
+        logger.error(f"Erro de validação no upload. arquivo={job.filename} job={job.id} erro={str(e)}")
+        raise
+    except Exception as e:
+        logger.error(f"Erro inesperado no upload. arquivo={job.filename} job={job.id} erro={str(e)}")
+        raise RuntimeError("Erro interno ao processar o arquivo.") from e
+    finally:
+        stream.close()
+
+
 @router.post(
     "/upload",
+    status_code=202,
     summary="Upload do dataset",
     description=(
-        "Recebe um arquivo CSV ou XLSX (multipart/form-data), valida e carrega em memória "
-        "para uso pelos endpoints de relatórios."
+        "Recebe um arquivo CSV ou XLSX (multipart/form-data) e agenda o processamento em background. "
+        "Retorna imediatamente um job_id; acompanhe o progresso em /upload/jobs/{job_id}. "
+        "O dataset só fica disponível quando o job termina com sucesso. O dataset_id retornado identifica "
+        "este upload nos relatórios (parâmetro dataset_id); sem ele, os relatórios usam o último upload."
     ),
     responses={
-        200: {
-            "content": {
-                "application/json": {
-                    "example": {
-                        "status": "sucesso",
-                        "linhas_processadas": 10000,
-                        "arquivo_original": "vendas_ficticias_10000_linhas.csv",
-                    }
-                }
-            }
-        },
+        202: {"content": {"application/json": {"example": UPLOAD_ACCEPTED_EXAMPLE}}},
         400: {"description": "Nenhum arquivo enviado."},
-        422: {"description": "Arquivo inválido (ex: colunas faltando, tipos inválidos)."},
+        422: {"description": "Formato de arquivo inválido (envie .csv ou .xlsx)."},
     },
 )
 async def upload_file(file: UploadFile = File(None)):
@@ -38,21 +68,46 @@ async def upload_file(file: UploadFile = File(None)):
         raise HTTPException(status_code=400, detail="Nenhum arquivo enviado.")
 
     try:
-        df = await parse_upload_to_dataframe(file)
-        storage.set_dataset(df=df, filename=file.filename)
-
-        logger.info(f"Upload bem-sucedido. arquivo={file.filename} linhas_processadas={len(df)}")
-
-        return {
-            "status": "sucesso",
-            "linhas_processadas": int(len(df)),
-            "arquivo_original": file.filename,
-        }
-
+        check_upload_format(file.filename)
     except DataValidationError as e:
         logger.error(f"Erro de validação no upload. arquivo={file.filename} erro={str(e)}")
         raise HTTPException(status_code=422, detail=str(e))
-    except Exception as e:
-        logger.error(f"Erro inesperado no upload. arquivo={file.filename} erro={str(e)}")
-        raise HTTPException(status_code=500, detail="Erro interno ao processar o arquivo.")
 
+    # O FastAPI fecha o UploadFile ao fim da request; duplicamos o descritor para que o job
+    # continue lendo o mesmo arquivo temporário sem copiar o conteúdo.
+    stream = os.fdopen(os.dup(file.file.fileno()), "rb")
+
+    # O ID do dataset é definido já no recebimento para o cliente poder guardá-lo
+    dataset_id = storage.new_dataset_id()
+
+    job = create_job(file.filename)
+    submit_job(job, lambda j: _process_upload(j, stream, dataset_id))
+
+    logger.info(f"Upload recebido. arquivo={file.filename} job={job.id} dataset_id={dataset_id}")
+
+    return {
+        "status": job.status,
+        "job_id": job.id,
+        "dataset_id": dataset_id,
+        "arquivo_original": file.filename,
+        "acompanhar_em": f"/upload/jobs/{job.id}",
+    }
+
+
+@router.get(
+    "/upload/jobs/{job_id}",
+    summary="Status do processamento de upload",
+    description=(
+        "Retorna o andamento de um job de upload: status, etapa atual (reading, coercing, normalizing, indexing), "
+        "linhas processadas e vazão (linhas por segundo)."
+    ),
+    responses={
+        200: {"content": {"application/json": {"example": UPLOAD_JOB_EXAMPLE}}},
+        404: {"description": "Job não encontrado."},
+    },
+)
+def upload_job_status(job_id: str):
+    status = get_job_status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return status
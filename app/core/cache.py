@@ -0,0 +1,173 @@
+"""
+Cache de resultados dos relatórios.
+
+A chave é a identidade do dataset (dataset_id + versão) + o nome do relatório + os parâmetros
+normalizados (datas em ISO, textos em minúsculas e sem espaços). Como a versão faz parte da
+chave, um resultado nunca é servido para outro conteúdo; mesmo assim o cache é esvaziado a
+cada upload para liberar a memória dos resultados antigos.
+
+Limites: RESULT_CACHE_MAX_ENTRIES entradas e RESULT_CACHE_MAX_MB (tamanho estimado do resultado,
+ver _result_nbytes), com descarte LRU; entradas mais antigas que RESULT_CACHE_TTL_SECONDS
+são recalculadas.
+Os resultados são compartilhados entre requests: quem os recebe não deve alterá-los.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from app.core.config import RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_MB, RESULT_CACHE_TTL_SECONDS
+
+if TYPE_CHECKING:
+    from app.core.storage import DatasetState
+
+
+T = TypeVar("T")
+
+
+@dataclass
+class _CacheEntry:
+    value: Any
+    nbytes: int
+    created_at: float
+
+
+_ENTRIES: OrderedDict[tuple, _CacheEntry] = OrderedDict()
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+_BYTES = 0
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def _make_key(ds: DatasetState, name: str, params: dict | None) -> tuple:
+    normalized = tuple(sorted((k, _normalize(v)) for k, v in (params or {}).items()))
+    return (ds.dataset_id, ds.version, name, normalized)
+
+
+# Listas longas (colunas dos resultados colunares) são estimadas por uma amostra
+_SAMPLE_ITEMS = 32
+_SCALAR_NBYTES = 8
+
+
+def _result_nbytes(value: Any) -> int:
+    """
+    Estimativa barata do tamanho do resultado, sem serializar: bytes pelo tamanho, arrays
+    numpy e frames pandas pelo nbytes, textos pelo comprimento, escalares com tamanho fixo;
+    listas grandes pela média de uma amostra de itens vezes o comprimento.
+    """
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sum(_result_nbytes(k) + _result_nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        if len(value) <= _SAMPLE_ITEMS:
+            return sum(_result_nbytes(item) for item in value)
+        step = len(value) // _SAMPLE_ITEMS
+        sample = value[::step][:_SAMPLE_ITEMS]
+        return sum(_result_nbytes(item) for item in sample) * len(value) // len(sample)
+    return _SCALAR_NBYTES
+
+
+def _drop(key: tuple) -> None:
+    global _BYTES
+    entry = _ENTRIES.pop(key)
+    _BYTES -= entry.nbytes
+
+
+def cached(ds: DatasetState, name: str, params: dict | None, compute: Callable[[], T]) -> T:
+    """
+    Retorna o resultado em cache para (dataset, name, params) ou calcula com compute() e guarda.
+    Exceções de compute() não são guardadas.
+    """
+    global _BYTES
+
+    if RESULT_CACHE_MAX_ENTRIES <= 0:
+        return compute()
+
+    key = _make_key(ds, name, params)
+    now = time.monotonic()
+
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is not None and RESULT_CACHE_TTL_SECONDS > 0 and now - entry.created_at > RESULT_CACHE_TTL_SECONDS:
+            _drop(key)
+            _STATS["expired"] += 1
+            entry = None
+
+        if entry is not None:
+            _ENTRIES.move_to_end(key)
+            _STATS["hits"] += 1
+            return entry.value
+
+        _STATS["misses"] += 1
+
+    value = compute()
+    nbytes = _result_nbytes(value)
+    max_bytes = RESULT_CACHE_MAX_MB * 1024 * 1024
+
+    # Resultado maior que o cache inteiro: devolve sem guardar
+    if nbytes > max_bytes:
+        return value
+
+    with _LOCK:
+        if key in _ENTRIES:
+            _drop(key)
+        _ENTRIES[key] = _CacheEntry(value=value, nbytes=nbytes, created_at=now)
+        _BYTES += nbytes
+
+        while len(_ENTRIES) > RESULT_CACHE_MAX_ENTRIES or _BYTES > max_bytes:
+            _drop(next(iter(_ENTRIES)))
+            _STATS["evictions"] += 1
+
+    return value
+
+
+def invalidate(reason: str = "") -> None:
+    """Esvazia o cache (chamado a cada upload publicado)."""
+    global _BYTES
+
+    with _LOCK:
+        if not _ENTRIES:
+            return
+        count = len(_ENTRIES)
+        _ENTRIES.clear()
+        _BYTES = 0
+        _STATS["invalidations"] += 1
+
+    logger.info(f"Cache de relatórios invalidado. entradas={count} motivo={reason or '-'}")
+
+
+def cache_stats() -> dict:
+    with _LOCK:
+        lookups = _STATS["hits"] + _STATS["misses"]
+        return {
+            **_STATS,
+            "hit_rate": round(_STATS["hits"] / lookups, 4) if lookups else 0.0,
+            "entradas": len(_ENTRIES),
+            "max_entradas": RESULT_CACHE_MAX_ENTRIES,
+            "tamanho_mb": round(_BYTES / (1024 * 1024), 3),
+            "max_mb": RESULT_CACHE_MAX_MB,
+            "ttl_segundos": RESULT_CACHE_TTL_SECONDS or None,
+        }
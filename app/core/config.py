@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+
+# Configurações lidas das variáveis de ambiente (ver .env.example)
+
+APP_ENV = os.getenv("APP_ENV", "development")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+
+# Quantidade de threads que processam uploads em background
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "2"))
+
+# Processos usados no parse de CSV grandes (1 = leitura em streaming no processo atual)
+PARSE_WORKERS = max(1, int(os.getenv("PARSE_WORKERS", "1")))
+
+# Snapshots colunares dos datasets (restaurados no startup). Vazio desativa.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "snapshots")
+# Quantidade máxima de datasets mantidos (registro + snapshots em disco); os uploads mais antigos saem
+SNAPSHOT_KEEP = max(1, int(os.getenv("SNAPSHOT_KEEP", "10")))
+
+# Memória total (MB) para datasets carregados; acima disso os menos consultados são
+# descarregados e recarregados do snapshot sob demanda. 0 = sem limite.
+DATASET_MEMORY_BUDGET_MB = max(0, int(os.getenv("DATASET_MEMORY_BUDGET_MB", "0")))
+
+# Onde o dataset carregado fica: "memory" (por processo) ou "shared" (snapshot em SNAPSHOT_DIR
+# mapeado por todos os workers do uvicorn/gunicorn)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "memory").strip().lower()
+
+# Cache de resultados dos relatórios: limite de entradas (0 desativa), de tamanho (MB) e
+# tempo de vida em segundos (0 = sem expiração; o cache também é esvaziado a cada upload)
+RESULT_CACHE_MAX_ENTRIES = max(0, int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256")))
+RESULT_CACHE_MAX_MB = max(1, int(os.getenv("RESULT_CACHE_MAX_MB", "64")))
+RESULT_CACHE_TTL_SECONDS = max(0, int(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")))
+
+# /reports/pivot: máximo de grupos na resposta e quantos agrupamentos (ids de grupo por
+# combinação de dimensões) ficam em memória para reuso
+PIVOT_MAX_GROUPS = max(1, int(os.getenv("PIVOT_MAX_GROUPS", "10000")))
+PIVOT_GROUP_CACHE_ENTRIES = max(0, int(os.getenv("PIVOT_GROUP_CACHE_ENTRIES", "16")))
+
+# Processos que renderizam o PDF do relatório (0 = renderiza na própria thread da request)
+PDF_WORKERS = max(0, int(os.getenv("PDF_WORKERS", "1")))
+
+# Armazenamento de exportações em EXPORT_DIR (vazio desativa): máximo de arquivos, idade
+# máxima em dias e tamanho total em MB (0 = sem limite)
+EXPORT_KEEP = max(0, int(os.getenv("EXPORT_KEEP", "100")))
+EXPORT_MAX_AGE_DAYS = max(0, int(os.getenv("EXPORT_MAX_AGE_DAYS", "7")))
+EXPORT_MAX_MB = max(0, int(os.getenv("EXPORT_MAX_MB", "512")))
+
+# /dataset/export: linhas serializadas por lote (memória constante qualquer que seja o resultado)
+EXPORT_BATCH_ROWS = max(1, int(os.getenv("EXPORT_BATCH_ROWS", "10000")))
+
+# Serializador JSON das respostas: "auto" (orjson se instalado), "orjson" ou "json" (biblioteca padrão)
+JSON_RENDERER = os.getenv("JSON_RENDERER", "auto").strip().lower()
+# Respostas de texto a partir deste tamanho (bytes) saem comprimidas (zstd/gzip) conforme o
+# Accept-Encoding do cliente. 0 desativa.
+COMPRESSION_MIN_BYTES = max(0, int(os.getenv("COMPRESSION_MIN_BYTES", "1024")))
+
+# Cache-Control dos relatórios consultados com dataset_id explícito: segundos que um proxy
+# pode servir a cópia sem revalidar (0 = sempre revalida via ETag)
+HTTP_CACHE_MAX_AGE = max(0, int(os.getenv("HTTP_CACHE_MAX_AGE", "60")))
+
+# POST /reports/batch: máximo de consultas por lote
+BATCH_MAX_QUERIES = max(1, int(os.getenv("BATCH_MAX_QUERIES", "50")))
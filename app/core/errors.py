@@ -2,3 +2,8 @@ class DataValidationError(Exception):
     """Erro levantado quando o arquivo não atende o formato esperado."""
     pass
 
+
+
+class DatasetNotFoundError(Exception):
+    """Erro levantado quando o dataset_id informado não existe no registro."""
+    pass
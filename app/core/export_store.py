@@ -0,0 +1,315 @@
+"""
+Armazenamento dos arquivos exportados (report.json / report.pdf).
+
+O export_id é o SHA-256 da identidade do relatório exportado (dataset_id, versão, formato,
+filtros normalizados e compact) e o arquivo fica em EXPORT_DIR/<export_id>.<formato>.
+Exportar de novo o mesmo relatório da mesma versão dá o mesmo export_id e não grava nada (só
+atualiza o último acesso). A gravação roda numa thread própria, fora da request; o export_id
+já sai calculado.
+
+Um índice (EXPORT_DIR/index.json, reescrito de forma atômica) guarda os metadados de cada
+arquivo para listagem e busca. Vários workers usam o mesmo diretório: toda leitura e escrita
+do índice relê o arquivo sob um lock entre processos (flock), então as entradas gravadas por
+um worker não se perdem na escrita de outro. Retenção, aplicada a cada gravação sobre o
+índice de todos os workers: arquivos mais antigos que EXPORT_MAX_AGE_DAYS saem; depois, os
+menos acessados saem até caber em EXPORT_KEEP arquivos e EXPORT_MAX_MB. EXPORT_DIR vazio
+desativa o armazenamento.
+
+Downloads (get_export) só leem o arquivo: o último acesso fica pendente em memória e a thread
+do armazenamento grava os acessos acumulados no índice numa única escrita (ou junto da próxima
+gravação), sem o flock nem a reescrita do índice dentro da request.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+from app.core.config import EXPORT_DIR, EXPORT_KEEP, EXPORT_MAX_AGE_DAYS, EXPORT_MAX_MB
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+INDEX_NAME = "index.json"
+LOCK_NAME = ".index.lock"
+EXPORT_FORMATS = ("json", "pdf")
+
+
+@dataclass
+class ExportEntry:
+    export_id: str
+    formato: str
+    dataset_id: str
+    versao: int
+    filtros: dict
+    tamanho_bytes: int
+    created_at: float
+    accessed_at: float
+
+    def to_dict(self) -> dict:
+        out = asdict(self)
+        out["created_at"] = _isoformat(self.created_at)
+        out["accessed_at"] = _isoformat(self.accessed_at)
+        out["download_em"] = f"/reports/exports/{self.export_id}"
+        return out
+
+
+_LOCK = threading.Lock()
+_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export-store")
+
+# Últimos acessos ainda não gravados no índice (export_id -> timestamp)
+_ACCESS_LOCK = threading.Lock()
+_PENDING_ACCESS: dict[str, float] = {}
+
+
+def _isoformat(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+def _dir() -> Path:
+    return Path(EXPORT_DIR)
+
+
+def _file_path(export_id: str, fmt: str) -> Path:
+    return _dir() / f"{export_id}.{fmt}"
+
+
+def is_export_id(value: str) -> bool:
+    return len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+
+def export_id_for(dataset_id: str, version: int, fmt: str, filtros: dict, compact: bool = False) -> str:
+    """ID lógico da exportação: o mesmo relatório (dataset, versão, formato, filtros) tem sempre o mesmo ID."""
+    key = json.dumps(
+        {"dataset_id": dataset_id, "versao": version, "formato": fmt, "filtros": filtros, "compact": compact},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def _index_lock():
+    """
+    Lock do índice: entre threads (_LOCK) e entre processos (flock em EXPORT_DIR, como o
+    ponteiro do backend shared). Sem fcntl (Windows) fica só o lock entre threads.
+    """
+    with _LOCK:
+        if fcntl is None:
+            yield
+            return
+        _dir().mkdir(parents=True, exist_ok=True)
+        with open(_dir() / LOCK_NAME, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _read_index() -> dict[str, ExportEntry]:
+    """Índice atual do disco (chamado sob _index_lock); entradas sem arquivo são descartadas."""
+    try:
+        raw = json.loads((_dir() / INDEX_NAME).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Índice de exportações ilegível; recomeçando vazio. erro={str(e)}")
+        return {}
+
+    entries: dict[str, ExportEntry] = {}
+    for item in raw.get("exports", []):
+        try:
+            entry = ExportEntry(**item)
+        except TypeError:
+            continue
+        if _file_path(entry.export_id, entry.formato).exists():
+            entries[entry.export_id] = entry
+    return entries
+
+
+def _write_index(entries: dict[str, ExportEntry]) -> None:
+    directory = _dir()
+    tmp = directory / f".{INDEX_NAME}.{os.getpid()}"
+    payload = {"exports": [asdict(e) for e in entries.values()]}
+    tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, directory / INDEX_NAME)
+
+
+def _remove(entries: dict[str, ExportEntry], entry: ExportEntry) -> None:
+    entries.pop(entry.export_id, None)
+    _file_path(entry.export_id, entry.formato).unlink(missing_ok=True)
+
+
+def _enforce_retention(entries: dict[str, ExportEntry], now: float) -> int:
+    """Aplica idade, quantidade e tamanho máximos. Retorna quantos arquivos saíram."""
+    removed = 0
+
+    if EXPORT_MAX_AGE_DAYS > 0:
+        cutoff = now - EXPORT_MAX_AGE_DAYS * 86400
+        for entry in [e for e in entries.values() if e.created_at < cutoff]:
+            _remove(entries, entry)
+            removed += 1
+
+    max_bytes = EXPORT_MAX_MB * 1024 * 1024
+    total = sum(e.tamanho_bytes for e in entries.values())
+    for entry in sorted(entries.values(), key=lambda e: e.accessed_at):
+        over_count = EXPORT_KEEP > 0 and len(entries) > EXPORT_KEEP
+        over_bytes = max_bytes > 0 and total > max_bytes
+        if not over_count and not over_bytes:
+            break
+        _remove(entries, entry)
+        total -= entry.tamanho_bytes
+        removed += 1
+
+    return removed
+
+
+def _take_pending_access() -> dict[str, float]:
+    global _PENDING_ACCESS
+
+    with _ACCESS_LOCK:
+        pending, _PENDING_ACCESS = _PENDING_ACCESS, {}
+    return pending
+
+
+def _apply_access(entries: dict[str, ExportEntry], pending: dict[str, float]) -> None:
+    for export_id, accessed_at in pending.items():
+        entry = entries.get(export_id)
+        if entry is not None and accessed_at > entry.accessed_at:
+            entry.accessed_at = accessed_at
+
+
+def _flush_access() -> None:
+    """Roda na thread do armazenamento: grava no índice os acessos acumulados desde a última escrita."""
+    pending = _take_pending_access()
+    if not pending:
+        return
+
+    try:
+        with _index_lock():
+            entries = _read_index()
+            _apply_access(entries, pending)
+            _write_index(entries)
+    except OSError as e:
+        logger.error(f"Falha ao registrar acesso às exportações. exportacoes={len(pending)} erro={str(e)}")
+
+
+def _touch(export_id: str) -> None:
+    """Registra o acesso sem tocar no índice; só agenda uma gravação se não houver outra pendente."""
+    with _ACCESS_LOCK:
+        scheduled = bool(_PENDING_ACCESS)
+        _PENDING_ACCESS[export_id] = time.time()
+
+    if not scheduled:
+        _WRITER.submit(_flush_access)
+
+
+def _put(export_id: str, content: bytes, fmt: str, dataset_id: str, version: int, filtros: dict) -> None:
+    now = time.time()
+
+    with _index_lock():
+        entries = _read_index()
+        # Acessos pendentes entram antes da retenção, que descarta os menos acessados
+        _apply_access(entries, _take_pending_access())
+        entry = entries.get(export_id)
+
+        if entry is not None:
+            entry.accessed_at = now
+        else:
+            path = _file_path(export_id, fmt)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}")
+            tmp.write_bytes(content)
+            os.replace(tmp, path)
+            entries[export_id] = ExportEntry(
+                export_id=export_id,
+                formato=fmt,
+                dataset_id=dataset_id,
+                versao=version,
+                filtros=filtros,
+                tamanho_bytes=len(content),
+                created_at=now,
+                accessed_at=now,
+            )
+            logger.info(f"Exportação gravada. export_id={export_id} formato={fmt} bytes={len(content)}")
+
+        removed = _enforce_retention(entries, now)
+        _write_index(entries)
+
+    if removed:
+        logger.info(f"Retenção de exportações aplicada. removidos={removed}")
+
+
+def store_export(
+    content: bytes,
+    fmt: str,
+    dataset_id: str,
+    version: int,
+    filtros: dict | None = None,
+    compact: bool = False,
+    background: bool = True,
+) -> str | None:
+    """
+    Guarda o arquivo exportado e retorna o export_id (None se o armazenamento estiver desativado).
+    Com background=True a gravação fica para a thread do armazenamento; senão termina antes do retorno.
+    """
+    if not EXPORT_DIR:
+        return None
+
+    filtros = filtros or {}
+    export_id = export_id_for(dataset_id, version, fmt, filtros, compact)
+    args = (export_id, content, fmt, dataset_id, version, filtros)
+
+    if not background:
+        _put(*args)
+        return export_id
+
+    def run() -> None:
+        try:
+            _put(*args)
+        except OSError as e:
+            logger.error(f"Falha ao gravar exportação. export_id={export_id} erro={str(e)}")
+
+    _WRITER.submit(run)
+    return export_id
+
+
+def list_exports(dataset_id: str | None = None) -> list[dict]:
+    """Exportações guardadas (mais recentes primeiro), opcionalmente de um dataset."""
+    if not EXPORT_DIR:
+        return []
+
+    with _index_lock():
+        entries = [e for e in _read_index().values() if dataset_id is None or e.dataset_id == dataset_id]
+    entries.sort(key=lambda e: e.created_at, reverse=True)
+    return [e.to_dict() for e in entries]
+
+
+def get_export(export_id: str) -> tuple[str, bytes] | None:
+    """(formato, conteúdo) de uma exportação guardada; o acesso conta para a retenção (LRU)."""
+    if not EXPORT_DIR or not is_export_id(export_id):
+        return None
+
+    # O arquivo é encontrado pelo nome; o índice só é atualizado depois, pela thread do armazenamento
+    for fmt in EXPORT_FORMATS:
+        try:
+            content = _file_path(export_id, fmt).read_bytes()
+        except FileNotFoundError:
+            continue
+        _touch(export_id)
+        return fmt, content
+    return None
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from app.core.config import SNAPSHOT_DIR, STORAGE_BACKEND, UPLOAD_WORKERS
+
+# Quantidade máxima de jobs mantidos para consulta (os mais antigos são descartados)
+MAX_JOBS_KEPT = 200
+
+# Etapa final de um job concluído com sucesso
+STAGE_DONE = "concluido"
+
+
+@dataclass
+class Job:
+    id: str
+    filename: str
+    created_at: datetime
+    status: str = "pendente"  # pendente | processando | sucesso | erro
+    # reading | coercing | normalizing | indexing (upload) | rendering (exportação) | concluido;
+    # num job com erro fica a etapa em que ele falhou
+    stage: str | None = None
+    rows_processed: int = 0
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    error: str | None = None
+    result: dict | None = None
+
+    def update(self, stage: str, rows_processed: int) -> None:
+        self.stage = stage
+        self.rows_processed = int(rows_processed)
+        _share(self)
+
+    def throughput(self) -> float:
+        """Linhas processadas por segundo desde o início do job."""
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at or datetime.now(timezone.utc)
+        elapsed = (end - self.started_at).total_seconds()
+        return float(self.rows_processed / elapsed) if elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "arquivo_original": self.filename,
+            "status": self.status,
+            "stage": self.stage,
+            "linhas_processadas": self.rows_processed,
+            "linhas_por_segundo": round(self.throughput(), 2),
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "erro": self.error,
+            "resultado": self.result,
+        }
+
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload-job")
+_JOBS: OrderedDict[str, Job] = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def create_job(filename: str) -> Job:
+    job = Job(id=uuid.uuid4().hex, filename=filename, created_at=datetime.now(timezone.utc))
+
+    with _LOCK:
+        _JOBS[job.id] = job
+        while len(_JOBS) > MAX_JOBS_KEPT:
+            _JOBS.popitem(last=False)
+
+    if STORAGE_BACKEND == "shared":
+        _prune_shared_jobs()
+
+    return job
+
+
+def get_job(job_id: str) -> Job | None:
+    with _LOCK:
+        return _JOBS.get(job_id)
+
+
+def get_job_status(job_id: str) -> dict | None:
+    """
+    Status do job. No backend "shared" o job pode estar rodando em outro worker;
+    nesse caso o status vem do arquivo publicado por ele.
+    """
+    job = get_job(job_id)
+    if job is not None:
+        return job.to_dict()
+
+    if STORAGE_BACKEND != "shared" or not job_id.isalnum():
+        return None
+
+    try:
+        return json.loads((_shared_jobs_dir() / f"{job_id}.json").read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _shared_jobs_dir() -> Path:
+    return Path(SNAPSHOT_DIR) / "jobs"
+
+
+def _share(job: Job) -> None:
+    """No backend "shared", publica o status do job para os outros workers."""
+    if STORAGE_BACKEND != "shared":
+        return
+
+    directory = _shared_jobs_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = directory / f".{job.id}.json"
+    tmp.write_text(json.dumps(job.to_dict(), ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, directory / f"{job.id}.json")
+
+
+def _prune_shared_jobs() -> None:
+    """Mantém só os status de job mais recentes no diretório compartilhado."""
+    files = []
+    for path in _shared_jobs_dir().glob("*.json"):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            pass
+
+    files.sort()
+    for _, old in files[: max(len(files) - MAX_JOBS_KEPT, 0)]:
+        old.unlink(missing_ok=True)
+
+
+def submit_job(job: Job, fn: Callable[[Job], dict], executor: ThreadPoolExecutor | None = None) -> None:
+    """
+    Executa fn(job) no pool de workers (o dos uploads, se executor não for informado).
+    O dict retornado vira o resultado do job; qualquer exceção marca o job como erro
+    (a mensagem vem de str(exceção)).
+    """
+
+    def run() -> None:
+        job.status = "processando"
+        job.started_at = datetime.now(timezone.utc)
+        _share(job)
+        try:
+            job.result = fn(job)
+            job.status = "sucesso"
+            job.stage = STAGE_DONE
+        except Exception as e:
+            job.error = str(e)
+            job.status = "erro"
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            _share(job)
+
+    _share(job)
+    (executor or _EXECUTOR).submit(run)
@@ -0,0 +1,94 @@
+"""
+Serialização JSON das respostas.
+
+FastJSONResponse é a classe de resposta padrão da API. Com o orjson instalado (e
+JSON_RENDERER=auto ou orjson) o corpo sai direto em bytes, com escalares e arrays numpy,
+Timestamps e NA do pandas convertidos no próprio serializador; sem ele, cai no json da
+biblioteca padrão com os mesmos conversores. Nos dois casos NaN e ±Infinity saem como null
+(o orjson já faz isso; no json da biblioteca padrão eles são trocados por None antes).
+A saída é compacta (sem espaços).
+
+Rotas que devolvem um dict passam antes pelo jsonable_encoder do FastAPI, que percorre o
+resultado inteiro em Python. As rotas de relatório pulam esse passo devolvendo
+json_response(resultado, response), que já monta a resposta final.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from datetime import date, datetime
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+from app.core.config import JSON_RENDERER
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+USE_ORJSON = orjson is not None and JSON_RENDERER in ("auto", "orjson")
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def _default(value: Any) -> Any:
+    """Tipos que o serializador não conhece: numpy, pandas e datas."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if value is pd.NaT or value is pd.NA:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Tipo não serializável em JSON: {type(value).__name__}")
+
+
+def _finite(value: Any) -> Any:
+    """Troca floats não finitos (NaN, ±Infinity) por None, como o orjson faz."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def _default_finite(value: Any) -> Any:
+    return _finite(_default(value))
+
+
+def dumps_json(content: Any) -> bytes:
+    """JSON compacto em UTF-8."""
+    if USE_ORJSON:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        _finite(content), ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default_finite
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def json_response(content: Any, response: Response | None = None) -> FastJSONResponse:
+    """
+    Resposta final para o conteúdo, sem passar pelo jsonable_encoder. Os headers e o status
+    definidos na Response injetada da rota (ex: X-Dataset-Id, X-Total-Count) são mantidos.
+    """
+    out = FastJSONResponse(content)
+    if response is not None:
+        if response.status_code:
+            out.status_code = response.status_code
+        out.headers.raw.extend(response.headers.raw)
+    return out
@@ -0,0 +1,167 @@
+"""
+Snapshot colunar do dataset em disco.
+
+Cada snapshot é um diretório com um manifest.json e um arquivo .npy por coluna:
+- colunas numéricas/datas: o próprio array
+- colunas categóricas: os códigos (.npy) + o dicionário de valores no manifest
+- colunas de texto livre: fatoradas em códigos + valores, e reconstruídas como texto na leitura
+
+Tabelas auxiliares derivadas do dataset (ex: o cubo de agregados) podem ser gravadas no mesmo
+snapshot, com o mesmo formato de colunas, e são lidas com load_table.
+
+A leitura usa np.load(mmap_mode="r"): os arrays ficam mapeados do arquivo, então
+carregar um snapshot não faz parse nem copia os dados para a memória do processo.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_FORMAT = 1
+
+
+def _new_snapshot_name(uploaded_at: datetime) -> str:
+    return f"{uploaded_at.strftime('%Y%m%dT%H%M%S%f')}_{uuid.uuid4().hex[:8]}"
+
+
+def _save_column(series: pd.Series, directory: Path, index: int, prefix: str = "col") -> dict:
+    file_name = f"{prefix}_{index:03d}.npy"
+    entry = {"name": str(series.name), "file": file_name, "dtype": str(series.dtype)}
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        entry["kind"] = "category"
+        entry["categories"] = [str(c) for c in series.cat.categories]
+        np.save(directory / file_name, series.cat.codes.to_numpy())
+        return entry
+
+    if series.dtype.kind in "biufM":
+        entry["kind"] = "array"
+        np.save(directory / file_name, series.to_numpy())
+        return entry
+
+    # Texto livre (ex: IDs fora do padrão): guarda como códigos + valores distintos
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    entry["kind"] = "string"
+    entry["categories"] = [str(u) for u in uniques]
+    np.save(directory / file_name, codes)
+    return entry
+
+
+def _load_column(entry: dict, directory: Path, mmap: bool) -> pd.Series | np.ndarray:
+    values = np.load(directory / entry["file"], mmap_mode="r" if mmap else None)
+
+    if entry["kind"] == "array":
+        return values
+
+    categorical = pd.Categorical.from_codes(values, categories=entry["categories"], validate=False)
+    if entry["kind"] == "category":
+        return categorical
+
+    return pd.Series(categorical).astype(entry["dtype"])
+
+
+def _frame_from_columns(entries: list[dict], directory: Path, mmap: bool) -> pd.DataFrame:
+    data = {entry["name"]: _load_column(entry, directory, mmap) for entry in entries}
+    return pd.DataFrame(data, copy=False)
+
+
+def save_snapshot(
+    df: pd.DataFrame,
+    filename: str,
+    uploaded_at: datetime,
+    directory: str | Path,
+    name: str | None = None,
+    version: int | None = None,
+    tables: dict[str, pd.DataFrame] | None = None,
+) -> Path:
+    """
+    Grava o DataFrame como snapshot colunar em directory/<nome>/ e retorna o caminho.
+    Sem `name`, o nome é gerado a partir de uploaded_at (ordenável por data).
+    `tables` são tabelas auxiliares gravadas junto (lidas depois com load_table).
+    A escrita é feita num diretório temporário renomeado no final (nunca fica snapshot pela metade).
+    """
+    base = Path(directory)
+    base.mkdir(parents=True, exist_ok=True)
+
+    name = name or _new_snapshot_name(uploaded_at)
+    tmp_dir = base / f".tmp_{name}"
+    tmp_dir.mkdir()
+
+    try:
+        columns = [_save_column(df[col], tmp_dir, i) for i, col in enumerate(df.columns)]
+        saved_tables = {
+            table_name: {
+                "rows": int(len(table)),
+                "columns": [_save_column(table[col], tmp_dir, i, prefix=table_name) for i, col in enumerate(table.columns)],
+                "attrs": table.attrs,
+            }
+            for table_name, table in (tables or {}).items()
+        }
+        manifest = {
+            "format": SNAPSHOT_FORMAT,
+            "filename": filename,
+            "uploaded_at": uploaded_at.isoformat(),
+            "version": version,
+            "rows": int(len(df)),
+            "columns": columns,
+            "tables": saved_tables,
+            "attrs": df.attrs,
+        }
+        (tmp_dir / MANIFEST_NAME).write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+
+        final_dir = base / name
+        os.replace(tmp_dir, final_dir)
+        return final_dir
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def read_manifest(path: str | Path) -> dict:
+    return json.loads((Path(path) / MANIFEST_NAME).read_text(encoding="utf-8"))
+
+
+def load_snapshot(path: str | Path, mmap: bool = True) -> tuple[pd.DataFrame, dict]:
+    """
+    Carrega um snapshot. Retorna (DataFrame, manifest).
+    Com mmap=True as colunas numéricas/datas apontam direto para os arquivos (somente leitura).
+    """
+    directory = Path(path)
+    manifest = read_manifest(directory)
+
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Formato de snapshot não suportado: {manifest.get('format')}")
+
+    df = _frame_from_columns(manifest["columns"], directory, mmap)
+    df.attrs = manifest.get("attrs") or {}
+    return df, manifest
+
+
+def load_table(path: str | Path, name: str, manifest: dict | None = None, mmap: bool = True) -> pd.DataFrame | None:
+    """Carrega uma tabela auxiliar do snapshot (None se o snapshot não tiver essa tabela)."""
+    directory = Path(path)
+    manifest = manifest or read_manifest(directory)
+
+    table = (manifest.get("tables") or {}).get(name)
+    if table is None:
+        return None
+    df = _frame_from_columns(table["columns"], directory, mmap)
+    df.attrs = table.get("attrs") or {}
+    return df
+
+
+def list_snapshots(directory: str | Path) -> list[Path]:
+    """Snapshots completos no diretório, do mais antigo para o mais recente."""
+    base = Path(directory)
+    if not base.exists():
+        return []
+    return sorted(p for p in base.iterdir() if p.is_dir() and not p.name.startswith(".") and (p / MANIFEST_NAME).exists())
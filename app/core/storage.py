@@ -1,25 +1,633 @@
+"""
+Registro de datasets carregados.
+
+Cada dataset publicado é imutável e recebe uma versão (inteiro crescente, nunca reutilizado).
+As rotas resolvem o DatasetState uma única vez no início da request e usam só ele: um upload
+concluído no meio da request não mistura dados (df) e metadados (arquivo, versão) de uploads
+diferentes. A versão identifica o conteúdo e serve de chave para caches e ETags.
+
+Cada upload vira um dataset com um dataset_id próprio; vários podem ficar disponíveis ao mesmo
+tempo (ex: lojas ou meses diferentes). Sem dataset_id, as consultas usam o último upload.
+
+Memória: com DATASET_MEMORY_BUDGET_MB > 0, quando a soma dos datasets em memória passa do
+orçamento, os menos consultados recentemente (LRU) são descarregados. Eles continuam no
+registro e são recarregados do snapshot em disco (memory-mapped) no próximo acesso.
+No máximo SNAPSHOT_KEEP datasets são mantidos; os uploads mais antigos saem do registro.
+
+Backends (STORAGE_BACKEND):
+- "memory": o registro fica na memória do processo (um upload por worker).
+- "shared": os datasets são snapshots colunares em SNAPSHOT_DIR, mapeados em memória (mmap)
+  por todos os workers; as páginas são compartilhadas pelo sistema operacional, então existe
+  uma única cópia em RAM. Um arquivo de ponteiro (current.json) guarda o contador de geração
+  e a lista de datasets; cada worker confere o ponteiro ao acessar o registro e passa a ver
+  os novos uploads assim que são publicados. Use um SNAPSHOT_DIR em tmpfs
+  (ex: /dev/shm/hanami) para manter os dados só em RAM.
+"""
+
 from __future__ import annotations
 
-from dataclasses import dataclass
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from pathlib import Path
 import pandas as pd
+from loguru import logger
 
+from app.core.cache import invalidate as invalidate_results
+from app.core.config import DATASET_MEMORY_BUDGET_MB, SNAPSHOT_DIR, SNAPSHOT_KEEP, STORAGE_BACKEND
+from app.core.errors import DatasetNotFoundError
+from app.core.snapshot import list_snapshots, load_snapshot, load_table, read_manifest, save_snapshot
+from app.services.bitmap import BITMAP_TABLE, build_bitmaps
+from app.services.cube import (
+    CUBE_BITMAP_TABLE,
+    CUBE_FILTER_COLUMNS,
+    CUBE_TABLE,
+    DAILY_TABLE,
+    build_cube,
+    build_daily_totals,
+)
+from app.services.pivot import clear_groupings
+from app.services.product_analysis import PRODUCTS_TABLE, build_product_table
+from app.services.timeseries import TIMESERIES_DIMENSIONS, breakdown_table_name, build_daily_breakdown
+from app.utils.filters import FILTER_COLUMNS, sort_by_date
 
-@dataclass
+
+POINTER_NAME = "current.json"
+LOCK_NAME = ".lock"
+
+
+@dataclass(frozen=True)
 class DatasetState:
     df: pd.DataFrame
     filename: str
     uploaded_at: datetime
+    dataset_id: str = ""
+    version: int = 0
+    # Tabelas auxiliares calculadas no upload (ver build_tables); gravadas junto no snapshot
+    tables: dict[str, pd.DataFrame] = field(default_factory=dict)
+
+    @property
+    def cube(self) -> pd.DataFrame | None:
+        """Agregados pré-calculados (ver app/services/cube.py)."""
+        return self.tables.get(CUBE_TABLE)
+
+    @property
+    def daily(self) -> pd.DataFrame | None:
+        """Somas diárias acumuladas (ver build_daily_totals)."""
+        return self.tables.get(DAILY_TABLE)
+
+    @property
+    def bitmaps(self) -> pd.DataFrame | None:
+        """Índices bitmap das colunas de filtro do dataset (ver app/services/bitmap.py)."""
+        return self.tables.get(BITMAP_TABLE)
+
+    @property
+    def cube_bitmaps(self) -> pd.DataFrame | None:
+        return self.tables.get(CUBE_BITMAP_TABLE)
+
+    def daily_breakdown(self, dim: str) -> pd.DataFrame | None:
+        """Somas diárias acumuladas por valor da dimensão (ver build_daily_breakdown)."""
+        return self.tables.get(breakdown_table_name(dim))
+
+    @property
+    def products(self) -> pd.DataFrame | None:
+        """Totais e ordens por produto do dataset inteiro (ver build_product_table)."""
+        return self.tables.get(PRODUCTS_TABLE)
+
+
+@dataclass
+class _Entry:
+    dataset_id: str
+    filename: str
+    uploaded_at: datetime
+    rows: int
+    version: int
+    columns: list[str] = field(default_factory=list)
+    snapshot: Path | None = None
+    state: DatasetState | None = None
+    nbytes: int = 0
+    last_access: float = 0.0
+    # Recarga do snapshot em andamento (as outras requests do mesmo dataset esperam por ela)
+    loading: Future | None = None
+
+
+# Ordem do OrderedDict = ordem LRU (primeiro = consultado há mais tempo)
+_ENTRIES: OrderedDict[str, _Entry] = OrderedDict()
+_DEFAULT_ID: str | None = None
+_VERSION = 0  # última versão atribuída neste processo (backend "memory")
+
+_LOCK = threading.RLock()
+_SEEN_POINTER: tuple[int, int] | None = None
+
+
+def new_dataset_id() -> str:
+    """ID ordenável por data do upload; também é o nome do diretório do snapshot."""
+    return f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}_{uuid.uuid4().hex[:8]}"
+
+
+def set_dataset(
+    df: pd.DataFrame,
+    filename: str,
+    uploaded_at: datetime | None = None,
+    dataset_id: str | None = None,
+    version: int | None = None,
+    tables: dict[str, pd.DataFrame] | None = None,
+) -> DatasetState:
+    """Registra um dataset em memória e o torna o padrão das consultas (sem versão, recebe a próxima)."""
+    global _DEFAULT_ID
+
+    with _LOCK:
+        ds = DatasetState(
+            df=df,
+            filename=filename,
+            uploaded_at=uploaded_at or datetime.now(timezone.utc),
+            dataset_id=dataset_id or new_dataset_id(),
+            version=version if version is not None else _next_version(),
+            tables=tables or {},
+        )
+        entry = _Entry(
+            dataset_id=ds.dataset_id,
+            filename=filename,
+            uploaded_at=ds.uploaded_at,
+            rows=int(len(df)),
+            version=ds.version,
+            columns=list(df.columns),
+        )
+        entry.state = ds
+        entry.nbytes = _state_nbytes(ds)
+        entry.last_access = time.time()
+        _ENTRIES[ds.dataset_id] = entry
+        _ENTRIES.move_to_end(ds.dataset_id)
+        _DEFAULT_ID = ds.dataset_id
+
+    return ds
+
+
+def get_dataset(dataset_id: str | None = None) -> DatasetState | None:
+    """
+    Dataset pelo ID (ou o último upload, se dataset_id for None). Recarrega do snapshot se
+    tiver sido descarregado. Retorna None se não houver nenhum dataset; levanta
+    DatasetNotFoundError se o ID informado não existir.
+    """
+    if STORAGE_BACKEND == "shared":
+        _sync_shared()
+
+    with _LOCK:
+        key = dataset_id or _DEFAULT_ID
+        if key is None:
+            return None
+
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            raise DatasetNotFoundError(f"Dataset não encontrado: {key}")
+
+        entry.last_access = time.time()
+        _ENTRIES.move_to_end(key)
+
+        if entry.state is not None:
+            return entry.state
+
+        # Recarga do snapshot fora do _LOCK: só quem pede este dataset espera por ela
+        loading = entry.loading
+        owner = loading is None
+        if owner:
+            loading = entry.loading = Future()
+
+    if not owner:
+        return loading.result()
+
+    try:
+        state = _load_state(entry)
+        nbytes = _state_nbytes(state)
+    except BaseException as e:
+        with _LOCK:
+            entry.loading = None
+        loading.set_exception(e)
+        raise
+
+    with _LOCK:
+        entry.state = state
+        entry.nbytes = nbytes
+        entry.loading = None
+        _enforce_memory_budget(keep_id=key)
+
+    loading.set_result(state)
+    return state
+
+
+def dataset_info(dataset_id: str | None = None) -> dict | None:
+    """
+    Metadados do dataset pelo ID (ou do último upload), lidos do registro e do manifest do
+    snapshot: não recarrega um dataset descarregado nem conta como acesso (último acesso e
+    ordem de descarte ficam como estão). Mesmo contrato de get_dataset para None/ID inválido.
+    """
+    if STORAGE_BACKEND == "shared":
+        _sync_shared()
+
+    with _LOCK:
+        key = dataset_id or _DEFAULT_ID
+        if key is None:
+            return None
+
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            raise DatasetNotFoundError(f"Dataset não encontrado: {key}")
+
+        return {
+            "dataset_id": entry.dataset_id,
+            "versao": entry.version,
+            "arquivo_original": entry.filename,
+            "uploaded_at": entry.uploaded_at.isoformat(),
+            "linhas_processadas": entry.rows,
+            "colunas": list(entry.columns),
+        }
+
+
+def registry_versions() -> dict:
+    """
+    Identidade do registro: (dataset_id, versão) de cada dataset e o padrão. Só muda com um
+    upload, a retenção ou a sincronização do backend "shared" (base do ETag de /dataset/status).
+    """
+    if STORAGE_BACKEND == "shared":
+        _sync_shared()
+
+    with _LOCK:
+        return {"datasets": sorted((e.dataset_id, e.version) for e in _ENTRIES.values()), "padrao": _DEFAULT_ID}
+
+
+def list_datasets() -> list[dict]:
+    """
+    Metadados de todos os datasets do registro, do upload mais recente para o mais antigo.
+    Só o que é fixo por versão; uso de memória e último acesso ficam em memory_usage.
+    """
+    if STORAGE_BACKEND == "shared":
+        _sync_shared()
+
+    with _LOCK:
+        entries = sorted(_ENTRIES.values(), key=lambda e: e.dataset_id, reverse=True)
+        return [
+            {
+                "dataset_id": e.dataset_id,
+                "arquivo_original": e.filename,
+                "uploaded_at": e.uploaded_at.isoformat(),
+                "linhas_processadas": e.rows,
+                "versao": e.version,
+                "padrao": e.dataset_id == _DEFAULT_ID,
+            }
+            for e in entries
+        ]
+
+
+def memory_usage() -> dict:
+    """Orçamento e uso de memória, e por dataset se está carregado, quanto ocupa e o último acesso."""
+    if STORAGE_BACKEND == "shared":
+        _sync_shared()
+
+    with _LOCK:
+        entries = sorted(_ENTRIES.values(), key=lambda e: e.dataset_id, reverse=True)
+        used = sum(e.nbytes for e in entries if e.state is not None)
+        datasets = [
+            {
+                "dataset_id": e.dataset_id,
+                "em_memoria": e.state is not None,
+                "memoria_mb": round(e.nbytes / (1024 * 1024), 2),
+                "ultimo_acesso": datetime.fromtimestamp(e.last_access, timezone.utc).isoformat() if e.last_access else None,
+            }
+            for e in entries
+        ]
+    return {
+        "orcamento_mb": DATASET_MEMORY_BUDGET_MB or None,
+        "em_uso_mb": round(used / (1024 * 1024), 2),
+        "datasets": datasets,
+    }
+
+
+def publish_dataset(df: pd.DataFrame, filename: str, dataset_id: str | None = None) -> DatasetState:
+    """
+    Publica o resultado de um upload concluído.
+    - memory: registra o dataset no processo e grava um snapshot (se SNAPSHOT_DIR configurado)
+    - shared: grava o snapshot, avança a geração e todos os workers passam a enxergá-lo
+    """
+    dataset_id = dataset_id or new_dataset_id()
+    uploaded_at = datetime.now(timezone.utc)
+    # Ordenado por data, os filtros de período viram buscas binárias (fatias sem cópia)
+    df = sort_by_date(df, "data_venda")
+    tables = build_tables(df)
+
+    if STORAGE_BACKEND == "shared":
+        generation = _publish_shared(df, filename, uploaded_at, dataset_id, tables)
+        logger.info(f"Dataset publicado para todos os workers. arquivo={filename} dataset_id={dataset_id} versao={generation}")
+        # Este worker também passa a usar a versão mapeada (libera a cópia privada do parse);
+        # o _sync_shared dentro do get_dataset também esvazia o cache de relatórios
+        return get_dataset(dataset_id)
+
+    ds = set_dataset(df=df, filename=filename, uploaded_at=uploaded_at, dataset_id=dataset_id, tables=tables)
+    invalidate_results(f"upload dataset_id={dataset_id}")
+    clear_groupings()
 
+    if SNAPSHOT_DIR:
+        # Falha ao gravar o snapshot não invalida o upload (o dataset já está em memória),
+        # mas sem snapshot ele não pode ser descarregado pelo orçamento de memória
+        try:
+            path = save_snapshot(df, filename, uploaded_at, SNAPSHOT_DIR, name=dataset_id, version=ds.version, tables=tables)
+            with _LOCK:
+                _ENTRIES[dataset_id].snapshot = path
+            logger.info(f"Snapshot do dataset gravado. arquivo={filename} snapshot={path}")
+        except Exception as e:
+            logger.error(f"Falha ao gravar snapshot. arquivo={filename} erro={str(e)}")
 
-CURRENT_DATASET: DatasetState | None = None
+    with _LOCK:
+        _trim_registry()
+        _enforce_memory_budget(keep_id=dataset_id)
 
+    return ds
 
-def set_dataset(df: pd.DataFrame, filename: str) -> None:
-    global CURRENT_DATASET
-    CURRENT_DATASET = DatasetState(
+
+def restore_snapshots() -> int:
+    """
+    Registra os snapshots de SNAPSHOT_DIR (sem carregá-los; cada um é mapeado no primeiro acesso).
+    O mais recente vira o dataset padrão. No backend "shared", o primeiro worker a subir publica
+    esses snapshots como geração atual e os demais apenas se conectam a ela.
+    Retorna quantos datasets ficaram disponíveis.
+    """
+    global _DEFAULT_ID, _VERSION
+
+    if not SNAPSHOT_DIR:
+        if STORAGE_BACKEND == "shared":
+            raise RuntimeError("STORAGE_BACKEND=shared exige SNAPSHOT_DIR configurado.")
+        return 0
+
+    if STORAGE_BACKEND == "shared":
+        with _pointer_lock():
+            if _read_pointer() is None:
+                entries = [e for e in map(_entry_from_snapshot, list_snapshots(SNAPSHOT_DIR)) if e is not None]
+                if entries:
+                    ids = [e.dataset_id for e in entries]
+                    generation = max(1, max(e.version for e in entries))
+                    _write_pointer({"generation": generation, "datasets": ids, "default": ids[-1]})
+        _sync_shared()
+        return len(_ENTRIES)
+
+    with _LOCK:
+        restored = [e for e in map(_entry_from_snapshot, list_snapshots(SNAPSHOT_DIR)) if e is not None]
+        _VERSION = max([_VERSION] + [e.version for e in restored])
+
+        for entry in restored:
+            if entry.dataset_id in _ENTRIES:
+                continue
+            if entry.version == 0:
+                # Snapshot gravado antes do versionamento
+                entry.version = _next_version()
+            _ENTRIES[entry.dataset_id] = entry
+            _ENTRIES.move_to_end(entry.dataset_id, last=False)
+
+        if _ENTRIES and _DEFAULT_ID is None:
+            _DEFAULT_ID = max(_ENTRIES)
+        _trim_registry()
+
+        if _ENTRIES:
+            logger.info(f"Datasets restaurados dos snapshots. quantidade={len(_ENTRIES)} padrao={_DEFAULT_ID}")
+        return len(_ENTRIES)
+
+
+# --- Registro: carga, orçamento de memória e retenção ---
+
+TABLE_NAMES = (
+    CUBE_TABLE,
+    CUBE_BITMAP_TABLE,
+    DAILY_TABLE,
+    BITMAP_TABLE,
+    PRODUCTS_TABLE,
+    *(breakdown_table_name(dim) for dim in TIMESERIES_DIMENSIONS),
+)
+
+
+def build_tables(df: pd.DataFrame) -> dict[str, pd.DataFrame]:
+    """Tabelas auxiliares do dataset (as que não puderem ser calculadas ficam de fora)."""
+    cube = build_cube(df)
+    tables = {
+        CUBE_TABLE: cube,
+        CUBE_BITMAP_TABLE: build_bitmaps(cube, CUBE_FILTER_COLUMNS),
+        DAILY_TABLE: build_daily_totals(df),
+        BITMAP_TABLE: build_bitmaps(df, FILTER_COLUMNS),
+        # Os totais por produto saem do cubo (menor) quando ele existe
+        PRODUCTS_TABLE: build_product_table(cube if cube is not None else df),
+        **{breakdown_table_name(dim): build_daily_breakdown(df, dim) for dim in TIMESERIES_DIMENSIONS},
+    }
+    return {name: table for name, table in tables.items() if table is not None}
+
+
+def _next_version() -> int:
+    global _VERSION
+    with _LOCK:
+        _VERSION += 1
+        return _VERSION
+
+
+def _state_nbytes(ds: DatasetState) -> int:
+    return _frame_nbytes(ds.df) + sum(_frame_nbytes(table) for table in ds.tables.values())
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    """
+    Memória aproximada do DataFrame. Colunas de texto (objetos Python) são estimadas por
+    amostragem para não percorrer milhões de strings.
+    """
+    total = 0
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype) or series.dtype.kind in "biufM":
+            total += int(series.memory_usage(index=False, deep=True))
+            continue
+        sample = series.iloc[:1000]
+        if len(sample):
+            total += int(sample.memory_usage(index=False, deep=True) / len(sample) * len(series))
+    return total
+
+
+def _entry_from_snapshot(path: Path) -> _Entry | None:
+    try:
+        manifest = read_manifest(path)
+    except Exception as e:
+        logger.error(f"Snapshot ignorado (manifest inválido). snapshot={path} erro={str(e)}")
+        return None
+
+    return _Entry(
+        dataset_id=path.name,
+        filename=manifest["filename"],
+        uploaded_at=datetime.fromisoformat(manifest["uploaded_at"]),
+        rows=int(manifest["rows"]),
+        version=int(manifest.get("version") or 0),
+        columns=[column["name"] for column in manifest["columns"]],
+        snapshot=path,
+    )
+
+
+def _load_state(entry: _Entry) -> DatasetState:
+    """Lê o dataset do snapshot da entrada (sem alterar a entrada nem usar o _LOCK)."""
+    if entry.snapshot is None:
+        raise DatasetNotFoundError(f"Dataset sem snapshot para recarregar: {entry.dataset_id}")
+
+    df, manifest = load_snapshot(entry.snapshot, mmap=True)
+
+    tables = {name: load_table(entry.snapshot, name, manifest) for name in (manifest.get("tables") or {})}
+    # Snapshot anterior a alguma tabela auxiliar: calcula na carga
+    if any(name not in tables for name in TABLE_NAMES):
+        tables = {**build_tables(df), **tables}
+
+    logger.info(f"Dataset carregado do snapshot. dataset_id={entry.dataset_id} linhas={entry.rows}")
+    return DatasetState(
         df=df,
-        filename=filename,
-        uploaded_at=datetime.now(timezone.utc),
+        filename=entry.filename,
+        uploaded_at=entry.uploaded_at,
+        dataset_id=entry.dataset_id,
+        version=entry.version,
+        tables=tables,
     )
 
+
+def _enforce_memory_budget(keep_id: str | None) -> None:
+    """Descarrega datasets menos consultados recentemente até caber no orçamento."""
+    if DATASET_MEMORY_BUDGET_MB <= 0:
+        return
+
+    budget = DATASET_MEMORY_BUDGET_MB * 1024 * 1024
+    used = sum(e.nbytes for e in _ENTRIES.values() if e.state is not None)
+
+    for entry in list(_ENTRIES.values()):
+        if used <= budget:
+            break
+        # Só dá para descarregar o que pode ser recarregado do disco
+        if entry.state is None or entry.snapshot is None or entry.dataset_id == keep_id:
+            continue
+        used -= entry.nbytes
+        entry.state = None
+        entry.nbytes = 0
+        clear_groupings(entry.dataset_id)
+        logger.info(f"Dataset descarregado da memória (LRU). dataset_id={entry.dataset_id}")
+
+
+def _trim_registry() -> None:
+    """Mantém só os SNAPSHOT_KEEP uploads mais recentes (registro e snapshots em disco)."""
+    ids = sorted(_ENTRIES)
+    for dataset_id in ids[: max(len(ids) - SNAPSHOT_KEEP, 0)]:
+        if dataset_id == _DEFAULT_ID:
+            continue
+        entry = _ENTRIES.pop(dataset_id)
+        clear_groupings(dataset_id)
+        if entry.snapshot is not None:
+            shutil.rmtree(entry.snapshot, ignore_errors=True)
+        logger.info(f"Dataset removido (retenção). dataset_id={dataset_id}")
+
+
+# --- Backend "shared": ponteiro de geração entre processos ---
+
+
+@contextmanager
+def _pointer_lock():
+    """Lock exclusivo entre processos (flock) para avançar a geração."""
+    import fcntl  # disponível só em sistemas POSIX; o backend "shared" não roda no Windows
+
+    Path(SNAPSHOT_DIR).mkdir(parents=True, exist_ok=True)
+    with open(Path(SNAPSHOT_DIR) / LOCK_NAME, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _pointer_path() -> Path:
+    return Path(SNAPSHOT_DIR) / POINTER_NAME
+
+
+def _read_pointer() -> dict | None:
+    try:
+        pointer = json.loads(_pointer_path().read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+    # Ponteiro antigo, de um único dataset
+    if "snapshot" in pointer:
+        pointer = {"generation": pointer["generation"], "datasets": [pointer["snapshot"]], "default": pointer["snapshot"]}
+    return pointer
+
+
+def _write_pointer(pointer: dict) -> None:
+    path = _pointer_path()
+    tmp = path.with_name(f".{POINTER_NAME}.{os.getpid()}")
+    tmp.write_text(json.dumps(pointer), encoding="utf-8")
+    # os.replace é atômico: os workers leem a geração antiga ou a nova, nunca um arquivo parcial
+    os.replace(tmp, path)
+
+
+def _publish_shared(
+    df: pd.DataFrame, filename: str, uploaded_at: datetime, dataset_id: str, tables: dict[str, pd.DataFrame] | None
+) -> int:
+    """
+    Grava o snapshot e avança a geração, tudo sob o lock entre processos.
+    A geração nova é a versão do dataset: única e crescente entre todos os workers.
+    """
+    with _pointer_lock():
+        current = _read_pointer() or {"generation": 0, "datasets": []}
+        generation = current["generation"] + 1
+        save_snapshot(df, filename, uploaded_at, SNAPSHOT_DIR, name=dataset_id, version=generation, tables=tables)
+
+        datasets = [d for d in current["datasets"] if d != dataset_id] + [dataset_id]
+        removed, datasets = datasets[:-SNAPSHOT_KEEP], datasets[-SNAPSHOT_KEEP:]
+        _write_pointer({"generation": generation, "datasets": datasets, "default": dataset_id})
+
+    # Workers que ainda mapeiam um snapshot removido continuam lendo até soltá-lo (POSIX)
+    for old in removed:
+        shutil.rmtree(Path(SNAPSHOT_DIR) / old, ignore_errors=True)
+    return generation
+
+
+def _sync_shared() -> None:
+    """
+    Atualiza o registro deste worker com a geração publicada, se ela mudou desde o último acesso.
+    A checagem normal é só um os.stat do ponteiro; datasets novos são mapeados sob demanda.
+    """
+    global _SEEN_POINTER, _DEFAULT_ID
+
+    try:
+        st = os.stat(_pointer_path())
+    except FileNotFoundError:
+        return
+
+    key = (st.st_ino, st.st_mtime_ns)
+    if key == _SEEN_POINTER:
+        return
+
+    with _LOCK:
+        if key == _SEEN_POINTER:
+            return
+
+        pointer = _read_pointer()
+        if pointer is None:
+            return
+
+        listed = set(pointer["datasets"])
+        for dataset_id in [d for d in _ENTRIES if d not in listed]:
+            del _ENTRIES[dataset_id]
+
+        for dataset_id in pointer["datasets"]:
+            if dataset_id not in _ENTRIES:
+                entry = _entry_from_snapshot(Path(SNAPSHOT_DIR) / dataset_id)
+                if entry is not None:
+                    _ENTRIES[dataset_id] = entry
+
+        _DEFAULT_ID = pointer["default"] if pointer["default"] in _ENTRIES else None
+        _SEEN_POINTER = key
+        # Upload publicado por outro worker
+        invalidate_results(f"geracao={pointer['generation']}")
+        clear_groupings()
+        logger.info(f"Worker sincronizado com o registro compartilhado. geracao={pointer['generation']} datasets={len(_ENTRIES)}")
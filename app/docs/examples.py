@@ -20,6 +20,51 @@ REGIONAL_PERFORMANCE_EXAMPLE = {
     "nordeste": {"total_vendas": 3000000.0, "numero_transacoes": 2500, "media_por_transacao": 1200.0},
 }
 
+TIMESERIES_EXAMPLE = {
+    "granularity": "quarter",
+    "metric": "valor_final",
+    "inicio": "2023-01-01",
+    "fim": "2023-12-31",
+    "periodos": ["2023-01-01", "2023-04-01", "2023-07-01", "2023-10-01"],
+    "valores": [12061431.21, 12819368.6, 13625617.11, 12655912.06],
+}
+
+TIMESERIES_BREAKDOWN_EXAMPLE = {
+    "granularity": "month",
+    "metric": "quantidade",
+    "inicio": "2024-01-01",
+    "fim": "2024-02-29",
+    "periodos": ["2024-01-01", "2024-02-01"],
+    "series": {"sudeste": [312.0, 287.0], "nordeste": [254.0, 270.0]},
+}
+
+PIVOT_EXAMPLE = [
+    {"categoria": "eletronicos", "regiao": "nordeste", "valor_final_sum": 5123456.78, "transacoes": 512},
+    {"categoria": "eletronicos", "regiao": "sudeste", "valor_final_sum": 4987654.32, "transacoes": 498},
+]
+
+BATCH_REQUEST_EXAMPLE = {
+    "queries": [
+        {"id": "t1", "report": "sales-summary", "params": {"start_date": "2023-01-01", "end_date": "2023-03-31"}},
+        {"id": "sp", "report": "regional-performance", "params": {"estado": "SP"}},
+        {"id": "sp-fin", "report": "financial-metrics", "params": {"estado": "SP"}},
+        {"id": "top5", "report": "product-analysis", "params": {"limit": 5}},
+        {"id": "x", "report": "vendas"},
+    ]
+}
+
+BATCH_RESPONSE_EXAMPLE = {
+    "dataset_id": "20260103T120000000000_1a2b3c4d",
+    "versao": 3,
+    "resultados": [
+        {"id": "t1", "report": "sales-summary", "status": 200, "resultado": {"total_vendas": 12061431.21, "numero_transacoes": 1180, "media_por_transacao": 10221.55}},
+        {"id": "sp", "report": "regional-performance", "status": 200, "resultado": {"sudeste": {"total_vendas": 2331398.12, "numero_transacoes": 213, "media_por_transacao": 10945.53}}},
+        {"id": "sp-fin", "report": "financial-metrics", "status": 200, "resultado": {"receita_liquida": 2331398.12, "lucro_bruto": 8712.4, "custo_total": 2322685.72}},
+        {"id": "top5", "report": "product-analysis", "status": 200, "resultado": [{"nome_produto": "Cabo USB-C", "quantidade_vendida": 1131, "total_arrecadado": 4105439.98}]},
+        {"id": "x", "report": "vendas", "status": 422, "erro": "Relatório inválido: vendas. Use sales-summary, financial-metrics, ..."},
+    ],
+}
+
 CUSTOMER_PROFILE_EXAMPLE = {
     "genero": {
         "m": {"count": 6000, "percent": 60.0},
@@ -38,10 +83,133 @@ CUSTOMER_PROFILE_EXAMPLE = {
 
 DATASET_STATUS_EXAMPLE_LOADED = {
     "loaded": True,
+    "dataset_id": "20260103T120000000000_1a2b3c4d",
+    "versao": 2,
     "arquivo_original": "vendas_ficticias_10000_linhas.csv",
-    "uploaded_at": "2026-01-03T00:00:00Z",
+    "uploaded_at": "2026-01-03T12:00:00+00:00",
     "linhas_processadas": 10000,
     "colunas": ["id_transacao", "data_venda", "valor_final"],
+    "datasets": [
+        {
+            "dataset_id": "20260103T120000000000_1a2b3c4d",
+            "arquivo_original": "vendas_ficticias_10000_linhas.csv",
+            "uploaded_at": "2026-01-03T12:00:00+00:00",
+            "linhas_processadas": 10000,
+            "versao": 2,
+            "padrao": True,
+        },
+        {
+            "dataset_id": "20260102T090000000000_5e6f7a8b",
+            "arquivo_original": "vendas_dezembro.csv",
+            "uploaded_at": "2026-01-02T09:00:00+00:00",
+            "linhas_processadas": 8000,
+            "versao": 1,
+            "padrao": False,
+        },
+    ],
+}
+
+DATASET_STATS_EXAMPLE = {
+    "memoria": {
+        "orcamento_mb": 512,
+        "em_uso_mb": 1.52,
+        "datasets": [
+            {
+                "dataset_id": "20260103T120000000000_1a2b3c4d",
+                "em_memoria": True,
+                "memoria_mb": 1.52,
+                "ultimo_acesso": "2026-01-03T12:05:00+00:00",
+            },
+            {
+                "dataset_id": "20260102T090000000000_5e6f7a8b",
+                "em_memoria": False,
+                "memoria_mb": 0.0,
+                "ultimo_acesso": None,
+            },
+        ],
+    },
+    "cache": {
+        "hits": 120,
+        "misses": 8,
+        "evictions": 0,
+        "expired": 2,
+        "invalidations": 1,
+        "hit_rate": 0.9375,
+        "entradas": 6,
+        "max_entradas": 256,
+        "tamanho_mb": 0.004,
+        "max_mb": 64,
+        "ttl_segundos": 300,
+    },
+}
+
+UPLOAD_ACCEPTED_EXAMPLE = {
+    "status": "pendente",
+    "job_id": "3f2b9c0e8d4a4f7e9b1c2d3e4f5a6b7c",
+    "dataset_id": "20260103T120000000000_1a2b3c4d",
+    "arquivo_original": "vendas_ficticias_10000_linhas.csv",
+    "acompanhar_em": "/upload/jobs/3f2b9c0e8d4a4f7e9b1c2d3e4f5a6b7c",
+}
+
+UPLOAD_JOB_EXAMPLE = {
+    "job_id": "3f2b9c0e8d4a4f7e9b1c2d3e4f5a6b7c",
+    "arquivo_original": "vendas_ficticias_10000_linhas.csv",
+    "status": "sucesso",
+    "stage": "concluido",
+    "linhas_processadas": 10000,
+    "linhas_por_segundo": 85000.0,
+    "created_at": "2026-01-03T00:00:00+00:00",
+    "started_at": "2026-01-03T00:00:00.010000+00:00",
+    "finished_at": "2026-01-03T00:00:00.127000+00:00",
+    "erro": None,
+    "resultado": {
+        "status": "sucesso",
+        "dataset_id": "20260103T120000000000_1a2b3c4d",
+        "versao": 2,
+        "linhas_processadas": 10000,
+        "arquivo_original": "vendas_ficticias_10000_linhas.csv",
+    },
 }
 
 DOWNLOAD_ERROR_EXAMPLE = {"detail": "Formato inválido. Use format=json ou format=pdf."}
+
+EXPORT_JOB_EXAMPLE = {
+    "status": "pendente",
+    "job_id": "9f1c2e7a4b5d4c3e8a6f0b1d2c3e4f5a",
+    "dataset_id": "20260103T120000000000_1a2b3c4d",
+    "formato": "pdf",
+    "acompanhar_em": "/reports/exports/9f1c2e7a4b5d4c3e8a6f0b1d2c3e4f5a",
+}
+
+EXPORT_LIST_EXAMPLE = {
+    "total": 1,
+    "exports": [
+        {
+            "export_id": "5d41402abc4b2a76b9719d911017c5925d41402abc4b2a76b9719d911017c592",
+            "formato": "pdf",
+            "dataset_id": "20260103T120000000000_1a2b3c4d",
+            "versao": 3,
+            "filtros": {"estado": ["sp"]},
+            "tamanho_bytes": 46764,
+            "created_at": "2026-01-03T12:00:02+00:00",
+            "accessed_at": "2026-01-03T12:10:00+00:00",
+            "download_em": "/reports/exports/5d41402abc4b2a76b9719d911017c5925d41402abc4b2a76b9719d911017c592",
+        }
+    ],
+}
+
+EXPORT_STATUS_EXAMPLE = {
+    "job_id": "9f1c2e7a4b5d4c3e8a6f0b1d2c3e4f5a",
+    "arquivo_original": "report.pdf",
+    "status": "processando",
+    "stage": "rendering",
+    "linhas_processadas": 1180,
+    "linhas_por_segundo": 2950.0,
+    "created_at": "2026-01-03T12:00:00+00:00",
+    "started_at": "2026-01-03T12:00:00.050000+00:00",
+    "finished_at": None,
+    "erro": None,
+    "resultado": None,
+}
+
+DATASET_EXPORT_ERROR_EXAMPLE = {"detail": "Formato parquet indisponível: instale o pacote pyarrow no servidor."}
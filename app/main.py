@@ -1,28 +1,47 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
 from app.api.routes.upload import router as upload_router
 from app.api.routes.reports import router as reports_router
 from app.api.routes.dataset import router as dataset_router
 
+from app.core.compression import CompressionMiddleware
+from app.core.config import COMPRESSION_MIN_BYTES
 from app.core.logging import setup_logging
+from app.core.responses import FastJSONResponse
+import app.core.storage as storage
+from app.services.report_export import shutdown_render_pool
 
 tags_metadata = [
     {"name": "upload", "description": "Endpoints de entrada e validação de dados (upload)."},
     {"name": "reports", "description": "Relatórios analíticos (vendas, finanças, produtos, região, clientes)."},
-    {"name": "dataset", "description": "Status e informações do dataset carregado em memória."},
+    {"name": "dataset", "description": "Status e informações dos datasets carregados."},
     {"name": "default", "description": "Endpoints básicos (ex: health check)."},
 ]
 
+setup_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm start: volta a servir os datasets gravados, sem reprocessar os CSVs
+    storage.restore_snapshots()
+    yield
+    shutdown_render_pool()
+
+
 app = FastAPI(
     title="Hanami Analytics API",
     version="0.1.0",
     description="API para processamento de CSV/XLSX e geração de relatórios analíticos.",
     openapi_tags=tags_metadata,
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
-
-setup_logging()
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
 
 
 @app.get(
@@ -0,0 +1,231 @@
+"""
+Consultas em lote (POST /reports/batch).
+
+Cada consulta é {"id", "report", "params"}: report é um dos relatórios GET (sales-summary,
+regional-performance, ...) e params são os mesmos query params dele, incluindo os filtros comuns.
+
+1. Todas as consultas são validadas e normalizadas (filtros como ReportFilters, demais
+   parâmetros com os valores padrão). Erros ficam no resultado da consulta, sem derrubar o lote.
+2. Consultas iguais depois da normalização são calculadas uma vez só.
+3. Consultas com os mesmos filtros de valor (regiao, estado, ...) que pedem duas ou mais das
+   seções do relatório consolidado (vendas, finanças, regiões, clientes) saem de uma única
+   passada do motor em report_engine (um filtro, arrays compartilhados), que calcula só as
+   seções pedidas; os resultados entram no cache de cada seção. Só com período (ou sem
+   filtros) cada seção já é barata (somas diárias acumuladas, cubo) e não há o que fundir.
+4. O restante usa as funções de seção normais, que também compartilham o cache.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable
+
+from loguru import logger
+
+from app.core.cache import cached
+from app.services.report_builder import (
+    customers_section,
+    financial_section,
+    pivot_section,
+    products_section,
+    regional_section,
+    sales_section,
+    timeseries_section,
+)
+from app.services.report_engine import compute_report_sections
+from app.utils.columnar import columns_to_records
+from app.utils.filters import FILTER_PARAMS, ReportFilters, build_report_filters
+
+if TYPE_CHECKING:
+    from app.core.storage import DatasetState
+
+# Seções que o motor do relatório consolidado calcula numa passada: report -> (chave no motor, nome no cache)
+FUSED_REPORTS = {
+    "sales-summary": ("sales_summary", "sales_summary"),
+    "financial-metrics": ("financial_metrics", "financial_metrics"),
+    "regional-performance": ("regional_performance", "regional_performance"),
+    "customer-profile": ("customer_profile", "customer_profile"),
+}
+
+# Parâmetros (além dos filtros) aceitos por relatório, com os valores padrão dos endpoints GET
+REPORT_PARAMS: dict[str, dict[str, Any]] = {
+    "sales-summary": {},
+    "financial-metrics": {},
+    "customer-profile": {},
+    "regional-performance": {"layout": "linhas"},
+    "product-analysis": {"sort_by": "total_arrecadado", "order": "desc", "layout": "linhas", "limit": None, "offset": 0},
+    "timeseries": {"granularity": "month", "metric": "valor_final", "dimension": None},
+    "pivot": {"dimensions": None, "measures": ["valor_final:sum", "count"], "layout": "linhas"},
+}
+
+_LIST_PARAMS = {"dimensions", "measures"}
+_INT_PARAMS = {"limit", "offset"}
+
+
+@dataclass(frozen=True)
+class BatchQuery:
+    """Consulta normalizada: relatório, filtros e demais parâmetros (tupla ordenada, hashable)."""
+
+    report: str
+    filters: ReportFilters
+    options: tuple[tuple[str, Any], ...]
+
+    def filters_key(self) -> tuple:
+        return tuple(sorted(self.filters.cache_params().items()))
+
+    def key(self) -> tuple:
+        return (self.report, self.filters_key(), self.options)
+
+
+def _as_list(value: Any) -> list[str]:
+    items = value if isinstance(value, list) else [value]
+    return [str(item) for item in items if item is not None]
+
+
+def parse_query(report: str, params: dict[str, Any] | None) -> BatchQuery:
+    """Valida e normaliza uma consulta do lote. Levanta ValueError com a mensagem para o cliente."""
+    report = (report or "").strip().lower()
+    if report not in REPORT_PARAMS:
+        raise ValueError(f"Relatório inválido: {report}. Use {', '.join(REPORT_PARAMS)}.")
+
+    params = dict(params or {})
+    defaults = REPORT_PARAMS[report]
+
+    unknown = [k for k in params if k not in defaults and k not in FILTER_PARAMS and k not in ("start_date", "end_date")]
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos para {report}: {unknown}")
+
+    filters = build_report_filters(
+        params.pop("start_date", None),
+        params.pop("end_date", None),
+        {name: _as_list(params.pop(name)) for name in list(params) if name in FILTER_PARAMS},
+    )
+
+    options = {}
+    for name, default in defaults.items():
+        value = params.get(name, default)
+        if name in _LIST_PARAMS:
+            value = tuple(item.strip() for v in _as_list(value) for item in v.split(",") if item.strip()) or None
+        elif name in _INT_PARAMS and value is not None:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"Parâmetro {name} deve ser inteiro.") from None
+            if value < (1 if name == "limit" else 0):
+                raise ValueError(f"Parâmetro {name} fora do intervalo.")
+        elif isinstance(value, str):
+            value = value.strip().lower() or default
+        options[name] = value
+
+    if report == "pivot" and not options["dimensions"]:
+        raise ValueError("Informe ao menos uma dimensão (ex: dimensions=regiao).")
+    return BatchQuery(report=report, filters=filters, options=tuple(options.items()))
+
+
+def _run_single(ds: DatasetState, query: BatchQuery) -> Any:
+    filters, opts = query.filters, dict(query.options)
+
+    runners: dict[str, Callable[[], Any]] = {
+        "sales-summary": lambda: sales_section(ds, filters),
+        "financial-metrics": lambda: financial_section(ds, filters),
+        "customer-profile": lambda: customers_section(ds, filters),
+        "regional-performance": lambda: regional_section(ds, filters, layout=opts.get("layout", "linhas")),
+        "product-analysis": lambda: products_section(ds, filters, **opts)[0],
+        "timeseries": lambda: timeseries_section(ds, filters, **opts),
+        "pivot": lambda: _run_pivot(ds, filters, opts),
+    }
+    return runners[query.report]()
+
+
+def _run_pivot(ds: DatasetState, filters: ReportFilters, opts: dict) -> Any:
+    columns = pivot_section(ds, filters, list(opts["dimensions"]), list(opts["measures"] or ()))
+    return columns if opts["layout"] == "colunas" else columns_to_records(columns)
+
+
+def _regional_columns(regional: dict) -> dict[str, list]:
+    """{regiao: métricas} do motor -> formato colunar guardado no cache da seção de regiões."""
+    return {
+        "regiao": list(regional),
+        **{field: [m[field] for m in regional.values()] for field in ("total_vendas", "numero_transacoes", "media_por_transacao")},
+    }
+
+
+def _fused_results(ds: DatasetState, queries: list[BatchQuery]) -> tuple[dict[tuple, Any], int]:
+    """
+    Para cada conjunto de filtros de valor com 2+ seções do motor consolidado, calcula as
+    seções pedidas numa passada. Devolve {chave da consulta: resultado} e quantas passadas
+    foram feitas; as seções também entram no cache (para os GETs e lotes seguintes).
+    """
+    by_filters: dict[tuple, list[BatchQuery]] = {}
+    for query in queries:
+        if query.report in FUSED_REPORTS:
+            by_filters.setdefault(query.filters_key(), []).append(query)
+
+    results: dict[tuple, Any] = {}
+    passes = 0
+    for group in by_filters.values():
+        filters = group[0].filters
+        reports = {q.report for q in group}
+        # Só com período, vendas sai das somas diárias e as demais do cubo: fundir não economiza nada
+        if len(reports) < 2 or not filters.values:
+            continue
+
+        sections, _ = compute_report_sections(ds, filters, [FUSED_REPORTS[r][0] for r in reports])
+        passes += 1
+
+        for query in group:
+            section_key, cache_name = FUSED_REPORTS[query.report]
+            value = sections[section_key]
+            if query.report == "regional-performance":
+                columns = _regional_columns(value)
+                cached(ds, cache_name, filters.cache_params(), lambda v=columns: v)
+                value = columns if dict(query.options).get("layout") == "colunas" else value
+            else:
+                cached(ds, cache_name, filters.cache_params(), lambda v=value: v)
+            results[query.key()] = value
+    return results, passes
+
+
+def run_batch(ds: DatasetState, items: list[tuple[str | None, str, dict[str, Any] | None]]) -> list[dict]:
+    """
+    Executa as consultas (id, report, params) sobre o mesmo dataset e devolve um resultado
+    por consulta, na ordem recebida: {"id", "report", "status", "resultado"} ou {"id", "report", "status", "erro"}.
+    """
+    parsed: list[BatchQuery | ValueError] = []
+    for _, report, params in items:
+        try:
+            parsed.append(parse_query(report, params))
+        except ValueError as e:
+            parsed.append(e)
+
+    valid = [q for q in parsed if isinstance(q, BatchQuery)]
+    unique = {q.key(): q for q in valid}
+
+    # Falha na passada única (ex: coluna ausente) não derruba o lote: cada seção reporta o próprio erro
+    try:
+        fused, passes = _fused_results(ds, list(unique.values()))
+    except ValueError as e:
+        logger.warning(f"Lote: passada única falhou, seguindo por seção. erro={str(e)}")
+        fused, passes = {}, 0
+
+    results: dict[tuple, Any] = {key: ("ok", value) for key, value in fused.items()}
+    for key, query in unique.items():
+        if key in results:
+            continue
+        try:
+            results[key] = ("ok", _run_single(ds, query))
+        except ValueError as e:
+            results[key] = ("erro", str(e))
+
+    out = []
+    for (query_id, report, _), query in zip(items, parsed):
+        entry: dict[str, Any] = {"id": query_id, "report": (report or "").strip().lower()}
+        if isinstance(query, ValueError):
+            entry.update({"status": 422, "erro": str(query)})
+        else:
+            kind, value = results[query.key()]
+            entry.update({"status": 200, "resultado": value} if kind == "ok" else {"status": 422, "erro": value})
+        out.append(entry)
+
+    logger.info(f"Lote executado. consultas={len(items)} unicas={len(unique)} passadas_unicas={passes}")
+    return out
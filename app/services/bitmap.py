@@ -0,0 +1,105 @@
+"""
+Índices bitmap para os filtros dos relatórios.
+
+Para cada coluna filtrável (categórica) e cada valor do dicionário da coluna há um bitset
+compactado (np.packbits): 1 bit por linha, ligado quando a linha tem aquele valor. O índice
+é uma tabela com uma coluna uint8 por (coluna, código da categoria), chamada "<coluna>#<código>".
+
+Um filtro vira operações bit a bit sobre bytes: OR entre os valores de uma mesma coluna e AND
+entre colunas. Com o frame ordenado por data (sort_by_date), o período vira um intervalo de
+linhas [lo, hi) e só os bytes desse intervalo entram na conta.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from app.utils.filters import SORTED_BY_ATTR, ReportFilters, date_range_bounds, filter_by_date_range
+
+BITMAP_TABLE = "bitmaps"
+
+
+def _bitmap_name(col: str, code: int) -> str:
+    return f"{col}#{code}"
+
+
+def build_bitmaps(df: pd.DataFrame | None, columns: list[str]) -> pd.DataFrame | None:
+    """Bitsets por valor das colunas categóricas informadas (colunas ausentes ou não categóricas ficam de fora)."""
+    if df is None:
+        return None
+
+    bitmaps = {}
+    for col in columns:
+        if col not in df.columns or not isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        codes = df[col].cat.codes.to_numpy()
+        for code in range(len(df[col].cat.categories)):
+            bitmaps[_bitmap_name(col, code)] = np.packbits(codes == code)
+
+    if not bitmaps:
+        return None
+    return pd.DataFrame(bitmaps, copy=False)
+
+
+def _column_bits(df: pd.DataFrame, bitmaps: pd.DataFrame | None, col: str, values: tuple[str, ...], b0: int, b1: int) -> np.ndarray:
+    """OR dos bitsets dos valores pedidos, só nos bytes [b0, b1). Sem índice, compara a coluna."""
+    series = df[col]
+
+    if bitmaps is not None and isinstance(series.dtype, pd.CategoricalDtype) and _bitmap_name(col, 0) in bitmaps.columns:
+        bits = np.zeros(b1 - b0, dtype=np.uint8)
+        categories = series.cat.categories
+        for value in values:
+            if value in categories:
+                bits |= bitmaps[_bitmap_name(col, categories.get_loc(value))].to_numpy()[b0:b1]
+        return bits
+
+    # Sem índice (ex: snapshot antigo): compara a faixa de linhas e compacta do mesmo jeito
+    rows = series.iloc[b0 * 8 : b1 * 8]
+    return np.packbits(rows.isin(values).to_numpy())
+
+
+def select_positions(df: pd.DataFrame, bitmaps: pd.DataFrame | None, filters: ReportFilters) -> np.ndarray:
+    """Posições (0..len-1, crescentes) das linhas do frame que atendem os filtros."""
+    missing = [col for col in filters.values if col not in df.columns]
+    if missing:
+        raise ValueError(f"Filtro indisponível. Colunas ausentes: {missing}")
+
+    sorted_by_date = df.attrs.get(SORTED_BY_ATTR) == "data_venda" and "data_venda" in df.columns
+    has_dates = filters.start is not None or filters.end is not None
+
+    if has_dates and sorted_by_date:
+        lo, hi = date_range_bounds(df["data_venda"].to_numpy(), filters.start, filters.end)
+    else:
+        lo, hi = 0, len(df)
+
+    if not filters.values:
+        positions = np.arange(lo, hi)
+    else:
+        b0, b1 = lo // 8, (hi + 7) // 8
+        bits = None
+        for col, values in filters.values.items():
+            col_bits = _column_bits(df, bitmaps, col, values, b0, b1)
+            bits = col_bits if bits is None else bits & col_bits
+
+        mask = np.unpackbits(bits, count=(b1 - b0) * 8)[lo - b0 * 8 : hi - b0 * 8]
+        positions = np.flatnonzero(mask) + lo
+
+    # Frame fora de ordem (snapshot antigo): o período é filtrado por comparação
+    if has_dates and not sorted_by_date and "data_venda" in df.columns:
+        dates = df["data_venda"].to_numpy()[positions]
+        keep = np.ones(len(positions), dtype=bool)
+        if filters.start is not None:
+            keep &= dates >= pd.Timestamp(filters.start).to_datetime64()
+        if filters.end is not None:
+            keep &= dates <= pd.Timestamp(filters.end).to_datetime64()
+        positions = positions[keep]
+    return positions
+
+
+def select_rows(df: pd.DataFrame, bitmaps: pd.DataFrame | None, filters: ReportFilters) -> pd.DataFrame:
+    """Linhas do frame que atendem os filtros (período + valores por coluna)."""
+    # Só período num frame ordenado: fatia contínua, sem copiar
+    if not filters.values and df.attrs.get(SORTED_BY_ATTR) == "data_venda" and "data_venda" in df.columns:
+        return filter_by_date_range(df, "data_venda", filters.start, filters.end)
+    return df.take(select_positions(df, bitmaps, filters))
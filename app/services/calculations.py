@@ -1,6 +1,11 @@
 from __future__ import annotations
+from datetime import date
+
 import pandas as pd
 
+from app.services.cube import is_cube, transaction_count
+from app.utils.filters import date_range_bounds
+
 
 """
     Calcula:
@@ -15,7 +20,33 @@ def calculate_sales_metrics(df: pd.DataFrame) -> dict:
         return {"total_vendas": 0.0, "numero_transacoes": 0, "media_por_transacao": 0.0}
 
     total_vendas = float(df["valor_final"].fillna(0).sum())
-    numero_transacoes = int(len(df))
+    numero_transacoes = transaction_count(df)
+    media_por_transacao = float(total_vendas / numero_transacoes) if numero_transacoes > 0 else 0.0
+
+    return {
+        "total_vendas": total_vendas,
+        "numero_transacoes": numero_transacoes,
+        "media_por_transacao": media_por_transacao,
+    }
+
+def sales_metrics_from_daily(daily: pd.DataFrame, start: date | None = None, end: date | None = None) -> dict:
+    """
+    Mesmas métricas de calculate_sales_metrics, a partir da tabela diária acumulada
+    (ver build_daily_totals): duas buscas binárias e uma subtração por medida.
+    """
+    if start is None and end is None:
+        lo, hi = 0, len(daily)
+    else:
+        lo, hi = date_range_bounds(daily["data_venda"].to_numpy(), start, end)
+
+    if hi <= lo:
+        return {"total_vendas": 0.0, "numero_transacoes": 0, "media_por_transacao": 0.0}
+
+    valor = daily["valor_final_acumulado"].to_numpy()
+    transacoes = daily["transacoes_acumuladas"].to_numpy()
+
+    total_vendas = float(valor[hi - 1] - (valor[lo - 1] if lo > 0 else 0.0))
+    numero_transacoes = int(transacoes[hi - 1] - (transacoes[lo - 1] if lo > 0 else 0))
     media_por_transacao = float(total_vendas / numero_transacoes) if numero_transacoes > 0 else 0.0
 
     return {
@@ -41,8 +72,12 @@ def calculate_financial_metrics(df: pd.DataFrame) -> dict:
 
     receita_liquida = float(df["valor_final"].fillna(0).sum())
 
-    margem = pd.to_numeric(df["margem_lucro"], errors="coerce").fillna(0) / 100.0
-    lucro_bruto = float((df["valor_final"].fillna(0) * margem).sum())
+    if is_cube(df):
+        # O cubo já guarda valor_final * margem somado por célula
+        lucro_bruto = float(df["lucro_bruto"].sum())
+    else:
+        margem = pd.to_numeric(df["margem_lucro"], errors="coerce").fillna(0) / 100.0
+        lucro_bruto = float((df["valor_final"].fillna(0) * margem).sum())
 
     custo_total = float(receita_liquida - lucro_bruto)
 
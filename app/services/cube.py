@@ -0,0 +1,159 @@
+"""
+Cubo de agregados do dataset, calculado uma vez por upload.
+
+Cada linha do cubo é uma combinação dia × regiao × estado_cliente × nome_produto × canal_venda
+com as somas de valor_final, quantidade e lucro_bruto (valor_final * margem_lucro/100) e a
+quantidade de transações. As colunas de dimensão e de medida têm os mesmos nomes das colunas
+do dataset, então os filtros (filter_by_date_range, select_rows) e os cálculos de
+app/services funcionam igual sobre o cubo ou sobre as linhas brutas; só a contagem de
+transações muda (soma de CUBE_COUNT_COLUMN em vez do número de linhas, ver transaction_count).
+
+Filtros sobre colunas que não são dimensão do cubo precisam das linhas brutas (ver report_source).
+
+Além do cubo há a tabela diária: uma linha por dia (ordenada, dias sem data no final) com as
+somas acumuladas de valor_final, transações, quantidade e lucro. A soma de qualquer intervalo de datas é a
+diferença entre duas posições achadas por busca binária: O(log dias), sem varrer linhas.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pandas as pd
+
+from app.services.bitmap import select_rows
+from app.utils.filters import SORTED_BY_ATTR, ReportFilters
+
+if TYPE_CHECKING:
+    from app.core.storage import DatasetState
+
+
+CUBE_DIMENSIONS = ["data_venda", "regiao", "estado_cliente", "nome_produto", "canal_venda"]
+CUBE_COUNT_COLUMN = "transacoes"
+CUBE_TABLE = "cube"
+CUBE_BITMAP_TABLE = "cube_bitmaps"
+DAILY_TABLE = "daily"
+
+# Colunas de filtro que também são dimensões do cubo (têm índice bitmap no próprio cubo)
+CUBE_FILTER_COLUMNS = ["estado_cliente", "regiao", "canal_venda"]
+
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame | None:
+    """Agrega o dataset no cubo. Retorna None se faltar alguma coluna (as consultas usam as linhas brutas)."""
+    needed = CUBE_DIMENSIONS + ["valor_final", "quantidade", "margem_lucro"]
+    if df is None or any(col not in df.columns for col in needed):
+        return None
+
+    valor = df["valor_final"].fillna(0)
+    margem = pd.to_numeric(df["margem_lucro"], errors="coerce").fillna(0) / 100.0
+
+    frame = pd.DataFrame(
+        {
+            **{col: df[col] for col in CUBE_DIMENSIONS},
+            "data_venda": df["data_venda"].dt.normalize(),
+            "valor_final": valor,
+            "quantidade": df["quantidade"],
+            "lucro_bruto": valor * margem,
+        }
+    )
+
+    # sort=False mantém a ordem de primeira aparição: com o dataset ordenado por data
+    # (sort_by_date) o cubo também sai ordenado por data
+    cube = (
+        frame.groupby(CUBE_DIMENSIONS, dropna=False, observed=True, sort=False)
+        .agg(
+            valor_final=("valor_final", "sum"),
+            quantidade=("quantidade", "sum"),
+            lucro_bruto=("lucro_bruto", "sum"),
+            **{CUBE_COUNT_COLUMN: ("valor_final", "size")},
+        )
+        .reset_index()
+    )
+
+    cube.attrs = {SORTED_BY_ATTR: "data_venda"} if df.attrs.get(SORTED_BY_ATTR) == "data_venda" else {}
+    return cube
+
+
+# Medidas diárias acumuladas: coluna da medida -> coluna acumulada na tabela diária
+DAILY_MEASURES = {
+    "valor_final": "valor_final_acumulado",
+    "transacoes": "transacoes_acumuladas",
+    "quantidade": "quantidade_acumulada",
+    "lucro": "lucro_acumulado",
+}
+
+
+def daily_measures(df: pd.DataFrame) -> pd.DataFrame | None:
+    """
+    Medidas por linha com a data truncada no dia: valor_final, transacoes, quantidade e lucro.
+    Aceita as linhas brutas ou o cubo. Retorna None se faltar data_venda ou valor_final.
+    """
+    if df is None or any(col not in df.columns for col in ["data_venda", "valor_final"]):
+        return None
+
+    valor = df["valor_final"].fillna(0)
+    if is_cube(df):
+        transacoes, lucro = df[CUBE_COUNT_COLUMN], df["lucro_bruto"]
+    else:
+        transacoes = pd.Series(1, index=df.index)
+        margem = pd.to_numeric(df["margem_lucro"], errors="coerce").fillna(0) / 100.0 if "margem_lucro" in df.columns else 0.0
+        lucro = valor * margem
+    quantidade = pd.to_numeric(df["quantidade"], errors="coerce").fillna(0) if "quantidade" in df.columns else 0
+
+    return pd.DataFrame(
+        {
+            "data_venda": df["data_venda"].dt.normalize(),
+            "valor_final": valor,
+            "transacoes": transacoes,
+            "quantidade": quantidade,
+            "lucro": lucro,
+        },
+        index=df.index,
+    )
+
+
+def build_daily_totals(df: pd.DataFrame) -> pd.DataFrame | None:
+    """
+    Tabela diária com somas acumuladas (valor_final_acumulado, transacoes_acumuladas,
+    quantidade_acumulada, lucro_acumulado). Aceita as linhas brutas ou o cubo.
+    A linha de data nula (se houver) fica por último e só conta nas consultas sem filtro de data.
+    """
+    measures = daily_measures(df)
+    if measures is None:
+        return None
+
+    daily = measures.groupby("data_venda", dropna=False, sort=True).sum().reset_index()
+
+    for col, acc in DAILY_MEASURES.items():
+        daily[acc] = daily[col].cumsum()
+    daily.attrs = {}
+    return daily[["data_venda", *DAILY_MEASURES.values()]]
+
+
+def is_cube(df: pd.DataFrame) -> bool:
+    return CUBE_COUNT_COLUMN in df.columns
+
+
+def transaction_count(df: pd.DataFrame) -> int:
+    """Número de transações: linhas do dataset bruto ou soma das contagens do cubo."""
+    if is_cube(df):
+        return int(df[CUBE_COUNT_COLUMN].sum())
+    return int(len(df))
+
+
+def report_source(ds: DatasetState, filters: ReportFilters | None = None, raw: bool = False) -> pd.DataFrame:
+    """
+    Frame que responde a consulta, já filtrado: o cubo, se existir e todas as colunas filtradas
+    forem dimensões dele; senão as linhas brutas do dataset. raw=True força as linhas brutas
+    (relatórios que dependem de colunas fora do cubo).
+    """
+    filters = filters or ReportFilters()
+
+    if not raw and ds.cube is not None and all(col in CUBE_DIMENSIONS for col in filters.columns()):
+        frame, bitmaps = ds.cube, ds.cube_bitmaps
+    else:
+        frame, bitmaps = ds.df, ds.bitmaps
+
+    if filters.is_empty():
+        return frame
+    return select_rows(frame, bitmaps, filters)
@@ -1,7 +1,13 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
+from app.services.cube import CUBE_COUNT_COLUMN, is_cube
+from app.utils.columnar import columns_to_records, empty_columns, frame_to_columns
+
+REGIONAL_COLUMNS = {"regiao": str, "total_vendas": float, "numero_transacoes": int, "media_por_transacao": float}
+
 
 def _require_columns(df: pd.DataFrame, cols: list[str]) -> None:
     missing = [c for c in cols if c not in df.columns]
@@ -9,6 +15,17 @@ def _require_columns(df: pd.DataFrame, cols: list[str]) -> None:
         raise ValueError(f"Arquivo inválido. Colunas ausentes: {missing}")
 
 
+def _value_counts(series: pd.Series) -> pd.Series:
+    """
+    Contagem por valor. Em colunas categóricas o value_counts também lista categorias
+    sem ocorrência (ex: após um filtro), então elas são removidas.
+    """
+    counts = series.value_counts(dropna=False)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        counts = counts[counts > 0]
+    return counts
+
+
 def regional_metrics(df: pd.DataFrame) -> list[dict]:
     """
     Agrupa por regiao e calcula métricas por região.
@@ -23,39 +40,50 @@ def regional_metrics(df: pd.DataFrame) -> list[dict]:
       }, ...
     ]
     """
+    return columns_to_records(regional_metrics_columns(df))
+
+
+def regional_metrics_columns(df: pd.DataFrame) -> dict[str, list]:
+    """Mesmo resultado de regional_metrics no formato colunar: {"regiao": [...], "total_vendas": [...], ...}."""
     if df is None or df.empty:
-        return []
+        return empty_columns(REGIONAL_COLUMNS)
 
     _require_columns(df, ["regiao", "valor_final"])
 
+    # No cubo cada linha já agrega várias transações
+    numero_transacoes = (CUBE_COUNT_COLUMN, "sum") if is_cube(df) else ("valor_final", "size")
+
     grouped = (
-        df.groupby("regiao", dropna=False)
+        df.groupby("regiao", dropna=False, observed=True)
         .agg(
             total_vendas=("valor_final", "sum"),
-            numero_transacoes=("valor_final", "size"),
+            numero_transacoes=numero_transacoes,
         )
         .reset_index()
     )
 
-    grouped["total_vendas"] = pd.to_numeric(grouped["total_vendas"], errors="coerce").fillna(0).astype(float)
-    grouped["numero_transacoes"] = pd.to_numeric(grouped["numero_transacoes"], errors="coerce").fillna(0).astype(int)
-    grouped["media_por_transacao"] = grouped.apply(
-        lambda r: float(r["total_vendas"] / r["numero_transacoes"]) if r["numero_transacoes"] > 0 else 0.0,
-        axis=1,
-    )
+    total = pd.to_numeric(grouped["total_vendas"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    count = pd.to_numeric(grouped["numero_transacoes"], errors="coerce").fillna(0).to_numpy(dtype=np.int64)
+    grouped["total_vendas"] = total
+    grouped["numero_transacoes"] = count
+    grouped["media_por_transacao"] = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
 
     # Ordena por total_vendas desc (mais relevante primeiro)
     grouped = grouped.sort_values(by="total_vendas", ascending=False)
 
-    return [
+    return frame_to_columns(grouped, REGIONAL_COLUMNS)
+
+
+def _distribution(counts: pd.Series, key_field: str, total: int) -> list[dict]:
+    """Contagens por valor -> [{key_field: valor, "count": n, "percent": p}, ...], convertendo em bloco."""
+    values = counts.to_numpy(dtype=np.int64)
+    return columns_to_records(
         {
-            "regiao": str(row["regiao"]),
-            "total_vendas": float(row["total_vendas"]),
-            "numero_transacoes": int(row["numero_transacoes"]),
-            "media_por_transacao": float(row["media_por_transacao"]),
+            key_field: counts.index.astype(str).tolist(),
+            "count": values.tolist(),
+            "percent": (values / total * 100).tolist(),
         }
-        for _, row in grouped.iterrows()
-    ]
+    )
 
 
 def customer_distribution(df: pd.DataFrame) -> dict:
@@ -81,18 +109,10 @@ def customer_distribution(df: pd.DataFrame) -> dict:
 
     total = int(len(df)) if len(df) > 0 else 1
 
-    # 1) Gênero
-    genero_series = df["genero_cliente"].astype(str).str.strip().str.lower()
-    genero_counts = genero_series.value_counts(dropna=False)
+    # 1) Gênero (coluna já normalizada pelo parser; value_counts roda sobre os códigos da categoria)
+    genero_counts = _value_counts(df["genero_cliente"])
 
-    genero = [
-        {
-            "genero_cliente": str(idx),
-            "count": int(cnt),
-            "percent": float((cnt / total) * 100),
-        }
-        for idx, cnt in genero_counts.items()
-    ]
+    genero = _distribution(genero_counts, "genero_cliente", total)
 
     # 2) Faixa etária
     idade = pd.to_numeric(df["idade_cliente"], errors="coerce")
@@ -104,27 +124,12 @@ def customer_distribution(df: pd.DataFrame) -> dict:
     faixa = pd.cut(idade, bins=bins, labels=labels, include_lowest=True)
     faixa_counts = faixa.value_counts(dropna=False).reindex(labels, fill_value=0)
 
-    faixa_etaria = [
-        {
-            "faixa": str(idx),
-            "count": int(cnt),
-            "percent": float((cnt / total) * 100),
-        }
-        for idx, cnt in faixa_counts.items()
-    ]
+    faixa_etaria = _distribution(faixa_counts, "faixa", total)
 
     # 3) Cidade
-    cidade_series = df["cidade_cliente"].astype(str).str.strip()
-    cidade_counts = cidade_series.value_counts(dropna=False)
+    cidade_counts = _value_counts(df["cidade_cliente"])
 
-    cidade = [
-        {
-            "cidade_cliente": str(idx),
-            "count": int(cnt),
-            "percent": float((cnt / total) * 100),
-        }
-        for idx, cnt in cidade_counts.items()
-    ]
+    cidade = _distribution(cidade_counts, "cidade_cliente", total)
 
     return {
         "genero": genero,
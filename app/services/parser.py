@@ -1,84 +1,60 @@
 from __future__ import annotations
 
+import io
+import multiprocessing
+import shutil
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
+from typing import BinaryIO, Callable
 import pandas as pd
 
-from fastapi import UploadFile
-import tempfile
-
+from app.core.config import PARSE_WORKERS, UPLOAD_DIR
 
 from app.core.errors import DataValidationError
+from app.services.schema import (
+    EXPECTED_COLUMNS,
+    CRITICAL_COLUMNS,
+    TEXT_COLUMNS,
+    NUMERIC_COLUMNS,
+    DATE_COLUMNS,
+    DATE_FORMAT,
+    ID_COLUMNS,
+    SCHEMA_BY_NAME,
+    is_schema_column,
+    read_options,
+)
 from app.utils.validators import (
     require_columns,
     clean_nulls,
     coerce_numeric,
     coerce_datetime,
-    normalize_text,
+    narrow_numeric,
+    to_categorical,
+    encode_prefixed_ids,
+    concat_frames,
 )
 
-EXPECTED_COLUMNS = [
-    "valor_final",
-    "idade_cliente",
-    "data_venda",
-    "canal_venda",
-]
-
-CRITICAL_COLUMNS = [
-    "valor_final",
-]
-
-TEXT_COLUMNS = [
-    "canal_venda",
-    "forma_pagamento",
-    "regiao",
-    "status_entrega",
-    "genero_cliente",
-    "cidade_cliente",
-    "estado_cliente",
-    "categoria",
-    "marca",
-    "nome_produto",
-]
-
-NUMERIC_COLUMNS = [
-   "valor_final",
-   "idade_cliente",
-   "subtotal",
-   "desconto_percent",
-   "preco_unitario",
-   "quantidade",
-   "margem_lucro",
-   "renda_estimada",
-   "tempo_entrega_dias", 
-]
-
-DATE_COLUMNS = [
-    "data_venda",
-]
-
-
-def read_file_to_dataframe(file_path: str | Path) -> pd.DataFrame:
-    """
-    Lê CSV ou XLSX e retorna um DataFrame já validado e padronizado.
-    Levanta DataValidationError com mensagem clara em caso de problema.
-    """
-    path = Path(file_path)
+# Quantidade de linhas lidas por vez na ingestão em streaming de CSV
+CSV_CHUNK_ROWS = 100_000
 
-    if not path.exists():
-        raise DataValidationError(f"Arquivo não encontrado: {path}")
+# Arquivos menores que isso são lidos em streaming mesmo com PARSE_WORKERS > 1
+# (o custo de distribuir entre processos não compensa)
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
 
-    suffix = path.suffix.lower()
+# Callback de progresso: (etapa, linhas processadas até agora)
+ProgressCallback = Callable[[str, int], None]
+
+_PROCESS_POOL: ProcessPoolExecutor | None = None
+_PROCESS_POOL_WORKERS = 0
 
-    try:
-        if suffix == ".csv":
-            df = pd.read_csv(path)
-        elif suffix in [".xlsx", ".xls"]:
-            df = pd.read_excel(path)
-        else:
-            raise DataValidationError("Formato inválido. Envie um arquivo .csv ou .xlsx")
-    except Exception as e:
-        raise DataValidationError(f"Falha ao ler o arquivo. Detalhe: {str(e)}")
 
+def _standardize_dataframe(df: pd.DataFrame, on_stage: Callable[[str], None] | None = None) -> pd.DataFrame:
+    """
+    Valida e padroniza um DataFrame (arquivo inteiro ou um chunk dele).
+    Levanta DataValidationError se faltar alguma coluna esperada.
+    on_stage (opcional) é chamado no início das etapas "coercing" e "normalizing".
+    """
     # Padroniza nomes de colunas (evita erro por espaços ou case)
     df.columns = [str(c).strip() for c in df.columns]
 
@@ -88,53 +64,306 @@ def read_file_to_dataframe(file_path: str | Path) -> pd.DataFrame:
     except ValueError as e:
         raise DataValidationError(str(e))
 
-    # Limpeza de nulos em colunas críticas
-    df = clean_nulls(df, critical_cols=CRITICAL_COLUMNS, drop_if_null=True)
+    if on_stage:
+        on_stage("coercing")
 
-    # Conversão de tipos: numéricos
+    # Conversão de tipos: numéricos (só colunas que vieram como texto por conter valores inválidos)
     for col in NUMERIC_COLUMNS:
         if col in df.columns:
             df = coerce_numeric(df, col)
 
-    # Conversão de tipos: datas
+    # Conversão de tipos: datas, no formato exato do schema
     for col in DATE_COLUMNS:
         if col in df.columns:
-            df = coerce_datetime(df, col)
+            df = coerce_datetime(df, col, fmt=DATE_FORMAT)
+
+    # Remove linhas nulas ou que ficaram inválidas nas colunas críticas
+    df = clean_nulls(df, critical_cols=CRITICAL_COLUMNS, drop_if_null=True)
+
+    # Larguras numéricas declaradas no schema
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df = narrow_numeric(df, col, SCHEMA_BY_NAME[col].dtype)
 
-    # Depois das conversões, removemos linhas que ficaram inválidas nas críticas
-    df = df.dropna(subset=CRITICAL_COLUMNS)
+    if on_stage:
+        on_stage("normalizing")
 
-    # Padronização de texto
+    # Padronização de texto, guardado como categoria (poucos valores distintos por coluna)
     for col in TEXT_COLUMNS:
         if col in df.columns:
-            df[col] = normalize_text(df[col])
+            df[col] = to_categorical(df[col])
+
+    # IDs prefixo+número viram inteiros (o prefixo fica em df.attrs)
+    for col in ID_COLUMNS:
+        if col in df.columns:
+            df = encode_prefixed_ids(df, col)
+
+    # Colunas fora do schema ficam como vieram no arquivo; texto guardado como categoria
+    for col in df.columns:
+        if not is_schema_column(col) and not pd.api.types.is_numeric_dtype(df[col].dtype):
+            df[col] = df[col].astype("category")
 
     return df
 
-async def parse_upload_to_dataframe(file: UploadFile) -> pd.DataFrame:
+
+def read_csv_stream_to_dataframe(
+    stream: BinaryIO,
+    chunk_rows: int = CSV_CHUNK_ROWS,
+    progress: ProgressCallback | None = None,
+    names: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Lê um CSV direto de um stream binário em chunks de até chunk_rows linhas.
+    Cada chunk é validado e padronizado antes de ler o próximo, então o pico de memória
+    fica próximo do tamanho do DataFrame final (sem cópias extras do arquivo bruto).
+    Se names for informado, o stream não tem cabeçalho (ex: um pedaço do arquivo).
+    """
+    header_kwargs = {"header": None, "names": names} if names is not None else {}
+    options = read_options()
+    chunks: list[pd.DataFrame] = []
+    rows = 0
+
+    def report(stage: str) -> None:
+        if progress:
+            progress(stage, rows)
+
+    try:
+        report("reading")
+        for chunk in pd.read_csv(stream, chunksize=chunk_rows, **header_kwargs, **options):
+            chunks.append(_standardize_dataframe(chunk, on_stage=report))
+            rows += len(chunk)
+            report("reading")
+    except DataValidationError:
+        raise
+    except Exception as e:
+        raise DataValidationError(f"Falha ao ler o arquivo. Detalhe: {str(e)}")
+
+    return concat_frames(chunks)
+
+
+class _ByteRangeReader(io.RawIOBase):
+    """Expõe apenas o intervalo [start, end) de um arquivo como um stream."""
+
+    def __init__(self, path: str, start: int, end: int):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        view = memoryview(buffer)[: self._remaining]
+        n = self._file.readinto(view)
+        self._remaining -= n
+        return n
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+def _parse_byte_range(path: str, start: int, end: int, names: list[str]) -> pd.DataFrame:
     """
-    Recebe UploadFile (FastAPI), salva temporariamente e reutiliza read_file_to_dataframe
-    para validar e padronizar.
+    Executado nos processos do pool: lê e padroniza um intervalo de linhas do CSV.
     """
-    suffix = Path(file.filename).suffix.lower()
+    with io.BufferedReader(_ByteRangeReader(path, start, end)) as stream:
+        return read_csv_stream_to_dataframe(stream, names=names)
+
+
+def _split_line_ranges(path: Path, parts: int) -> tuple[int, list[tuple[int, int]]]:
+    """
+    Divide o arquivo (sem o cabeçalho) em até `parts` intervalos de bytes alinhados
+    ao início de linha. Retorna (tamanho do cabeçalho, intervalos).
+    """
+    size = path.stat().st_size
+
+    with path.open("rb") as f:
+        f.readline()
+        header_end = f.tell()
+
+        boundaries = [header_end]
+        body = size - header_end
+        for i in range(1, parts):
+            f.seek(max(header_end + (body * i) // parts - 1, boundaries[-1]))
+            f.readline()
+            boundaries.append(min(f.tell(), size))
+        boundaries.append(size)
+
+    ranges = [(a, b) for a, b in zip(boundaries, boundaries[1:]) if b > a]
+    return header_end, ranges
+
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    global _PROCESS_POOL, _PROCESS_POOL_WORKERS
+
+    if _PROCESS_POOL is None or _PROCESS_POOL_WORKERS != workers:
+        if _PROCESS_POOL is not None:
+            _PROCESS_POOL.shutdown(wait=False)
+        # spawn: o processo da API tem threads (uvicorn, jobs), então evitamos fork
+        _PROCESS_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _PROCESS_POOL_WORKERS = workers
+
+    return _PROCESS_POOL
+
+
+def read_csv_parallel_to_dataframe(
+    file_path: str | Path,
+    workers: int,
+    progress: ProgressCallback | None = None,
+) -> pd.DataFrame:
+    """
+    Lê um CSV em paralelo: o arquivo é dividido em intervalos de bytes alinhados por linha,
+    cada processo do pool faz parse + conversões do seu intervalo e os resultados são
+    concatenados na ordem original.
+
+    Limitação: campos entre aspas contendo quebra de linha não são suportados nesse modo.
+    """
+    path = Path(file_path)
+
+    try:
+        with path.open("rb") as f:
+            names = [str(c) for c in pd.read_csv(f, nrows=0).columns]
+    except Exception as e:
+        raise DataValidationError(f"Falha ao ler o arquivo. Detalhe: {str(e)}")
+
+    # Valida o cabeçalho antes de distribuir o trabalho
+    _standardize_dataframe(pd.DataFrame(columns=names))
+
+    _, ranges = _split_line_ranges(path, workers)
+    if not ranges:
+        return _standardize_dataframe(pd.DataFrame(columns=names))
+
+    pool = _get_process_pool(workers)
+    futures = {pool.submit(_parse_byte_range, str(path), start, end, names): i for i, (start, end) in enumerate(ranges)}
+
+    if progress:
+        progress("reading", 0)
+
+    parts: list[pd.DataFrame | None] = [None] * len(ranges)
+    rows = 0
+    try:
+        for future in as_completed(futures):
+            part = future.result()
+            parts[futures[future]] = part
+            rows += len(part)
+            if progress:
+                progress("coercing", rows)
+    except DataValidationError:
+        raise
+    except Exception as e:
+        raise DataValidationError(f"Falha ao ler o arquivo. Detalhe: {str(e)}")
+
+    return concat_frames(parts)
+
+
+def read_file_to_dataframe(
+    file_path: str | Path,
+    workers: int | None = None,
+    progress: ProgressCallback | None = None,
+) -> pd.DataFrame:
+    """
+    Lê CSV ou XLSX e retorna um DataFrame já validado e padronizado.
+    Levanta DataValidationError com mensagem clara em caso de problema.
+
+    workers: processos usados no parse de CSV (padrão: PARSE_WORKERS). Com 1 (ou arquivos
+    pequenos) a leitura é feita em streaming, por chunks, no processo atual.
+    """
+    path = Path(file_path)
+
+    if not path.exists():
+        raise DataValidationError(f"Arquivo não encontrado: {path}")
+
+    suffix = path.suffix.lower()
+    workers = PARSE_WORKERS if workers is None else workers
+
+    if suffix == ".csv":
+        if workers > 1 and path.stat().st_size >= PARALLEL_MIN_BYTES:
+            return read_csv_parallel_to_dataframe(path, workers, progress=progress)
+        with path.open("rb") as f:
+            return read_csv_stream_to_dataframe(f, progress=progress)
+
+    if suffix not in [".xlsx", ".xls"]:
+        raise DataValidationError("Formato inválido. Envie um arquivo .csv ou .xlsx")
+
+    try:
+        df = pd.read_excel(path, **read_options())
+    except Exception as e:
+        raise DataValidationError(f"Falha ao ler o arquivo. Detalhe: {str(e)}")
+
+    return _standardize_dataframe(df)
+
+
+def check_upload_format(filename: str | None) -> str:
+    """
+    Valida a extensão do arquivo enviado e retorna o sufixo (ex: ".csv").
+    """
+    suffix = Path(filename or "").suffix.lower()
 
     if suffix not in [".csv", ".xlsx", ".xls"]:
         raise DataValidationError("Formato inválido. Envie um arquivo .csv ou .xlsx")
 
-    # Salva temporariamente para reutilizar a mesma rotina de validação
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        tmp_path = Path(tmp.name)
-        content = await file.read()
-        tmp.write(content)
+    return suffix
+
+
+def _stream_size(stream: BinaryIO) -> int:
+    pos = stream.tell()
+    size = stream.seek(0, io.SEEK_END)
+    stream.seek(pos)
+    return size
+
+
+def _parse_stream_in_parallel(stream: BinaryIO, progress: ProgressCallback | None) -> pd.DataFrame:
+    """
+    O modo paralelo precisa de um caminho no disco que os processos do pool consigam abrir:
+    copia o stream (em blocos, sem carregá-lo em memória) para UPLOAD_DIR e remove no final.
+    """
+    upload_dir = Path(UPLOAD_DIR)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    path = upload_dir / f"upload_{uuid.uuid4().hex}.csv"
 
     try:
-        df = read_file_to_dataframe(tmp_path)
-        return df
+        with path.open("wb") as f:
+            shutil.copyfileobj(stream, f, length=1024 * 1024)
+        return read_csv_parallel_to_dataframe(path, PARSE_WORKERS, progress=progress)
     finally:
-        # remove o arquivo temporário
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+        path.unlink(missing_ok=True)
+
+
+def parse_stream_to_dataframe(
+    stream: BinaryIO,
+    filename: str | None,
+    progress: ProgressCallback | None = None,
+) -> pd.DataFrame:
+    """
+    Faz o parse direto de um stream binário (ex: arquivo do upload), sem gravar
+    uma cópia temporária nem carregar o arquivo inteiro em memória.
+    Síncrono e CPU-bound: deve rodar fora do event loop.
+    """
+    suffix = check_upload_format(filename)
+
+    stream.seek(0)
+
+    if suffix == ".csv":
+        if PARSE_WORKERS > 1 and _stream_size(stream) >= PARALLEL_MIN_BYTES:
+            return _parse_stream_in_parallel(stream, progress)
+        return read_csv_stream_to_dataframe(stream, progress=progress)
+
+    # XLSX não tem leitura incremental; lê direto do stream do upload
+    if progress:
+        progress("reading", 0)
+
+    try:
+        df = pd.read_excel(stream, **read_options())
+    except Exception as e:
+        raise DataValidationError(f"Falha ao ler o arquivo. Detalhe: {str(e)}")
+
+    total_rows = len(df)
 
+    def report(stage: str) -> None:
+        if progress:
+            progress(stage, total_rows)
 
+    return _standardize_dataframe(df, on_stage=report)
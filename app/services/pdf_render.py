@@ -0,0 +1,148 @@
+"""
+Renderização do PDF do relatório consolidado.
+
+Recebe o corpo do relatório (report_builder.report_body) e não depende do dataset nem do estado da API:
+roda nos processos do pool de renderização (ver report_export). O gráfico usa a API
+orientada a objetos do matplotlib (Figure + FigureCanvasAgg), sem o estado global do pyplot.
+"""
+
+from __future__ import annotations
+
+from io import BytesIO
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+
+
+def _make_region_bar_chart(regional_performance: dict) -> BytesIO:
+    """
+    Gera um gráfico de barras (vendas por região) e devolve em BytesIO (PNG).
+    """
+    regions = list(regional_performance.keys())
+    values = [float(regional_performance[r]["total_vendas"]) for r in regions]
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    ax.bar(regions, values)
+    ax.set_title("Vendas por Região")
+    ax.set_xlabel("Região")
+    ax.set_ylabel("Total de Vendas")
+    ax.tick_params(axis="x", labelrotation=30)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment("right")
+    fig.tight_layout()
+
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=150)
+    buf.seek(0)
+    return buf
+
+
+def render_report_pdf(report: dict) -> bytes:
+    """
+    Cria um PDF com:
+    - título e metadados
+    - tabela (vendas por região)
+    - gráfico (barras de vendas por região)
+    """
+    buffer = BytesIO()
+    # invariant: sem data de criação nem ID aleatório no arquivo; o mesmo relatório dá os mesmos bytes
+    doc = SimpleDocTemplate(buffer, pagesize=A4, title="Hanami Report", invariant=1)
+
+    styles = getSampleStyleSheet()
+    story = []
+
+    # Título
+    story.append(Paragraph("Relatório Analítico", styles["Title"]))
+    story.append(Spacer(1, 0.4 * cm))
+
+    # Metadados
+    meta = (
+        f"<b>Dataset:</b> {report['dataset_id']} (versão {report['dataset_version']})<br/>"
+        f"<b>Arquivo:</b> {report['arquivo_original']}<br/>"
+        f"<b>Linhas processadas:</b> {report['linhas_processadas']}"
+    )
+    if report.get("filtros"):
+        filtros = "; ".join(f"{k}={v}" for k, v in report["filtros"].items())
+        meta += f"<br/><b>Filtros:</b> {filtros}"
+    story.append(Paragraph(meta, styles["Normal"]))
+    story.append(Spacer(1, 0.5 * cm))
+
+    # Métricas principais
+    sales = report["sales_summary"]
+    finance = report["financial_metrics"]
+
+    story.append(Paragraph("Métricas principais", styles["Heading2"]))
+    story.append(Spacer(1, 0.2 * cm))
+
+    story.append(
+        Paragraph(
+            f"Total de vendas: {float(sales['total_vendas']):.2f}<br/>"
+            f"Número de transações: {int(sales['numero_transacoes'])}<br/>"
+            f"Média por transação: {float(sales['media_por_transacao']):.2f}<br/>"
+            f"Receita líquida: {float(finance['receita_liquida']):.2f}<br/>"
+            f"Lucro bruto: {float(finance['lucro_bruto']):.2f}<br/>"
+            f"Custo total: {float(finance['custo_total']):.2f}",
+            styles["Normal"],
+        )
+    )
+    story.append(Spacer(1, 0.6 * cm))
+
+    # Tabela: vendas por região
+    story.append(Paragraph("Vendas por região", styles["Heading2"]))
+    story.append(Spacer(1, 0.2 * cm))
+
+    regional = report["regional_performance"]
+    if not regional:
+        raise ValueError(
+            "Sem dados regionais para gerar o PDF. Verifique se a coluna 'regiao' existe e se há linhas válidas."
+        )
+
+    data = [["Região", "Total de Vendas", "Transações", "Média/Transação"]]
+    for regiao, m in regional.items():
+        data.append(
+            [
+                str(regiao),
+                f"{float(m['total_vendas']):.2f}",
+                str(int(m["numero_transacoes"])),
+                f"{float(m['media_por_transacao']):.2f}",
+            ]
+        )
+
+    table = Table(data, hAlign="LEFT")
+    table.setStyle(
+        TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("PADDING", (0, 0), (-1, -1), 6),
+            ]
+        )
+    )
+    story.append(table)
+    story.append(Spacer(1, 0.6 * cm))
+
+    # Gráfico: barras por região
+    story.append(Paragraph("Gráfico: vendas por região", styles["Heading2"]))
+    story.append(Spacer(1, 0.2 * cm))
+
+    chart_buf = _make_region_bar_chart(regional)
+    chart_img = Image(chart_buf, width=16 * cm, height=9 * cm)
+    story.append(chart_img)
+
+    # Build
+    doc.build(story)
+
+    pdf_bytes = buffer.getvalue()
+    buffer.close()
+    return pdf_bytes
@@ -0,0 +1,267 @@
+"""
+Agrupamento genérico (pivot) sobre as linhas do dataset.
+
+Cada dimensão vira um array de códigos inteiros (0 = nulo): colunas categóricas reaproveitam
+os códigos da categoria; as demais são fatoradas uma vez. Os códigos das dimensões são
+combinados numa chave única (base mista: código_1 * k_2 * ... + código_n) e np.unique dá o
+id do grupo de cada linha, com os grupos já na ordem das dimensões.
+
+Os ids de grupo do dataset inteiro ficam em cache por (dataset, versão, dimensões): com
+filtros, basta indexar esse array pelas posições das linhas selecionadas (select_positions).
+O storage esvazia esse cache junto com o de relatórios (nova versão) e descarta as entradas
+de um dataset descarregado da memória ou removido pela retenção (clear_groupings).
+As medidas são np.bincount (soma, contagem, média) ou reduceat sobre as linhas ordenadas por
+grupo (mínimo, máximo).
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import PIVOT_GROUP_CACHE_ENTRIES, PIVOT_MAX_GROUPS
+from app.services.bitmap import select_positions
+from app.utils.filters import FILTER_PARAMS, ReportFilters
+from app.utils.validators import ID_ENCODINGS_ATTR, decode_prefixed_ids
+
+if TYPE_CHECKING:
+    from app.core.storage import DatasetState
+
+AGGREGATIONS = ("sum", "count", "mean", "min", "max")
+COUNT_MEASURE = "transacoes"
+
+
+@dataclass(frozen=True)
+class Measure:
+    """Medida do pivot: agregação de uma coluna, ou contagem de linhas (column=None)."""
+
+    column: str | None
+    agg: str
+
+    @property
+    def name(self) -> str:
+        return COUNT_MEASURE if self.column is None else f"{self.column}_{self.agg}"
+
+
+@dataclass(frozen=True)
+class _Grouping:
+    gids: np.ndarray  # id do grupo de cada linha do dataset
+    keys: np.ndarray  # (grupos × dimensões): código de cada dimensão no grupo
+    labels: list[np.ndarray]  # por dimensão: rótulo de cada código (object)
+
+
+_GROUPINGS: OrderedDict[tuple, _Grouping] = OrderedDict()
+_LOCK = threading.Lock()
+
+
+def parse_measures(values: list[str], df: pd.DataFrame) -> list[Measure]:
+    """
+    "coluna:agregação" (ex: valor_final:sum) ou "count" (número de transações).
+    Levanta ValueError para coluna ausente/não numérica ou agregação desconhecida.
+    """
+    encoded = df.attrs.get(ID_ENCODINGS_ATTR) or {}
+    measures: list[Measure] = []
+
+    for raw in values:
+        item = raw.strip().lower()
+        if item == "count":
+            measure = Measure(None, "count")
+        else:
+            col, _, agg = item.partition(":")
+            col, agg = col.strip(), (agg.strip() or "sum")
+            if agg not in AGGREGATIONS:
+                raise ValueError(f"Agregação inválida: {agg}. Use {', '.join(AGGREGATIONS)}.")
+            if col not in df.columns:
+                raise ValueError(f"Medida inválida. Coluna ausente: {col}")
+            if col in encoded or not pd.api.types.is_numeric_dtype(df[col].dtype) or pd.api.types.is_bool_dtype(df[col].dtype):
+                raise ValueError(f"Medida inválida: {col} não é uma coluna numérica.")
+            measure = Measure(col, agg)
+
+        if measure not in measures:
+            measures.append(measure)
+
+    if not measures:
+        raise ValueError("Informe ao menos uma medida (ex: valor_final:sum ou count).")
+    return measures
+
+
+def resolve_dimensions(values: list[str], df: pd.DataFrame) -> list[str]:
+    """Nomes de coluna das dimensões (aceita também os nomes dos filtros, ex: estado)."""
+    dims: list[str] = []
+    for raw in values:
+        name = raw.strip().lower()
+        col = FILTER_PARAMS.get(name, name)
+        if col not in df.columns:
+            raise ValueError(f"Dimensão inválida. Coluna ausente: {name}")
+        if pd.api.types.is_float_dtype(df[col].dtype):
+            raise ValueError(f"Dimensão inválida: {name} é uma medida contínua e não pode ser agrupada.")
+        if col not in dims:
+            dims.append(col)
+
+    if not dims:
+        raise ValueError("Informe ao menos uma dimensão (ex: dimensions=regiao).")
+    return dims
+
+
+def _dimension_codes(df: pd.DataFrame, col: str) -> tuple[np.ndarray, np.ndarray]:
+    """Códigos (0 = nulo, 1..k) e rótulos (nativos, para JSON) de uma dimensão."""
+    series = df[col]
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy().astype(np.int64) + 1
+        labels = series.cat.categories.astype(str).tolist()
+    else:
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            series = series.dt.normalize()
+        codes, uniques = pd.factorize(series, sort=True, use_na_sentinel=True)
+        codes = codes.astype(np.int64) + 1
+        uniques = pd.Series(uniques)
+
+        spec = (df.attrs.get(ID_ENCODINGS_ATTR) or {}).get(col)
+        if spec:
+            labels = decode_prefixed_ids(uniques, spec["prefix"], spec["width"]).tolist()
+        elif pd.api.types.is_datetime64_any_dtype(uniques.dtype):
+            labels = uniques.dt.strftime("%Y-%m-%d").tolist()
+        else:
+            labels = uniques.tolist()
+
+    return codes, np.array([None, *labels], dtype=object)
+
+
+def _build_grouping(df: pd.DataFrame, dims: list[str]) -> _Grouping:
+    codes, labels = zip(*(_dimension_codes(df, col) for col in dims))
+    radices = [len(lab) for lab in labels]
+
+    if float(np.prod(radices, dtype=float)) < 2**62:
+        # Chave única em base mista (primeira dimensão mais significativa)
+        key = np.zeros(len(df), dtype=np.int64)
+        for c, k in zip(codes, radices):
+            key = key * k + c
+        uniq, gids = np.unique(key, return_inverse=True)
+
+        keys = np.empty((len(uniq), len(dims)), dtype=np.int64)
+        rest = uniq
+        for j in range(len(dims) - 1, -1, -1):
+            rest, keys[:, j] = np.divmod(rest, radices[j])
+    else:
+        keys, gids = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+
+    gids = gids.reshape(-1).astype(np.int32 if len(keys) < 2**31 else np.int64)
+    return _Grouping(gids=gids, keys=keys, labels=list(labels))
+
+
+def _grouping(ds: DatasetState, dims: list[str]) -> _Grouping:
+    """Ids de grupo do dataset inteiro para as dimensões, com cache LRU por (dataset, versão, dimensões)."""
+    if PIVOT_GROUP_CACHE_ENTRIES <= 0:
+        return _build_grouping(ds.df, dims)
+
+    key = (ds.dataset_id, ds.version, tuple(dims))
+    with _LOCK:
+        grouping = _GROUPINGS.get(key)
+        if grouping is not None:
+            _GROUPINGS.move_to_end(key)
+            return grouping
+
+    grouping = _build_grouping(ds.df, dims)
+
+    with _LOCK:
+        _GROUPINGS[key] = grouping
+        while len(_GROUPINGS) > PIVOT_GROUP_CACHE_ENTRIES:
+            _GROUPINGS.popitem(last=False)
+    return grouping
+
+
+def clear_groupings(dataset_id: str | None = None) -> None:
+    """Descarta os agrupamentos em cache (de um dataset, ou todos quando dataset_id=None)."""
+    with _LOCK:
+        if dataset_id is None:
+            _GROUPINGS.clear()
+            return
+        for key in [k for k in _GROUPINGS if k[0] == dataset_id]:
+            del _GROUPINGS[key]
+
+
+def _to_list(values: np.ndarray, integer: bool) -> list:
+    """Lista nativa; NaN (grupo sem valores) vira None."""
+    missing = np.isnan(values)
+    out = values.astype(np.int64).tolist() if integer and not missing.all() else values.tolist()
+    if missing.any():
+        for i in np.flatnonzero(missing):
+            out[i] = None
+    return out
+
+
+def pivot(
+    ds: DatasetState,
+    filters: ReportFilters,
+    dims: list[str],
+    measures: list[Measure],
+    max_groups: int = PIVOT_MAX_GROUPS,
+) -> dict[str, list]:
+    """
+    Agrupa as linhas (filtradas) pelas dimensões e calcula as medidas.
+    Retorna o formato colunar {dimensão: [...], medida: [...]}, grupos na ordem das dimensões.
+    Levanta ValueError se o resultado passar de max_groups grupos.
+    """
+    df = ds.df
+    grouping = _grouping(ds, dims)
+
+    positions = None if filters.is_empty() else select_positions(df, ds.bitmaps, filters)
+    gids = grouping.gids if positions is None else grouping.gids[positions]
+    n_groups = len(grouping.keys)
+
+    counts = np.bincount(gids, minlength=n_groups)
+    present = np.flatnonzero(counts)
+    if len(present) > max_groups:
+        raise ValueError(
+            f"Resultado com {len(present)} grupos excede o limite de {max_groups}. "
+            "Use menos dimensões ou mais filtros."
+        )
+
+    out: dict[str, list] = {
+        col: grouping.labels[j][grouping.keys[present, j]].tolist() for j, col in enumerate(dims)
+    }
+
+    order = None
+    for measure in measures:
+        if measure.column is None:
+            out[measure.name] = counts[present].tolist()
+            continue
+
+        series = df[measure.column]
+        values = series.to_numpy(dtype=float, na_value=np.nan)
+        if positions is not None:
+            values = values[positions]
+        valid = ~np.isnan(values)
+        integer = pd.api.types.is_integer_dtype(series.dtype)
+
+        if measure.agg in ("sum", "mean", "count"):
+            filled = np.where(valid, values, 0.0)
+            sums = np.bincount(gids, weights=filled, minlength=n_groups)[present]
+            non_null = np.bincount(gids, weights=valid, minlength=n_groups)[present]
+            if measure.agg == "sum":
+                out[measure.name] = _to_list(sums, integer)
+            elif measure.agg == "count":
+                out[measure.name] = non_null.astype(np.int64).tolist()
+            else:
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    out[measure.name] = _to_list(sums / non_null, False)
+            continue
+
+        # min/max: linhas ordenadas por grupo (uma vez), reduceat no início de cada grupo
+        if order is None:
+            order = np.argsort(gids, kind="stable")
+            sorted_gids = gids[order]
+            starts = np.flatnonzero(np.r_[True, sorted_gids[1:] != sorted_gids[:-1]]) if len(gids) else np.empty(0, dtype=np.int64)
+        reducer = np.fmin if measure.agg == "min" else np.fmax
+        result = np.full(n_groups, np.nan)
+        if len(starts):
+            result[sorted_gids[starts]] = reducer.reduceat(values[order], starts)
+        out[measure.name] = _to_list(result[present], integer)
+
+    return out
@@ -1,20 +1,85 @@
-from __future__ import annotations
-import pandas as pd
-
 """
-Retorna lista de produtos com:
+Análise de produtos: lista de produtos com
     - nome_produto
     - quantidade_vendida (soma de quantidade)
     - total_arrecadado (soma de valor_final)
 
     sort_by: "quantidade" | "total_arrecadado" | "nome"
     order: "asc" | "desc"
+    limit/offset: página da lista ordenada (limit=None devolve tudo a partir de offset)
+
+A ordem é total: empates são desfeitos pelo nome do produto, e "asc" é exatamente o inverso
+de "desc", então páginas consecutivas nunca repetem nem pulam produtos.
+
+Com limit, só os offset+limit primeiros são ordenados (seleção parcial com np.partition).
+Sem filtros, os totais e a ordem de cada critério vêm da tabela de produtos calculada no
+upload (build_product_table): a página é só uma fatia de um array, sem agrupar de novo.
 """
-def product_analysis(df: pd.DataFrame, sort_by: str = "total_arrecadado", order: str = "desc") -> list[dict]:
-   
-    if df is None or df.empty:
-        return []
 
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+from app.utils.columnar import columns_to_records, empty_columns, frame_to_columns
+
+PRODUCT_COLUMNS = {"nome_produto": str, "quantidade_vendida": int, "total_arrecadado": float}
+PRODUCTS_TABLE = "products"
+
+SORT_COLUMNS = {
+    "quantidade": "quantidade_vendida",
+    "total_arrecadado": "total_arrecadado",
+    "nome": "nome_produto",
+}
+
+
+def _normalize_sort(sort_by: str, order: str) -> tuple[str, bool]:
+    """(critério válido de SORT_COLUMNS, desc?)"""
+    sort_key = (sort_by or "").strip().lower()
+    if sort_key not in SORT_COLUMNS:
+        sort_key = "total_arrecadado"
+    return sort_key, (order or "desc").strip().lower() != "asc"
+
+
+def _rank_key(totals: pd.DataFrame, sort_col: str) -> np.ndarray:
+    """Chave numérica do critério (maior = primeiro em desc). Nome: posição na ordem alfabética, nulo por último em asc."""
+    if sort_col != "nome_produto":
+        return totals[sort_col].to_numpy(dtype=float)
+
+    names = totals["nome_produto"]
+    if isinstance(names.dtype, pd.CategoricalDtype):
+        codes = names.cat.codes.to_numpy().astype(np.int64)
+        codes[codes < 0] = len(names.cat.categories)
+    else:
+        codes = names.rank(method="dense", na_option="bottom").to_numpy(dtype=np.int64)
+    return codes.astype(float)
+
+
+def _name_tiebreak(totals: pd.DataFrame) -> np.ndarray:
+    return _rank_key(totals, "nome_produto")
+
+
+def top_k_order(key: np.ndarray, tiebreak: np.ndarray, k: int | None, descending: bool = True) -> np.ndarray:
+    """
+    Posições dos k primeiros por key (desc) com empate pelo menor tiebreak; asc é o inverso exato.
+    Só os candidatos até o k-ésimo valor são ordenados (np.partition), não o array inteiro.
+    """
+    n = len(key)
+    primary, secondary = (-key, tiebreak) if descending else (key, -tiebreak)
+
+    if k is None or k >= n:
+        return np.lexsort((secondary, primary))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    kth = np.partition(primary, k - 1)[k - 1]
+    candidates = np.flatnonzero(primary <= kth)
+    order = candidates[np.lexsort((secondary[candidates], primary[candidates]))]
+    return order[:k]
+
+
+def product_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """Totais por produto (sem ordenação): nome_produto, quantidade_vendida, total_arrecadado."""
     # Garantias mínimas
     required = ["nome_produto", "quantidade", "valor_final"]
     for col in required:
@@ -22,7 +87,7 @@ def product_analysis(df: pd.DataFrame, sort_by: str = "total_arrecadado", order:
             raise ValueError(f"Arquivo inválido. Coluna ausente para análise de produtos: {col}")
 
     grouped = (
-        df.groupby("nome_produto", dropna=False)
+        df.groupby("nome_produto", dropna=False, observed=True)
         .agg(
             quantidade_vendida=("quantidade", "sum"),
             total_arrecadado=("valor_final", "sum"),
@@ -33,27 +98,77 @@ def product_analysis(df: pd.DataFrame, sort_by: str = "total_arrecadado", order:
     # Normaliza tipos
     grouped["quantidade_vendida"] = pd.to_numeric(grouped["quantidade_vendida"], errors="coerce").fillna(0).astype(int)
     grouped["total_arrecadado"] = pd.to_numeric(grouped["total_arrecadado"], errors="coerce").fillna(0).astype(float)
+    return grouped
+
+
+def build_product_table(df: pd.DataFrame | None) -> pd.DataFrame | None:
+    """
+    Tabela de produtos do upload: totais + a ordem completa (desc) de cada critério de
+    ordenação, em colunas "ordem_<sort_by>". Retorna None se faltar alguma coluna.
+    """
+    if df is None or any(col not in df.columns for col in ["nome_produto", "quantidade", "valor_final"]):
+        return None
+
+    table = product_totals(df)
+    tiebreak = _name_tiebreak(table)
+    for sort_by, sort_col in SORT_COLUMNS.items():
+        table[f"ordem_{sort_by}"] = top_k_order(_rank_key(table, sort_col), tiebreak, None)
+    return table
+
+
+def _page(positions: np.ndarray, offset: int, limit: int | None) -> np.ndarray:
+    return positions[offset : None if limit is None else offset + limit]
 
-    # Ordenação
-    sort_by = (sort_by or "").strip().lower()
-    order = (order or "desc").strip().lower()
-
-    sort_map = {
-        "quantidade": "quantidade_vendida",
-        "total_arrecadado": "total_arrecadado",
-        "nome": "nome_produto",
-    }
-    sort_col = sort_map.get(sort_by, "total_arrecadado")
-    ascending = True if order == "asc" else False
-
-    grouped = grouped.sort_values(by=sort_col, ascending=ascending)
-
-    # Retorno em lista de dicts
-    return [
-        {
-            "nome_produto": str(row["nome_produto"]),
-            "quantidade_vendida": int(row["quantidade_vendida"]),
-            "total_arrecadado": float(row["total_arrecadado"]),
-        }
-        for _, row in grouped.iterrows()
-    ]
+
+def table_page_columns(
+    table: pd.DataFrame,
+    sort_by: str = "total_arrecadado",
+    order: str = "desc",
+    limit: int | None = None,
+    offset: int = 0,
+) -> dict[str, list]:
+    """Página a partir da tabela de produtos do upload (ordens já calculadas, sem agrupar)."""
+    sort_key, descending = _normalize_sort(sort_by, order)
+    positions = table[f"ordem_{sort_key}"].to_numpy()
+    if not descending:
+        positions = positions[::-1]
+    return frame_to_columns(table.take(_page(positions, offset, limit)), PRODUCT_COLUMNS)
+
+
+def totals_page_columns(
+    totals: pd.DataFrame,
+    sort_by: str = "total_arrecadado",
+    order: str = "desc",
+    limit: int | None = None,
+    offset: int = 0,
+) -> dict[str, list]:
+    """Página a partir dos totais de product_totals, ordenando só os offset+limit primeiros."""
+    sort_key, descending = _normalize_sort(sort_by, order)
+    k = None if limit is None else offset + limit
+    positions = top_k_order(_rank_key(totals, SORT_COLUMNS[sort_key]), _name_tiebreak(totals), k, descending=descending)
+
+    # Conversão para tipos nativos coluna a coluna
+    return frame_to_columns(totals.take(_page(positions, offset, limit)), PRODUCT_COLUMNS)
+
+
+def product_analysis(
+    df: pd.DataFrame,
+    sort_by: str = "total_arrecadado",
+    order: str = "desc",
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[dict]:
+    return columns_to_records(product_analysis_columns(df, sort_by=sort_by, order=order, limit=limit, offset=offset))
+
+
+def product_analysis_columns(
+    df: pd.DataFrame,
+    sort_by: str = "total_arrecadado",
+    order: str = "desc",
+    limit: int | None = None,
+    offset: int = 0,
+) -> dict[str, list]:
+    """Mesmo resultado de product_analysis no formato colunar: {"nome_produto": [...], ...}."""
+    if df is None or df.empty:
+        return empty_columns(PRODUCT_COLUMNS)
+    return totals_page_columns(product_totals(df), sort_by=sort_by, order=order, limit=limit, offset=offset)
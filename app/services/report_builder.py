@@ -1,49 +1,196 @@
+"""
+Seções dos relatórios, usadas tanto pelos endpoints /reports/* quanto pelo relatório consolidado.
+
+Cada seção passa pelo cache de resultados com a chave (dataset, seção, filtros normalizados).
+Seções tabulares (produtos, regiões) ficam em cache no formato colunar e são entregues por
+linhas (padrão) ou por colunas (layout="colunas").
+O relatório consolidado é calculado de uma vez pelo motor em report_engine (um filtro e uma
+passada pelas colunas para todas as seções) e fica em cache inteiro.
+"""
+
 from __future__ import annotations
 
+import time
 from datetime import datetime
+
+from loguru import logger
+
 import app.core.storage as storage
+from app.core.cache import cached
+from app.core.storage import DatasetState
+
+from app.services.cube import CUBE_DIMENSIONS, build_daily_totals, report_source
+from app.services.calculations import calculate_sales_metrics, calculate_financial_metrics, sales_metrics_from_daily
+from app.services.product_analysis import PRODUCT_COLUMNS, product_totals, table_page_columns, totals_page_columns
+from app.services.report_engine import compute_report_sections
+from app.services.demographics_region import customer_profile_as_object, regional_metrics_columns
+from app.utils.columnar import columns_to_records, empty_columns
+from app.services.pivot import parse_measures, pivot, resolve_dimensions
+from app.services.timeseries import build_daily_breakdown, timeseries
+from app.utils.filters import FILTER_PARAMS, ReportFilters
+
+
+def sales_section(ds: DatasetState, filters: ReportFilters) -> dict:
+    def compute() -> dict:
+        # Só período (ou nada): somas diárias acumuladas, duas buscas binárias
+        if ds.daily is not None and not filters.values:
+            return sales_metrics_from_daily(ds.daily, start=filters.start, end=filters.end)
+        return calculate_sales_metrics(report_source(ds, filters))
+
+    return cached(ds, "sales_summary", filters.cache_params(), compute)
+
+
+def financial_section(ds: DatasetState, filters: ReportFilters) -> dict:
+    return cached(ds, "financial_metrics", filters.cache_params(), lambda: calculate_financial_metrics(report_source(ds, filters)))
+
+
+def regional_section(ds: DatasetState, filters: ReportFilters, layout: str = "linhas") -> dict:
+    """Métricas por região como objeto {regiao: métricas} (ou colunas {"regiao": [...], ...})."""
+    columns = cached(ds, "regional_performance", filters.cache_params(), lambda: regional_metrics_columns(report_source(ds, filters)))
+    if layout == "colunas":
+        return columns
+    return {item.pop("regiao"): item for item in columns_to_records(columns)}
+
+
+def products_section(
+    ds: DatasetState,
+    filters: ReportFilters,
+    sort_by: str = "total_arrecadado",
+    order: str = "desc",
+    layout: str = "linhas",
+    limit: int | None = None,
+    offset: int = 0,
+) -> tuple[list[dict] | dict[str, list], int]:
+    """
+    Página de produtos (offset/limit sobre a lista ordenada) e o total de produtos da consulta.
+    Sem filtros a página sai da tabela de produtos do upload; com filtros os totais são
+    agrupados e só os offset+limit primeiros são ordenados.
+    """
+    if filters.is_empty() and ds.products is not None:
+        columns = table_page_columns(ds.products, sort_by=sort_by, order=order, limit=limit, offset=offset)
+        total = int(len(ds.products))
+    else:
+
+        def compute() -> dict:
+            source = report_source(ds, filters)
+            if source.empty:
+                return {"colunas": empty_columns(PRODUCT_COLUMNS), "total": 0}
+            totals = product_totals(source)
+            page = totals_page_columns(totals, sort_by=sort_by, order=order, limit=limit, offset=offset)
+            return {"colunas": page, "total": int(len(totals))}
+
+        page = cached(
+            ds,
+            "product_analysis",
+            {**filters.cache_params(), "sort_by": sort_by, "order": order, "limit": limit, "offset": offset},
+            compute,
+        )
+        columns, total = page["colunas"], page["total"]
+
+    return (columns if layout == "colunas" else columns_to_records(columns)), total
+
+
+def customers_section(ds: DatasetState, filters: ReportFilters) -> dict:
+    # Gênero, idade e cidade não são dimensões do cubo: usa as linhas brutas
+    return cached(ds, "customer_profile", filters.cache_params(), lambda: customer_profile_as_object(report_source(ds, filters, raw=True)))
 
-from app.services.calculations import calculate_sales_metrics, calculate_financial_metrics
-from app.services.product_analysis import product_analysis
-from app.services.demographics_region import customer_profile_as_object, regional_metrics
 
+def timeseries_section(
+    ds: DatasetState,
+    filters: ReportFilters,
+    granularity: str = "month",
+    metric: str = "valor_final",
+    dimension: str | None = None,
+) -> dict:
+    """
+    Série temporal da medida (ver app/services/timeseries.py). dimension é o nome do filtro
+    (ex: "estado"). Sem filtros de valor, sai das tabelas diárias acumuladas do upload; com
+    filtros de valor, as somas diárias são montadas a partir das linhas filtradas.
+    """
+    col = FILTER_PARAMS.get(dimension) if dimension else None
+    if dimension and col is None:
+        raise ValueError(f"Dimensão inválida: {dimension}. Use {', '.join(FILTER_PARAMS)}.")
+
+    def compute() -> dict:
+        daily, breakdown = ds.daily, ds.daily_breakdown(col) if col else None
+
+        if filters.values or daily is None or (col and breakdown is None):
+            # O período é aplicado pela própria série; aqui só os filtros de valor
+            value_filters = ReportFilters(values=filters.values)
+            source = report_source(ds, value_filters, raw=bool(col) and col not in CUBE_DIMENSIONS)
+            daily = build_daily_totals(source)
+            breakdown = build_daily_breakdown(source, col) if col else None
+
+        if daily is None or (col and breakdown is None):
+            raise ValueError("Série temporal indisponível: colunas ausentes no dataset.")
+        return timeseries(daily, granularity=granularity, metric=metric, start=filters.start, end=filters.end, breakdown=breakdown)
+
+    params = {**filters.cache_params(), "granularity": granularity, "metric": metric, "dimension": col}
+    return cached(ds, "timeseries", params, compute)
 
-def build_report_dict() -> dict:
+
+def pivot_section(ds: DatasetState, filters: ReportFilters, dimensions: list[str], measures: list[str]) -> dict[str, list]:
+    """Agrupamento genérico (ver app/services/pivot.py) no formato colunar."""
+    dims = resolve_dimensions(dimensions, ds.df)
+    parsed = parse_measures(measures, ds.df)
+
+    params = {**filters.cache_params(), "dimensions": ",".join(dims), "measures": ",".join(m.name for m in parsed)}
+    return cached(ds, "pivot", params, lambda: pivot(ds, filters, dims, parsed))
+
+
+def report_body(ds: DatasetState, filters: ReportFilters) -> tuple[dict, dict]:
+    """
+    Corpo do relatório consolidado (sem generated_at nem tempos_ms) e os tempos desta chamada.
+    O corpo fica em cache e é o mesmo para a mesma versão e filtros; os tempos são os das
+    seções quando o relatório foi calculado agora, ou {"cache": ms} quando saiu do cache.
+    """
+    computed: dict[str, float] = {}
+
+    def compute() -> dict:
+        body, timings = _build_report(ds, filters)
+        computed.update(timings)
+        return body
+
+    start = time.perf_counter()
+    body = cached(ds, "report", filters.cache_params(), compute)
+    return body, computed or {"cache": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def build_report_dict(ds: DatasetState | None = None, filters: ReportFilters | None = None) -> dict:
     """
     Montar um relatório consolidado em dict (pronto para JSON/PDF),
-    usando o dataset carregado em memória.
+    usando o dataset informado (ou o último upload, se ds for None).
     """
-    if storage.CURRENT_DATASET is None:
+    if ds is None:
+        ds = storage.get_dataset()
+    if ds is None:
         raise ValueError("Nenhum dataset carregado. Faça upload em /upload.")
 
-    df = storage.CURRENT_DATASET.df
-    now = datetime.utcnow().isoformat()
-
-    sales = calculate_sales_metrics(df)
-    finance = calculate_financial_metrics(df)
-
-    # regional_metrics retorna lista; converte para objeto por região
-    regional_list = regional_metrics(df)
-    regional_obj = {
-        item["regiao"]: {
-            "total_vendas": float(item["total_vendas"]),
-            "numero_transacoes": int(item["numero_transacoes"]),
-            "media_por_transacao": float(item["media_por_transacao"]),
-        }
-        for item in regional_list
-    }
+    body, timings = report_body(ds, filters or ReportFilters())
+    return {"generated_at": datetime.utcnow().isoformat(), **body, "tempos_ms": timings}
 
-    products = product_analysis(df, sort_by="total_arrecadado", order="desc")[:20]  # top 20
 
-    customers = customer_profile_as_object(df)
+def _build_report(ds: DatasetState, filters: ReportFilters) -> tuple[dict, dict]:
+    sections, timings = compute_report_sections(ds, filters)
 
-    return {
-        "generated_at": now,
-        "arquivo_original": storage.CURRENT_DATASET.filename,
-        "linhas_processadas": int(len(df)),
-        "sales_summary": sales,
-        "financial_metrics": finance,
-        "regional_performance": regional_obj,
-        "product_analysis_top20": products,
-        "customer_profile": customers,
+    report = {
+        "dataset_id": ds.dataset_id,
+        "dataset_version": ds.version,
+        "arquivo_original": ds.filename,
+        # Linhas que entraram no relatório (depois dos filtros)
+        "linhas_processadas": int(sections["sales_summary"]["numero_transacoes"]),
+        **sections,
     }
+
+    if not filters.is_empty():
+        report["filtros"] = filters.to_dict()
+
+    logger.info(f"Relatório consolidado calculado. dataset_id={ds.dataset_id} tempos_ms={timings}")
+    return report, timings
+
+
+def server_timing_header(timings: dict) -> dict:
+    """Header Server-Timing com o tempo de cada etapa (visível no DevTools do navegador)."""
+    if not timings:
+        return {}
+    return {"Server-Timing": ", ".join(f"{name};dur={ms}" for name, ms in timings.items())}
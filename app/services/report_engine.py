@@ -0,0 +1,205 @@
+"""
+Motor do relatório consolidado (/reports/download).
+
+Em vez de chamar cada serviço em sequência (cada um filtrando e varrendo o frame de novo), o
+motor filtra uma única vez e extrai uma vez os arrays usados por várias seções (valor_final
+sem nulos, contagem de transações, códigos das categorias). Os agrupamentos são np.bincount
+sobre os códigos das categorias, e o top 20 de produtos usa np.argpartition em vez de ordenar
+a lista inteira (sem filtros, a ordem já vem da tabela de produtos do upload).
+
+O resultado é o mesmo dos endpoints individuais (calculate_sales_metrics, regional_metrics, ...),
+mais o tempo gasto em cada seção (tempos_ms). O lote (app/services/batch.py) pede só as seções
+das suas consultas; as demais não são calculadas.
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Collection
+
+import numpy as np
+import pandas as pd
+
+from app.services.cube import CUBE_COUNT_COLUMN, is_cube, report_source
+from app.services.product_analysis import table_page_columns, top_k_order
+from app.utils.columnar import columns_to_records
+from app.utils.filters import ReportFilters
+
+if TYPE_CHECKING:
+    from app.core.storage import DatasetState
+
+
+TOP_PRODUCTS = 20
+
+REPORT_SECTIONS = ("sales_summary", "financial_metrics", "regional_performance", "product_analysis_top20", "customer_profile")
+
+AGE_BINS = np.array([0, 17, 24, 34, 44, 54, 64, 200])
+AGE_LABELS = ["0-17", "18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+
+
+class _Timer:
+    def __init__(self) -> None:
+        self.sections: dict[str, float] = {}
+
+    @contextmanager
+    def section(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.sections[name] = round((time.perf_counter() - start) * 1000, 3)
+
+
+def _require_columns(df: pd.DataFrame, cols: list[str]) -> None:
+    missing = [c for c in cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"Arquivo inválido. Colunas ausentes: {missing}")
+
+
+def _group_codes(series: pd.Series) -> tuple[np.ndarray, list[str]]:
+    """
+    Códigos de grupo (0 = valor nulo, 1..k = valores) e o rótulo de cada grupo.
+    Colunas categóricas reaproveitam os códigos já guardados; as demais são fatoradas.
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes, labels = series.cat.codes.to_numpy(), series.cat.categories
+    else:
+        codes, labels = pd.factorize(series, use_na_sentinel=True)
+    return codes.astype(np.int64) + 1, ["nan"] + [str(v) for v in labels]
+
+
+def _counts_by_value(series: pd.Series, total: int) -> dict:
+    """Contagem e percentual por valor (maior contagem primeiro), só valores presentes."""
+    codes, labels = _group_codes(series)
+    counts = np.bincount(codes, minlength=len(labels))
+    present = np.flatnonzero(counts)
+    present = present[np.argsort(-counts[present], kind="stable")]
+    return {labels[i]: {"count": int(counts[i]), "percent": float(counts[i] / total * 100)} for i in present}
+
+
+def _age_ranges(idade: pd.Series, total: int) -> dict:
+    """Mesmas faixas de pd.cut(bins=AGE_BINS, include_lowest=True); idades fora das faixas não contam."""
+    values = pd.to_numeric(idade, errors="coerce").to_numpy(dtype=float)
+    values = values[(values >= AGE_BINS[0]) & (values <= AGE_BINS[-1])]
+    counts = np.bincount(np.searchsorted(AGE_BINS[1:], values, side="left"), minlength=len(AGE_LABELS))
+    return {label: {"count": int(cnt), "percent": float(cnt / total * 100)} for label, cnt in zip(AGE_LABELS, counts)}
+
+
+def _top_products(source: pd.DataFrame, valor: np.ndarray) -> list[dict]:
+    """Top TOP_PRODUCTS por total_arrecadado, ordenando só os maiores."""
+    codes, labels = _group_codes(source["nome_produto"])
+    quantidade = np.nan_to_num(pd.to_numeric(source["quantidade"], errors="coerce").to_numpy(dtype=float))
+    arrecadado = np.bincount(codes, weights=valor, minlength=len(labels))
+    vendida = np.bincount(codes, weights=quantidade, minlength=len(labels))
+    linhas = np.bincount(codes, minlength=len(labels))
+    present = np.flatnonzero(linhas)
+
+    # Só os TOP_PRODUCTS maiores são ordenados; empates pela ordem do nome (código da categoria)
+    present = present[top_k_order(arrecadado[present], present.astype(float), TOP_PRODUCTS)]
+    return [
+        {
+            "nome_produto": labels[i],
+            "quantidade_vendida": int(vendida[i]),
+            "total_arrecadado": float(arrecadado[i]),
+        }
+        for i in present
+    ]
+
+
+def compute_report_sections(
+    ds: DatasetState, filters: ReportFilters, sections: Collection[str] | None = None
+) -> tuple[dict, dict]:
+    """
+    Calcula as seções do relatório consolidado numa passada (todas, ou só as de `sections`).
+    Retorna (seções, tempos em ms por seção).
+    """
+    wanted = set(sections or REPORT_SECTIONS)
+    timer = _Timer()
+    start = time.perf_counter()
+
+    with timer.section("filtro"):
+        # Vendas/finanças/regiões/produtos: cubo (se servir para os filtros); clientes: linhas brutas
+        source = report_source(ds, filters)
+        rows = source
+        if is_cube(source) and "customer_profile" in wanted:
+            rows = report_source(ds, filters, raw=True)
+
+    with timer.section("arrays"):
+        _require_columns(source, ["valor_final", "regiao", "nome_produto", "quantidade"])
+        valor = source["valor_final"].fillna(0).to_numpy(dtype=float)
+        if is_cube(source):
+            transacoes = source[CUBE_COUNT_COLUMN].to_numpy()
+            lucro = source["lucro_bruto"].to_numpy(dtype=float)
+        else:
+            transacoes = np.ones(len(source), dtype=np.int64)
+            _require_columns(source, ["margem_lucro"])
+            margem = pd.to_numeric(source["margem_lucro"], errors="coerce").fillna(0).to_numpy(dtype=float) / 100.0
+            lucro = valor * margem
+
+    with timer.section("sales_summary"):
+        total_vendas = float(valor.sum())
+        numero_transacoes = int(transacoes.sum())
+        sales = {
+            "total_vendas": total_vendas,
+            "numero_transacoes": numero_transacoes,
+            "media_por_transacao": float(total_vendas / numero_transacoes) if numero_transacoes > 0 else 0.0,
+        }
+
+    with timer.section("financial_metrics"):
+        lucro_bruto = float(lucro.sum())
+        finance = {
+            "receita_liquida": total_vendas,
+            "lucro_bruto": lucro_bruto,
+            "custo_total": float(total_vendas - lucro_bruto),
+        }
+
+    regional = products = customers = None
+
+    if "regional_performance" in wanted:
+        with timer.section("regional_performance"):
+            codes, labels = _group_codes(source["regiao"])
+            vendas = np.bincount(codes, weights=valor, minlength=len(labels))
+            contagem = np.bincount(codes, weights=transacoes, minlength=len(labels)).astype(np.int64)
+            present = np.flatnonzero(contagem)
+            present = present[np.argsort(-vendas[present], kind="stable")]
+            regional = {
+                labels[i]: {
+                    "total_vendas": float(vendas[i]),
+                    "numero_transacoes": int(contagem[i]),
+                    "media_por_transacao": float(vendas[i] / contagem[i]),
+                }
+                for i in present
+            }
+
+    if "product_analysis_top20" in wanted:
+        with timer.section("product_analysis_top20"):
+            if filters.is_empty() and ds.products is not None:
+                # Sem filtros: ordem pré-calculada no upload
+                products = columns_to_records(table_page_columns(ds.products, limit=TOP_PRODUCTS))
+            else:
+                products = _top_products(source, valor)
+
+    if "customer_profile" in wanted:
+        with timer.section("customer_profile"):
+            if rows.empty:
+                customers = {"genero": {}, "faixa_etaria": {}, "cidade": {}}
+            else:
+                _require_columns(rows, ["genero_cliente", "idade_cliente", "cidade_cliente"])
+                total = int(len(rows))
+                customers = {
+                    "genero": _counts_by_value(rows["genero_cliente"], total),
+                    "faixa_etaria": _age_ranges(rows["idade_cliente"], total),
+                    "cidade": _counts_by_value(rows["cidade_cliente"], total),
+                }
+
+    timer.sections["total"] = round((time.perf_counter() - start) * 1000, 3)
+
+    computed = {
+        "sales_summary": sales,
+        "financial_metrics": finance,
+        "regional_performance": regional,
+        "product_analysis_top20": products,
+        "customer_profile": customers,
+    }
+    return {name: value for name, value in computed.items() if name in wanted}, timer.sections
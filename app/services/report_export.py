@@ -1,155 +1,168 @@
+"""
+Exportação do relatório consolidado (JSON/PDF).
+
+O PDF é renderizado (reportlab + matplotlib) num pool de processos de PDF_WORKERS processos,
+fora das threads que atendem as requests; com PDF_WORKERS=0 a renderização roda na própria
+thread. O PDF pronto entra no cache de resultados com a mesma chave dos relatórios (dataset,
+versão e filtros): downloads repetidos não renderizam de novo, e requests simultâneas para o
+mesmo relatório esperam a mesma renderização.
+
+Modo assíncrono: create_export_job gera o arquivo num job em background (status em
+get_job_status); o arquivo fica no armazenamento de exportações (app/core/export_store.py)
+e o export_id vai no resultado do job.
+"""
+
 from __future__ import annotations
 
-from io import BytesIO
-from datetime import datetime
-from pathlib import Path
+import json
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+from loguru import logger
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+from app.core.cache import cached
+from app.core.config import EXPORT_DIR, PDF_WORKERS
+from app.core.export_store import store_export
+from app.core.jobs import Job, create_job, submit_job
+from app.core.responses import dumps_json
+from app.core.storage import DatasetState
+from app.services.pdf_render import render_report_pdf
+from app.services.report_builder import report_body
+from app.utils.filters import ReportFilters
 
-from app.services.report_builder import build_report_dict
 
+MEDIA_TYPES = {"json": "application/json", "pdf": "application/pdf"}
+
+_RENDER_POOL: ProcessPoolExecutor | None = None
+_IN_FLIGHT: dict[tuple, Future] = {}
+_LOCK = threading.Lock()
+
+_JOB_EXECUTOR = ThreadPoolExecutor(max_workers=max(1, PDF_WORKERS), thread_name_prefix="export-job")
+
+
+def _get_render_pool() -> ProcessPoolExecutor:
+    global _RENDER_POOL
+
+    with _LOCK:
+        if _RENDER_POOL is None:
+            # spawn: o processo da API tem threads (uvicorn, jobs), então evitamos fork
+            _RENDER_POOL = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _RENDER_POOL
 
-def _make_region_bar_chart(regional_performance: dict) -> BytesIO:
-    """
-    Gera um gráfico de barras (vendas por região) e devolve em BytesIO (PNG).
-    """
-    regions = list(regional_performance.keys())
-    values = [float(regional_performance[r]["total_vendas"]) for r in regions]
 
-    buf = BytesIO()
+def shutdown_render_pool() -> None:
+    """Encerra o pool de renderização (chamado no shutdown da API)."""
+    global _RENDER_POOL
 
-    plt.figure()
-    plt.bar(regions, values)
-    plt.title("Vendas por Região")
-    plt.xlabel("Região")
-    plt.ylabel("Total de Vendas")
-    plt.xticks(rotation=30, ha="right")
-    plt.tight_layout()
+    with _LOCK:
+        pool, _RENDER_POOL = _RENDER_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _render(key: tuple, report: dict) -> bytes:
+    """Renderiza no pool; uma renderização em andamento para a mesma chave é reaproveitada."""
+    if PDF_WORKERS <= 0:
+        return render_report_pdf(report)
+
+    with _LOCK:
+        future = _IN_FLIGHT.get(key)
+        owner = future is None
+        if owner:
+            future = _IN_FLIGHT[key] = Future()
+
+    if not owner:
+        return future.result()
+
+    try:
+        result = _get_render_pool().submit(render_report_pdf, report).result()
+        future.set_result(result)
+        return result
+    except BrokenProcessPool as e:
+        # Processo do pool morreu: descarta o pool para a próxima renderização criar outro
+        logger.error(f"Pool de renderização de PDF quebrado; será recriado. erro={str(e)}")
+        shutdown_render_pool()
+        future.set_exception(e)
+        raise
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _LOCK:
+            _IN_FLIGHT.pop(key, None)
+
+
+def export_report_pdf_bytes(ds: DatasetState, filters: ReportFilters | None = None) -> tuple[bytes, dict]:
+    """
+    PDF do relatório consolidado (ver pdf_render.render_report_pdf), com cache por dataset,
+    versão e filtros, e os tempos desta chamada ({"cache": ms} quando o PDF saiu do cache).
+    Levanta ValueError se não houver dados regionais para o PDF.
+    """
+    filters = filters or ReportFilters()
+    params = filters.cache_params()
+    computed: dict[str, float] = {}
 
-    plt.savefig(buf, format="png", dpi=150)
-    plt.close()
+    def compute() -> bytes:
+        body, timings = report_body(ds, filters)
+        key = (ds.dataset_id, ds.version, tuple(sorted((k, str(v)) for k, v in params.items())))
+        start = time.perf_counter()
+        content = _render(key, body)
+        computed.update(timings, pdf=round((time.perf_counter() - start) * 1000, 3))
+        return content
 
-    buf.seek(0)
-    return buf
+    start = time.perf_counter()
+    content = cached(ds, "report_pdf", params, compute)
+    return content, computed or {"cache": round((time.perf_counter() - start) * 1000, 3)}
 
 
-def export_report_pdf_bytes() -> bytes:
+def export_report(ds: DatasetState, filters: ReportFilters, fmt: str, compact: bool = False) -> tuple[bytes, dict]:
     """
-    Cria um PDF com:
-    - título e metadados
-    - tabela (vendas por região)
-    - gráfico (barras de vendas por região)
+    Conteúdo do arquivo de exportação no formato pedido (json ou pdf) e os tempos de cada etapa
+    (para o Server-Timing). O arquivo traz o corpo do relatório sem generated_at e tempos_ms:
+    a mesma versão e os mesmos filtros dão sempre os mesmos bytes.
+    compact=True gera o JSON sem indentação pelo serializador rápido (ver app/core/responses.py).
     """
-    report = build_report_dict()
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, title="Hanami Report")
-
-    styles = getSampleStyleSheet()
-    story = []
-
-    # Título
-    story.append(Paragraph("Relatório Analítico", styles["Title"]))
-    story.append(Spacer(1, 0.4 * cm))
-
-    # Metadados
-    meta = (
-        f"<b>Gerado em:</b> {report['generated_at']}<br/>"
-        f"<b>Arquivo:</b> {report['arquivo_original']}<br/>"
-        f"<b>Linhas processadas:</b> {report['linhas_processadas']}"
-    )
-    story.append(Paragraph(meta, styles["Normal"]))
-    story.append(Spacer(1, 0.5 * cm))
-
-    # Métricas principais
-    sales = report["sales_summary"]
-    finance = report["financial_metrics"]
-
-    story.append(Paragraph("Métricas principais", styles["Heading2"]))
-    story.append(Spacer(1, 0.2 * cm))
-
-    story.append(
-        Paragraph(
-            f"Total de vendas: {float(sales['total_vendas']):.2f}<br/>"
-            f"Número de transações: {int(sales['numero_transacoes'])}<br/>"
-            f"Média por transação: {float(sales['media_por_transacao']):.2f}<br/>"
-            f"Receita líquida: {float(finance['receita_liquida']):.2f}<br/>"
-            f"Lucro bruto: {float(finance['lucro_bruto']):.2f}<br/>"
-            f"Custo total: {float(finance['custo_total']):.2f}",
-            styles["Normal"],
-        )
-    )
-    story.append(Spacer(1, 0.6 * cm))
-
-    # Tabela: vendas por região
-    story.append(Paragraph("Vendas por região", styles["Heading2"]))
-    story.append(Spacer(1, 0.2 * cm))
-
-    regional = report["regional_performance"]
-    if not regional:
-        raise ValueError(
-            "Sem dados regionais para gerar o PDF. Verifique se a coluna 'regiao' existe e se há linhas válidas."
-        )
-
-    data = [["Região", "Total de Vendas", "Transações", "Média/Transação"]]
-    for regiao, m in regional.items():
-        data.append(
-            [
-                str(regiao),
-                f"{float(m['total_vendas']):.2f}",
-                str(int(m["numero_transacoes"])),
-                f"{float(m['media_por_transacao']):.2f}",
-            ]
-        )
-
-    table = Table(data, hAlign="LEFT")
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.black),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("PADDING", (0, 0), (-1, -1), 6),
-            ]
-        )
-    )
-    story.append(table)
-    story.append(Spacer(1, 0.6 * cm))
-
-    # Gráfico: barras por região
-    story.append(Paragraph("Gráfico: vendas por região", styles["Heading2"]))
-    story.append(Spacer(1, 0.2 * cm))
-
-    chart_buf = _make_region_bar_chart(regional)
-    chart_img = Image(chart_buf, width=16 * cm, height=9 * cm)
-    story.append(chart_img)
-
-    # Build
-    doc.build(story)
-
-    pdf_bytes = buffer.getvalue()
-    buffer.close()
-    return pdf_bytes
-
-
-def version_export_file(content: bytes, ext: str) -> Path:
+    if fmt == "pdf":
+        return export_report_pdf_bytes(ds, filters)
+    body, timings = report_body(ds, filters)
+    start = time.perf_counter()
+    content = dumps_json(body) if compact else json.dumps(body, ensure_ascii=False, indent=2).encode("utf-8")
+    return content, {**timings, "json": round((time.perf_counter() - start) * 1000, 3)}
+
+
+def _run_export(job: Job, ds: DatasetState, filters: ReportFilters, fmt: str, compact: bool) -> dict:
+    job.update("rendering", len(ds.df))
+    try:
+        content, timings = export_report(ds, filters, fmt, compact=compact)
+    except ValueError as e:
+        logger.error(f"Exportação assíncrona falhou. formato={fmt} job={job.id} erro={str(e)}")
+        raise
+
+    export_id = store_export(content, fmt, ds.dataset_id, ds.version, filters.to_dict(), compact=compact, background=False)
+
+    logger.info(f"Exportação assíncrona concluída. formato={fmt} job={job.id} bytes={len(content)}")
+    return {
+        "dataset_id": ds.dataset_id,
+        "versao": ds.version,
+        "formato": fmt,
+        "export_id": export_id,
+        "tamanho_bytes": len(content),
+        "tempos_ms": timings,
+        "download_em": f"/reports/exports/{export_id}",
+    }
+
+
+def create_export_job(ds: DatasetState, filters: ReportFilters, fmt: str, compact: bool = False) -> Job:
     """
-    Versiona artefatos de exportação em /exports com timestamp.
-    Retorna o path salvo.
+    Agenda a geração do arquivo em background e retorna o job (status via get_job_status).
+    Levanta ValueError se o armazenamento de exportações estiver desativado.
     """
-    exports_dir = Path("exports")
-    exports_dir.mkdir(parents=True, exist_ok=True)
+    if not EXPORT_DIR:
+        raise ValueError("Exportação assíncrona indisponível: armazenamento de exportações desativado (EXPORT_DIR).")
 
-    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    path = exports_dir / f"report_{ts}.{ext}"
-    path.write_bytes(content)
-    return path
+    job = create_job(f"report.{fmt}")
+    submit_job(job, lambda j: _run_export(j, ds, filters, fmt, compact), executor=_JOB_EXECUTOR)
+    return job
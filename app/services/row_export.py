@@ -0,0 +1,129 @@
+"""
+Exportação das linhas (transações) filtradas do dataset: CSV, NDJSON ou Parquet.
+
+As posições das linhas que atendem os filtros são calculadas antes da resposta começar
+(erros de filtro viram 422, não um arquivo cortado). Depois, um gerador percorre as posições
+em lotes de EXPORT_BATCH_ROWS linhas: cada lote é recortado do dataset, tem os IDs
+decodificados (restore_id_columns) e é serializado; só um lote fica em memória por vez.
+
+Parquet depende do pyarrow (opcional): sem ele o formato fica indisponível. Cada lote vira
+um row group do arquivo.
+"""
+
+from __future__ import annotations
+
+import itertools
+from io import BytesIO
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import EXPORT_BATCH_ROWS
+from app.services.bitmap import select_positions
+from app.services.schema import DATE_FORMAT
+from app.utils.filters import ReportFilters
+from app.utils.validators import restore_id_columns
+
+if TYPE_CHECKING:
+    from app.core.storage import DatasetState
+
+ROW_EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _batches(ds: DatasetState, positions: np.ndarray | None, batch_rows: int) -> Iterator[pd.DataFrame]:
+    """Lotes de linhas já prontos para saída (IDs decodificados); positions=None = todas as linhas."""
+    df = ds.df
+    total = len(df) if positions is None else len(positions)
+
+    for start in range(0, total, batch_rows):
+        stop = min(start + batch_rows, total)
+        batch = df.iloc[start:stop] if positions is None else df.take(positions[start:stop])
+        yield restore_id_columns(batch)
+
+
+def _dates_as_text(batch: pd.DataFrame) -> pd.DataFrame:
+    """Datas no formato do arquivo de origem (YYYY-MM-DD); data nula fica vazia."""
+    dates = [col for col in batch.columns if pd.api.types.is_datetime64_any_dtype(batch[col].dtype)]
+    if not dates:
+        return batch
+    return batch.assign(**{col: batch[col].dt.strftime(DATE_FORMAT) for col in dates})
+
+
+def _csv(batches: Iterator[pd.DataFrame], columns: list[str]) -> Iterator[bytes]:
+    yield (",".join(columns) + "\n").encode("utf-8")
+    for batch in batches:
+        yield _dates_as_text(batch).to_csv(index=False, header=False).encode("utf-8")
+
+
+def _ndjson(batches: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    for batch in batches:
+        if batch.empty:
+            continue
+        text = _dates_as_text(batch).to_json(orient="records", lines=True, force_ascii=False)
+        yield (text if text.endswith("\n") else text + "\n").encode("utf-8")
+
+
+class _Sink(BytesIO):
+    """Destino do ParquetWriter: acumula o que foi escrito até o próximo drain()."""
+
+    def drain(self) -> bytes:
+        data = self.getvalue()
+        self.seek(0)
+        self.truncate()
+        return data
+
+
+def _parquet(batches: Iterator[pd.DataFrame], empty: pd.DataFrame) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # Schema tirado do primeiro lote: num frame vazio as colunas de ID decodificadas não têm tipo
+    first = next(batches, None)
+    schema = pa.Schema.from_pandas(first if first is not None else empty, preserve_index=False)
+
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in itertools.chain([first] if first is not None else [], batches):
+            writer.write_table(pa.Table.from_pandas(batch, schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_rows(
+    ds: DatasetState,
+    filters: ReportFilters,
+    fmt: str,
+    batch_rows: int = EXPORT_BATCH_ROWS,
+) -> tuple[int, Iterator[bytes]]:
+    """
+    Seleciona as linhas e devolve (quantidade de linhas, gerador com os bytes do arquivo).
+    Levanta ValueError para formato desconhecido/indisponível ou filtro em coluna ausente.
+    """
+    if fmt not in ROW_EXPORT_FORMATS:
+        raise ValueError(f"Formato inválido: {fmt}. Use {', '.join(ROW_EXPORT_FORMATS)}.")
+    if fmt == "parquet" and not parquet_available():
+        raise ValueError("Formato parquet indisponível: instale o pacote pyarrow no servidor.")
+
+    positions = None if filters.is_empty() else select_positions(ds.df, ds.bitmaps, filters)
+    total = len(ds.df) if positions is None else len(positions)
+    batches = _batches(ds, positions, max(1, batch_rows))
+
+    if fmt == "csv":
+        return total, _csv(batches, list(ds.df.columns))
+    if fmt == "ndjson":
+        return total, _ndjson(batches)
+    return total, _parquet(batches, ds.df.iloc[:0])
@@ -0,0 +1,88 @@
+"""
+Schema declarativo do dataset de vendas.
+
+Cada coluna declara seu tipo lógico e, para numéricas, a largura final desejada.
+O parser usa essas declarações na própria leitura (dtype) e converte cada coluna uma
+única vez. Colunas fora do schema não são usadas pelos relatórios, mas ficam no dataset
+como vieram no arquivo (texto guardado como categoria, sem normalização) e saem na
+exportação de linhas (/dataset/export).
+
+Tipos lógicos:
+- "numeric": número; valores inválidos viram NaN
+- "date": data no formato DATE_FORMAT; valores inválidos viram NaT
+- "text": texto normalizado (strip + lower)
+- "string": texto mantido como veio no arquivo
+- "id": identificador prefixo+número (ex: CLI000974); guardado como inteiro quando o padrão é consistente
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str
+    kind: str
+    dtype: str | None = None  # largura final para colunas numéricas (ex: "int16", "float64")
+    required: bool = False  # coluna obrigatória no arquivo
+    critical: bool = False  # linhas com valor nulo/inválido são descartadas
+
+
+DATE_FORMAT = "%Y-%m-%d"
+
+SALES_SCHEMA: tuple[ColumnSpec, ...] = (
+    ColumnSpec("id_transacao", "id"),
+    ColumnSpec("data_venda", "date", required=True),
+    ColumnSpec("cliente_id", "id"),
+    ColumnSpec("idade_cliente", "numeric", "int16", required=True),
+    ColumnSpec("genero_cliente", "text"),
+    ColumnSpec("cidade_cliente", "text"),
+    ColumnSpec("estado_cliente", "text"),
+    ColumnSpec("renda_estimada", "numeric", "int32"),
+    ColumnSpec("produto_id", "id"),
+    ColumnSpec("nome_produto", "text"),
+    ColumnSpec("categoria", "text"),
+    ColumnSpec("marca", "text"),
+    ColumnSpec("preco_unitario", "numeric", "float64"),
+    ColumnSpec("quantidade", "numeric", "int32"),
+    ColumnSpec("subtotal", "numeric", "float64"),
+    ColumnSpec("desconto_percent", "numeric", "int16"),
+    ColumnSpec("valor_final", "numeric", "float64", required=True, critical=True),
+    ColumnSpec("regiao", "text"),
+    ColumnSpec("canal_venda", "text", required=True),
+    ColumnSpec("margem_lucro", "numeric", "float64"),
+    ColumnSpec("vendedor_id", "id"),
+    ColumnSpec("periodo_dia", "string"),
+    ColumnSpec("status_entrega", "text"),
+    ColumnSpec("tempo_entrega_dias", "numeric", "int16"),
+    ColumnSpec("forma_pagamento", "text"),
+)
+
+SCHEMA_BY_NAME = {spec.name: spec for spec in SALES_SCHEMA}
+
+EXPECTED_COLUMNS = [spec.name for spec in SALES_SCHEMA if spec.required]
+CRITICAL_COLUMNS = [spec.name for spec in SALES_SCHEMA if spec.critical]
+NUMERIC_COLUMNS = [spec.name for spec in SALES_SCHEMA if spec.kind == "numeric"]
+DATE_COLUMNS = [spec.name for spec in SALES_SCHEMA if spec.kind == "date"]
+TEXT_COLUMNS = [spec.name for spec in SALES_SCHEMA if spec.kind == "text"]
+STRING_COLUMNS = [spec.name for spec in SALES_SCHEMA if spec.kind == "string"]
+ID_COLUMNS = [spec.name for spec in SALES_SCHEMA if spec.kind == "id"]
+USED_COLUMNS = [spec.name for spec in SALES_SCHEMA]
+
+
+def is_schema_column(name: object) -> bool:
+    """Coluna declarada no schema (tolerando espaços no cabeçalho)."""
+    return str(name).strip() in SCHEMA_BY_NAME
+
+
+def read_options() -> dict:
+    """
+    Opções de leitura (pd.read_csv / pd.read_excel) derivadas do schema:
+    lê textos e datas direto como string, sem inferência. Numéricas ficam com o parser
+    nativo (rápido); se houver valor inválido a coluna volta como texto e é convertida
+    depois, uma única vez. Colunas fora do schema são lidas com a inferência padrão.
+    """
+    return {
+        "dtype": {name: "str" for name in TEXT_COLUMNS + STRING_COLUMNS + ID_COLUMNS + DATE_COLUMNS},
+    }
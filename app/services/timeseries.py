@@ -0,0 +1,130 @@
+"""
+Séries temporais a partir das somas diárias acumuladas.
+
+A tabela diária (build_daily_totals) tem, por dia com vendas, as somas acumuladas de cada
+medida. A soma de qualquer intervalo [a, b) é acumulado(antes de b) - acumulado(antes de a),
+achados por busca binária nas datas. Uma série com N períodos precisa de N+1 buscas e N
+subtrações, qualquer que seja a granularidade ou o número de linhas do dataset.
+
+Para quebrar a série por uma dimensão (ex: regiao) há uma tabela por dimensão com as mesmas
+linhas (dias) da tabela diária e uma coluna acumulada por (medida, valor da dimensão):
+"<medida>#<valor>". Todas as séries da dimensão saem de uma única indexação da matriz.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.services.cube import DAILY_MEASURES, daily_measures
+
+GRANULARITIES = ("day", "week", "month", "quarter")
+METRICS = ("valor_final", "quantidade", "lucro")
+TIMESERIES_DIMENSIONS = ["regiao", "estado_cliente", "canal_venda", "categoria"]
+
+_FREQ = {"day": "D", "week": "W-MON", "month": "MS", "quarter": "QS"}
+
+
+def breakdown_table_name(dim: str) -> str:
+    return f"daily_{dim}"
+
+
+def build_daily_breakdown(df: pd.DataFrame | None, dim: str) -> pd.DataFrame | None:
+    """
+    Somas diárias acumuladas por valor da dimensão, alinhadas às linhas da tabela diária
+    (mesmos dias, na mesma ordem). Retorna None se faltar a coluna da dimensão.
+    """
+    measures = daily_measures(df)
+    if measures is None or dim not in df.columns:
+        return None
+
+    measures[dim] = df[dim].astype(str) if not isinstance(df[dim].dtype, pd.CategoricalDtype) else df[dim]
+    grouped = measures.groupby(["data_venda", dim], dropna=False, observed=True, sort=True)[list(METRICS)].sum()
+
+    # Dias nas linhas (mesma ordem da tabela diária: data nula por último), um bloco de
+    # colunas por medida; dias sem venda daquele valor = 0
+    days = pd.Index(measures["data_venda"].drop_duplicates()).sort_values(na_position="last")
+    wide = grouped.unstack(dim, fill_value=0).reindex(days, fill_value=0).cumsum()
+
+    table = pd.DataFrame(
+        {f"{metric}#{value}": wide[(metric, value)].to_numpy(dtype=float) for metric, value in wide.columns},
+        copy=False,
+    )
+    table.attrs = {}
+    return table
+
+
+def _bucket_edges(start: date, end: date, granularity: str) -> list[date]:
+    """Inícios dos períodos que cobrem [start, end] (o primeiro pode começar antes de start)."""
+    first = pd.Timestamp(start)
+    if granularity == "week":
+        first -= pd.Timedelta(days=first.weekday())
+    elif granularity == "month":
+        first = first.replace(day=1)
+    elif granularity == "quarter":
+        first = first.replace(month=3 * ((first.month - 1) // 3) + 1, day=1)
+    return [ts.date() for ts in pd.date_range(first, pd.Timestamp(end), freq=_FREQ[granularity])]
+
+
+def _prefix_at(days: np.ndarray, cumulative: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+    """Acumulado de tudo antes de cada limite (busca binária nos dias; linha sem data ignorada)."""
+    valid = len(days) - int(np.isnat(days[-1:]).sum()) if len(days) else 0
+    idx = np.searchsorted(days[:valid], bounds, side="left")
+    padded = np.concatenate([np.zeros((1, *cumulative.shape[1:])), cumulative[:valid]])
+    return padded[idx]
+
+
+def timeseries(
+    daily: pd.DataFrame,
+    granularity: str = "month",
+    metric: str = "valor_final",
+    start: date | None = None,
+    end: date | None = None,
+    breakdown: pd.DataFrame | None = None,
+) -> dict:
+    """
+    Série da medida por período (formato colunar):
+    {"granularity", "metric", "inicio", "fim", "periodos": [...], "valores": [...]}
+    Com breakdown (tabela de build_daily_breakdown), "series": {valor: [...]} no lugar de
+    "valores", maiores totais primeiro; valores sem nenhuma venda no intervalo ficam de fora.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Granularidade inválida: {granularity}. Use {', '.join(GRANULARITIES)}.")
+    if metric not in METRICS:
+        raise ValueError(f"Métrica inválida: {metric}. Use {', '.join(METRICS)}.")
+
+    days = daily["data_venda"].to_numpy().astype("datetime64[D]")
+    dated = days[~np.isnat(days)]
+
+    out = {"granularity": granularity, "metric": metric, "inicio": None, "fim": None, "periodos": []}
+    out.update({"series": {}} if breakdown is not None else {"valores": []})
+
+    # Sem período informado: do primeiro ao último dia com venda
+    start = start or (dated[0].astype(object) if len(dated) else None)
+    end = end or (dated[-1].astype(object) if len(dated) else None)
+    if start is None or end is None or start > end:
+        return out
+
+    edges = _bucket_edges(start, end, granularity)
+    # Limites efetivos: o primeiro período começa em start e o último termina em end
+    bounds = np.array([start, *edges[1:], end + timedelta(days=1)], dtype="datetime64[D]")
+
+    out.update({"inicio": start.isoformat(), "fim": end.isoformat(), "periodos": [d.isoformat() for d in edges]})
+
+    if breakdown is None:
+        cumulative = daily[DAILY_MEASURES[metric]].to_numpy(dtype=float)
+        out["valores"] = np.diff(_prefix_at(days, cumulative, bounds)).tolist()
+        return out
+
+    prefix = f"{metric}#"
+    cols = [c for c in breakdown.columns if c.startswith(prefix)]
+    matrix = breakdown[cols].to_numpy(dtype=float) if cols else np.zeros((len(daily), 0))
+    values = np.diff(_prefix_at(days, matrix, bounds), axis=0)
+
+    totals = np.abs(values).sum(axis=0)
+    keep = np.flatnonzero(totals > 0)
+    keep = keep[np.argsort(-values[:, keep].sum(axis=0), kind="stable")]
+    out["series"] = {cols[i][len(prefix):]: values[:, i].tolist() for i in keep}
+    return out
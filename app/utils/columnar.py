@@ -0,0 +1,42 @@
+"""
+Conversão de resultados agregados para tipos nativos do Python, coluna a coluna.
+
+Em vez de iterar o DataFrame linha a linha (iterrows cria uma Series por linha), cada coluna
+é convertida de uma vez com numpy (.tolist() já devolve int/float/str nativos). O resultado é
+o formato colunar {"coluna": [valores...]}; columns_to_records monta a lista de objetos a
+partir dele quando o cliente pede o formato por linhas.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+LAYOUTS = ("linhas", "colunas")
+
+
+def frame_to_columns(df: pd.DataFrame, types: dict[str, type]) -> dict[str, list]:
+    """
+    Colunas do frame como listas de tipos nativos, na ordem de `types`.
+    str: valores nulos viram "nan"; int/float: nulos viram 0.
+    """
+    out = {}
+    for col, kind in types.items():
+        series = df[col]
+        if kind is str:
+            out[col] = series.astype(str).tolist()
+        elif kind is int:
+            out[col] = pd.to_numeric(series, errors="coerce").fillna(0).to_numpy(dtype=np.int64).tolist()
+        else:
+            out[col] = pd.to_numeric(series, errors="coerce").fillna(0).to_numpy(dtype=float).tolist()
+    return out
+
+
+def columns_to_records(columns: dict[str, list]) -> list[dict]:
+    """{"a": [1, 2], "b": [3, 4]} -> [{"a": 1, "b": 3}, {"a": 2, "b": 4}]"""
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def empty_columns(types: dict[str, type]) -> dict[str, list]:
+    return {col: [] for col in types}
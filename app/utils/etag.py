@@ -0,0 +1,50 @@
+"""
+ETags e requisições condicionais (If-None-Match).
+
+O ETag de um relatório é um hash da identidade do dataset (dataset_id + versão), do caminho
+e dos parâmetros normalizados da consulta: enquanto não houver upload novo, a mesma consulta
+tem o mesmo ETag e o cliente pode revalidar com If-None-Match (304, sem recalcular nada).
+
+A comparação é a fraca do If-None-Match (RFC 9110): ignora o prefixo W/ e o sufixo de
+codificação que a compressão acrescenta (ex: "abc-gzip", ver app/core/compression.py).
+"""
+
+from __future__ import annotations
+
+from app.utils.pagination import query_fingerprint
+
+ENCODING_SUFFIXES = ("-gzip", "-zstd")
+
+
+def make_etag(parts: dict, weak: bool = False) -> str:
+    tag = f'"{query_fingerprint(parts)}"'
+    return f"W/{tag}" if weak else tag
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)]
+    return tag
+
+
+def matching_etag(if_none_match: str | None, etag: str) -> str | None:
+    """
+    Tag do If-None-Match que corresponde ao etag (como o cliente a enviou), ou None.
+    "*" corresponde a qualquer representação.
+    """
+    if not if_none_match:
+        return None
+
+    current = _opaque(etag)
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return etag
+        if candidate and _opaque(candidate) == current:
+            return candidate
+    return None
@@ -1,8 +1,66 @@
 from __future__ import annotations
 
+from dataclasses import dataclass, field
 from datetime import date, datetime
+import numpy as np
 import pandas as pd
 
+# df.attrs[SORTED_BY_ATTR] = coluna de data pela qual o frame está ordenado (datas nulas no final).
+# Frames derivados que mudam a ordem das linhas não podem manter essa marca.
+SORTED_BY_ATTR = "sorted_by"
+
+# Filtros comuns dos relatórios: nome do parâmetro na API -> coluna do dataset
+FILTER_PARAMS = {
+    "estado": "estado_cliente",
+    "regiao": "regiao",
+    "canal_venda": "canal_venda",
+    "categoria": "categoria",
+    "marca": "marca",
+    "forma_pagamento": "forma_pagamento",
+    "status_entrega": "status_entrega",
+}
+FILTER_COLUMNS = list(FILTER_PARAMS.values())
+
+
+@dataclass(frozen=True)
+class ReportFilters:
+    """
+    Filtros de uma consulta: período (inclusivo) + valores aceitos por coluna.
+    Valores de uma mesma coluna combinam com OR; colunas diferentes combinam com AND.
+    Os valores já vêm normalizados como no dataset (strip + minúsculas).
+    """
+
+    start: date | None = None
+    end: date | None = None
+    values: dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+    def is_empty(self) -> bool:
+        return self.start is None and self.end is None and not self.values
+
+    def columns(self) -> list[str]:
+        """Colunas envolvidas no filtro (para decidir se o cubo consegue responder)."""
+        dates = ["data_venda"] if self.start is not None or self.end is not None else []
+        return dates + list(self.values)
+
+    def cache_params(self) -> dict:
+        return {"start_date": self.start, "end_date": self.end, **{col: ",".join(v) for col, v in sorted(self.values.items())}}
+
+    def to_dict(self) -> dict:
+        out = {}
+        if self.start is not None:
+            out["start_date"] = self.start.isoformat()
+        if self.end is not None:
+            out["end_date"] = self.end.isoformat()
+        params = {col: param for param, col in FILTER_PARAMS.items()}
+        out.update({params[col]: list(v) for col, v in self.values.items()})
+        return out
+
+
+def normalize_filter_values(raw: list[str] | None) -> tuple[str, ...]:
+    """Aceita parâmetro repetido (?estado=SP&estado=RJ) ou separado por vírgula (?estado=SP,RJ)."""
+    values = {part.strip().lower() for item in raw or [] for part in item.split(",")}
+    return tuple(sorted(v for v in values if v))
+
 
 def parse_yyyy_mm_dd(value: str) -> date:
     """
@@ -14,37 +72,76 @@ def parse_yyyy_mm_dd(value: str) -> date:
         raise ValueError(f"Data inválida: '{value}'. Use o formato YYYY-MM-DD.")
 
 
-def filter_by_date_range(df: pd.DataFrame, date_col: str, start: date | None, end: date | None) -> pd.DataFrame:
+def build_report_filters(start_date: str | None, end_date: str | None, values: dict[str, list[str] | None]) -> ReportFilters:
     """
-    Filtra por intervalo de datas (inclusivo). Assume df[date_col] já convertido para datetime.
+    Monta os filtros a partir dos parâmetros da API (values: nome do filtro -> valores).
+    Levanta ValueError para data fora do formato ou período invertido.
     """
-    if start is None and end is None:
-        return df
+    start = parse_yyyy_mm_dd(start_date) if start_date else None
+    end = parse_yyyy_mm_dd(end_date) if end_date else None
 
+    if start and end and start > end:
+        raise ValueError("Intervalo inválido: start_date não pode ser maior que end_date.")
+
+    normalized = {FILTER_PARAMS[param]: normalize_filter_values(items) for param, items in values.items() if items}
+    return ReportFilters(start=start, end=end, values={col: v for col, v in normalized.items() if v})
+
+
+def sort_by_date(df: pd.DataFrame, date_col: str) -> pd.DataFrame:
+    """
+    Ordena o frame pela coluna de data (estável, nulos no final) e marca a ordenação em attrs,
+    para que filter_by_date_range responda por busca binária.
+    """
     if date_col not in df.columns:
         return df
 
-    s = pd.Timestamp(start) if start else None
-    e = pd.Timestamp(end) if end else None
+    values = df[date_col].to_numpy()
+    nat = np.isnat(values)
+    dated = len(values) - int(nat.sum())
 
-    mask = pd.Series([True] * len(df), index=df.index)
-    if s is not None:
-        mask = mask & (df[date_col] >= s)
-    if e is not None:
-        mask = mask & (df[date_col] <= e)
+    # Já ordenado (ex: arquivo exportado em ordem cronológica): evita a cópia do sort
+    already_sorted = not nat[:dated].any() and bool((values[1:dated] >= values[: max(dated - 1, 0)]).all())
+    if not already_sorted:
+        df = df.sort_values(date_col, kind="stable", na_position="last", ignore_index=True)
 
-    return df.loc[mask]
+    df.attrs[SORTED_BY_ATTR] = date_col
+    return df
 
 
-def filter_by_estado(df: pd.DataFrame, estado: str | None) -> pd.DataFrame:
+def date_range_bounds(values: np.ndarray, start: date | None, end: date | None) -> tuple[int, int]:
     """
-    Filtra por estado. Normaliza para uppercase e strip.
+    Posições [lo, hi) das datas entre start e end (inclusivo) num array datetime64 ordenado,
+    com NaT no final. Datas nulas nunca entram num intervalo filtrado.
     """
-    if not estado:
+    lo = values.searchsorted(pd.Timestamp(start).to_datetime64().astype(values.dtype), "left") if start else 0
+    if end:
+        hi = values.searchsorted(pd.Timestamp(end).to_datetime64().astype(values.dtype), "right")
+    else:
+        hi = values.searchsorted(np.datetime64("NaT"), "left")
+    return int(lo), int(hi)
+
+
+def filter_by_date_range(df: pd.DataFrame, date_col: str, start: date | None, end: date | None) -> pd.DataFrame:
+    """
+    Filtra por intervalo de datas (inclusivo). Assume df[date_col] já convertido para datetime.
+    Se o frame estiver ordenado pela data (ver sort_by_date), o filtro é uma busca binária e
+    devolve uma fatia contínua do frame, sem copiar os dados.
+    """
+    if start is None and end is None:
         return df
 
-    if "estado_cliente" not in df.columns:
+    if date_col not in df.columns:
         return df
 
-    uf = estado.strip().upper()
-    return df.loc[df["estado_cliente"].astype(str).str.strip().str.upper() == uf]
+    if df.attrs.get(SORTED_BY_ATTR) == date_col:
+        lo, hi = date_range_bounds(df[date_col].to_numpy(), start, end)
+        return df.iloc[lo:hi]
+
+    values = df[date_col]
+    mask = np.ones(len(df), dtype=bool)
+    if start is not None:
+        mask &= (values >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        mask &= (values <= pd.Timestamp(end)).to_numpy()
+
+    return df.loc[mask]
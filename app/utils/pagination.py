@@ -0,0 +1,39 @@
+"""
+Cursores de paginação.
+
+O cursor é um token opaco (JSON em base64 url-safe) com a posição da próxima página e a
+identidade da consulta que o gerou: dataset, versão, ordenação e um hash dos filtros. Um
+cursor só vale para a mesma consulta sobre a mesma versão do dataset; depois de um novo
+upload a ordem pode mudar, então o cliente recomeça da primeira página.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+
+
+def query_fingerprint(params: dict) -> str:
+    """Hash curto e estável dos parâmetros da consulta (filtros + ordenação)."""
+    raw = json.dumps(params, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(payload: dict) -> str:
+    raw = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decodifica o cursor. Levanta ValueError se o token não for um cursor válido."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Cursor inválido.") from None
+
+    if not isinstance(payload, dict) or not isinstance(payload.get("offset"), int) or payload["offset"] < 0:
+        raise ValueError("Cursor inválido.")
+    return payload
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from typing import Iterable, Optional
+import numpy as np
 import pandas as pd
 
 
@@ -8,6 +9,116 @@ def normalize_text(series: pd.Series) -> pd.Series:
     return series.astype(str).str.strip().str.lower() #converte para string, remove espaços extras e coloca em minúsculas
 
 
+def to_categorical(series: pd.Series) -> pd.Series:
+    """
+    Normaliza o texto e guarda a coluna codificada por dicionário (categoria):
+    um código inteiro por linha + uma única cópia de cada valor distinto (ordenados).
+    """
+    return normalize_text(series).astype("category")
+
+
+# Chave em df.attrs com as colunas de ID codificadas: {coluna: {"prefix": "CLI", "width": 6}}
+ID_ENCODINGS_ATTR = "id_encodings"
+
+
+def encode_prefixed_ids(df: pd.DataFrame, col: str) -> pd.DataFrame:
+    """
+    Detecta IDs no padrão prefixo + número com largura fixa (ex: TXN00000001, CLI000974)
+    e guarda só a parte numérica como inteiro. O prefixo e a largura ficam em
+    df.attrs[ID_ENCODINGS_ATTR] para reconstruir o texto original (decode_prefixed_ids).
+    Se algum valor fugir do padrão (nulo, outro prefixo, tamanho diferente), a coluna fica como texto.
+    """
+    series = df[col]
+    if series.empty or series.isna().any():
+        return df
+
+    first = str(series.iloc[0])
+    prefix = first.rstrip("0123456789")
+    width = len(first) - len(prefix)
+    if width == 0 or width > 18:
+        return df
+
+    values = series.astype(str)
+    if not ((values.str.len() == len(first)).all() and values.str.startswith(prefix).all()):
+        return df
+
+    digits = values.str.slice(len(prefix))
+    if not digits.str.isdigit().all():
+        return df
+
+    numbers = digits.astype("int64")
+    df[col] = numbers.astype("int32") if numbers.max() <= np.iinfo("int32").max else numbers
+    df.attrs.setdefault(ID_ENCODINGS_ATTR, {})[col] = {"prefix": prefix, "width": width}
+    return df
+
+
+def decode_prefixed_ids(values: pd.Series, prefix: str, width: int) -> pd.Series:
+    """Reconstrói os IDs originais (prefixo + número com zeros à esquerda)."""
+    return prefix + values.astype(str).str.zfill(width)
+
+
+def restore_id_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devolve uma cópia com as colunas de ID codificadas de volta como texto.
+    Usar só na saída (respostas/exportações), de preferência sobre um recorte pequeno do dataset.
+    """
+    encodings = df.attrs.get(ID_ENCODINGS_ATTR) or {}
+    if not encodings:
+        return df
+
+    out = df.copy()
+    for col, spec in encodings.items():
+        if col in out.columns:
+            out[col] = decode_prefixed_ids(out[col], spec["prefix"], spec["width"])
+    out.attrs = {k: v for k, v in df.attrs.items() if k != ID_ENCODINGS_ATTR}
+    return out
+
+
+def _reconcile_id_encodings(frames: list[pd.DataFrame]) -> dict:
+    """
+    Mantém a codificação inteira só para colunas codificadas com o mesmo prefixo/largura
+    em todas as partes; nas demais, as partes codificadas voltam a ser texto.
+    """
+    encodings = [f.attrs.get(ID_ENCODINGS_ATTR) or {} for f in frames]
+    common = {}
+
+    for col in set().union(*encodings):
+        specs = [e.get(col) for e in encodings]
+        if all(spec == specs[0] for spec in specs):
+            common[col] = specs[0]
+            continue
+        for f, spec in zip(frames, specs):
+            if spec:
+                f[col] = decode_prefixed_ids(f[col], spec["prefix"], spec["width"])
+
+    return common
+
+
+def concat_frames(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena DataFrames (ex: chunks do parser) preservando colunas categóricas:
+    os dicionários de cada parte são unificados antes, senão o pandas volta a coluna para object.
+    IDs codificados como inteiro continuam codificados se o padrão for o mesmo em todas as partes.
+    """
+    if len(frames) == 1:
+        return frames[0]
+
+    id_encodings = _reconcile_id_encodings(frames)
+    for f in frames:
+        f.attrs = {}
+
+    for col in frames[0].columns:
+        if all(isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            categories = pd.Index(sorted(set().union(*(f[col].cat.categories for f in frames))))
+            for f in frames:
+                f[col] = f[col].cat.set_categories(categories)
+
+    df = pd.concat(frames, ignore_index=True)
+    if id_encodings:
+        df.attrs[ID_ENCODINGS_ATTR] = id_encodings
+    return df
+
+
 def require_columns(df: pd.DataFrame, required: Iterable[str]) -> None:
     missing = [c for c in required if c not in df.columns]
     if missing:
@@ -15,12 +126,40 @@ def require_columns(df: pd.DataFrame, required: Iterable[str]) -> None:
 
 
 def coerce_numeric(df: pd.DataFrame, col: str) -> pd.DataFrame: #converte para número, valores inválidos viram NaN
-    df[col] = pd.to_numeric(df[col], errors="coerce")
+    if not pd.api.types.is_numeric_dtype(df[col]):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def coerce_datetime(df: pd.DataFrame, col: str, fmt: str | None = None) -> pd.DataFrame: #converte para datetime, valores inválidos viram NaT
+    df[col] = pd.to_datetime(df[col], format=fmt, errors="coerce")
     return df
 
 
-def coerce_datetime(df: pd.DataFrame, col: str) -> pd.DataFrame: #converte para datetime, valores inválidos viram NaT
-    df[col] = pd.to_datetime(df[col], errors="coerce")
+def narrow_numeric(df: pd.DataFrame, col: str, dtype: str) -> pd.DataFrame:
+    """
+    Converte a coluna numérica para uma largura menor (ex: int16) quando os valores cabem
+    sem perda. Se houver NaN, valores fracionários ou fora do intervalo, mantém float64.
+    """
+    target = np.dtype(dtype)
+    series = df[col]
+
+    if series.dtype == target:
+        return df
+
+    if target.kind == "f":
+        df[col] = series.astype(target)
+        return df
+
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    info = np.iinfo(target)
+    fits = (
+        not np.isnan(values).any()
+        and (values.size == 0 or (values.min() >= info.min and values.max() <= info.max))
+        and np.array_equal(values, np.trunc(values))
+    )
+
+    df[col] = series.astype(target) if fits else series.astype("float64")
     return df
 
 
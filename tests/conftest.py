@@ -0,0 +1,169 @@
+"""
+Fixtures compartilhadas dos testes.
+
+Os testes usam o arquivo de exemplo do repositório (vendas_ficticias_10000_linhas.csv) e
+comparam o caminho novo com o resultado da leitura original do projeto: pandas.read_csv +
+conversões de tipo + texto normalizado (baseline_df), calculado pelas funções de serviço
+originais (calculate_sales_metrics, regional_metrics, ...) ou direto com pandas.
+
+Os diretórios de upload, snapshot e exportação ficam num diretório temporário; o PDF é
+renderizado na própria thread (PDF_WORKERS=0) para não subir um pool de processos.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+from pathlib import Path
+
+_TMP = Path(tempfile.mkdtemp(prefix="hanami-tests-"))
+os.environ.update(
+    {
+        "UPLOAD_DIR": str(_TMP / "uploads"),
+        "SNAPSHOT_DIR": str(_TMP / "snapshots"),
+        "EXPORT_DIR": str(_TMP / "exports"),
+        "PDF_WORKERS": "0",
+        "PARSE_WORKERS": "1",
+        "STORAGE_BACKEND": "memory",
+        "DATASET_MEMORY_BUDGET_MB": "0",
+    }
+)
+
+import pandas as pd  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+CSV_PATH = Path(__file__).resolve().parent.parent / "vendas_ficticias_10000_linhas.csv"
+
+# Colunas tratadas pelo parser original (antes do schema declarativo)
+BASELINE_TEXT_COLUMNS = [
+    "canal_venda",
+    "forma_pagamento",
+    "regiao",
+    "status_entrega",
+    "genero_cliente",
+    "cidade_cliente",
+    "estado_cliente",
+    "categoria",
+    "marca",
+    "nome_produto",
+]
+BASELINE_NUMERIC_COLUMNS = [
+    "valor_final",
+    "idade_cliente",
+    "subtotal",
+    "desconto_percent",
+    "preco_unitario",
+    "quantidade",
+    "margem_lucro",
+    "renda_estimada",
+    "tempo_entrega_dias",
+]
+
+
+def read_baseline(path: str | Path = CSV_PATH) -> pd.DataFrame:
+    """Leitura como o parser original fazia: tudo em memória, conversões depois da leitura."""
+    df = pd.read_csv(path)
+    df.columns = [str(c).strip() for c in df.columns]
+    for col in BASELINE_NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df["data_venda"] = pd.to_datetime(df["data_venda"], errors="coerce")
+    df = df.dropna(subset=["valor_final"])
+    for col in BASELINE_TEXT_COLUMNS:
+        df[col] = df[col].astype(str).str.strip().str.lower()
+    return df.reset_index(drop=True)
+
+
+def apply_filters(df: pd.DataFrame, filters) -> pd.DataFrame:
+    """Filtro dos relatórios (período inclusivo + valores por coluna) feito direto com pandas."""
+    mask = pd.Series(True, index=df.index)
+    if filters.start is not None:
+        mask &= df["data_venda"] >= pd.Timestamp(filters.start)
+    if filters.end is not None:
+        mask &= df["data_venda"] < pd.Timestamp(filters.end) + pd.Timedelta(days=1)
+    for col, values in filters.values.items():
+        mask &= df[col].astype(str).isin(values)
+    return df[mask]
+
+
+# Combinações de filtro usadas nos testes de relatório (cubo, bitmaps, período, colunas fora do cubo)
+FILTER_CASES = [
+    {},
+    {"regiao": ["Sudeste"]},
+    {"estado": ["SP", "rj"], "canal_venda": ["Loja Física"]},
+    {"start_date": "2023-03-01", "end_date": "2023-06-30", "regiao": ["Sul", "Norte"]},
+    {"categoria": ["Tablets"], "forma_pagamento": ["Pix", "Boleto"]},
+    {"start_date": "2024-01-01", "end_date": "2024-01-01"},
+]
+
+
+def make_filters(params: dict):
+    from app.utils.filters import build_report_filters
+
+    params = dict(params)
+    start, end = params.pop("start_date", None), params.pop("end_date", None)
+    # Aceita os valores como na query string ("SP,RJ") ou em lista
+    return build_report_filters(start, end, {k: [v] if isinstance(v, str) else v for k, v in params.items()})
+
+
+def rounded(value, digits: int = 6):
+    """Floats arredondados em estruturas aninhadas (somas em ordens diferentes)."""
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {k: rounded(v, digits) for k, v in value.items()}
+    if isinstance(value, list):
+        return [rounded(v, digits) for v in value]
+    return value
+
+
+def wait_job(client: TestClient, url: str, timeout: float = 60.0) -> dict:
+    """Consulta o status do job até terminar (sucesso ou erro)."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(url).json()
+        if job["status"] in ("sucesso", "erro") or time.monotonic() > deadline:
+            return job
+        time.sleep(0.02)
+
+
+def upload_csv(client: TestClient, path: str | Path = CSV_PATH, name: str = "vendas.csv") -> dict:
+    with open(path, "rb") as f:
+        response = client.post("/upload", files={"file": (name, f, "text/csv")})
+    assert response.status_code == 202, response.text
+    return wait_job(client, response.json()["acompanhar_em"])
+
+
+@pytest.fixture(scope="session")
+def baseline_df() -> pd.DataFrame:
+    return read_baseline()
+
+
+@pytest.fixture(scope="session")
+def source_df() -> pd.DataFrame:
+    """Arquivo de origem como texto, sem nenhuma conversão."""
+    return pd.read_csv(CSV_PATH, dtype=str, keep_default_na=False)
+
+
+@pytest.fixture(scope="session")
+def client():
+    from app.main import app
+
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def dataset_id(client) -> str:
+    """Upload do arquivo de exemplo (uma vez por sessão); os testes consultam por dataset_id."""
+    job = upload_csv(client)
+    assert job["status"] == "sucesso", job
+    return job["resultado"]["dataset_id"]
+
+
+@pytest.fixture()
+def ds(dataset_id):
+    import app.core.storage as storage
+
+    return storage.get_dataset(dataset_id)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import json
+from dataclasses import replace
+
+import pytest
+
+import app.core.cache as cache
+from app.services.calculations import calculate_sales_metrics
+from app.services.product_analysis import product_totals, totals_page_columns
+from app.services.report_builder import sales_section
+from app.utils.filters import ReportFilters
+
+
+@pytest.fixture()
+def empty_cache():
+    cache.invalidate("teste")
+    yield cache
+    cache.invalidate("teste")
+
+
+def test_cached_section_hits_until_new_version(ds, baseline_df, empty_cache):
+    # user-012: mesma seção/filtros responde do cache; outra versão do dataset é outra chave
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return calculate_sales_metrics(ds.df)
+
+    first = cache.cached(ds, "sales_summary", {"regiao": "Sul"}, compute)
+    again = cache.cached(ds, "sales_summary", {"regiao": " sul "}, compute)
+    newer = cache.cached(replace(ds, version=ds.version + 1000), "sales_summary", {"regiao": "sul"}, compute)
+
+    assert len(calls) == 2
+    assert first is again and newer == first
+    assert first == pytest.approx(calculate_sales_metrics(baseline_df))
+    assert sales_section(ds, ReportFilters()) == pytest.approx(calculate_sales_metrics(baseline_df))
+
+
+def test_cache_evicts_least_recently_used(ds, empty_cache, monkeypatch):
+    monkeypatch.setattr(cache, "RESULT_CACHE_MAX_ENTRIES", 2)
+
+    cache.cached(ds, "a", None, lambda: 1)
+    cache.cached(ds, "b", None, lambda: 2)
+    cache.cached(ds, "a", None, lambda: -1)
+    cache.cached(ds, "c", None, lambda: 3)
+
+    assert cache.cached(ds, "a", None, lambda: -1) == 1
+    assert cache.cached(ds, "b", None, lambda: -2) == -2
+    assert cache.cache_stats()["evictions"] >= 2
+
+
+def test_result_size_estimate_is_close_to_serialized_size(ds):
+    # A estimativa não serializa, mas fica na mesma ordem de grandeza do JSON
+    columns = totals_page_columns(product_totals(ds.df), sort_by="total_arrecadado", order="desc", limit=None, offset=0)
+    serialized = len(json.dumps(columns, ensure_ascii=False))
+
+    assert serialized / 4 < cache._result_nbytes(columns) < serialized * 4
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import app.core.export_store as export_store
+
+
+@pytest.fixture()
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(export_store, "EXPORT_DIR", str(tmp_path))
+    return export_store
+
+
+def _store_many(directory: str, worker: int, count: int) -> list[str]:
+    """Roda em outro processo: grava exportações no mesmo diretório (índice compartilhado)."""
+    export_store.EXPORT_DIR = directory
+    return [
+        export_store.store_export(f"{worker}-{i}".encode(), "json", f"ds{worker}", i, background=False)
+        for i in range(count)
+    ]
+
+
+def test_same_report_is_stored_once(store, tmp_path):
+    # user-022: o mesmo relatório (dataset, versão, formato, filtros) tem um único export_id e arquivo
+    first = store.store_export(b"{}", "json", "ds", 1, {"estado": ["SP"], "regiao": ["sul"]}, background=False)
+    again = store.store_export(b"{}", "json", "ds", 1, {"regiao": ["sul"], "estado": ["SP"]}, background=False)
+    other = store.store_export(b"{}", "json", "ds", 2, {"estado": ["SP"], "regiao": ["sul"]}, background=False)
+
+    assert first == again != other
+    assert sorted(p.name for p in tmp_path.glob("*.json") if p.name != export_store.INDEX_NAME) == sorted(
+        [f"{first}.json", f"{other}.json"]
+    )
+    assert store.get_export(first) == ("json", b"{}")
+
+
+def test_retention_drops_least_recently_accessed(store, monkeypatch):
+    monkeypatch.setattr(store, "EXPORT_KEEP", 2)
+
+    a = store.store_export(b"a", "json", "ds", 1, background=False)
+    time.sleep(0.01)
+    b = store.store_export(b"b", "json", "ds", 2, background=False)
+    time.sleep(0.01)
+    store.get_export(a)
+    time.sleep(0.01)
+    c = store.store_export(b"c", "json", "ds", 3, background=False)
+
+    assert {e["export_id"] for e in store.list_exports()} == {a, c}
+    assert store.get_export(b) is None
+
+
+def test_index_keeps_entries_written_by_other_processes(store, tmp_path):
+    with ProcessPoolExecutor(max_workers=3, mp_context=multiprocessing.get_context("spawn")) as pool:
+        written = [
+            export_id
+            for ids in pool.map(_store_many, [str(tmp_path)] * 3, range(3), [5] * 3)
+            for export_id in ids
+        ]
+
+    assert len(set(written)) == 15
+    assert {e["export_id"] for e in store.list_exports()} == set(written)
+
+
+class _QueuedWriter:
+    """Executor de teste: guarda as tarefas em vez de rodá-las."""
+
+    def __init__(self):
+        self.tasks = []
+
+    def submit(self, fn, *args):
+        self.tasks.append((fn, args))
+
+    def run_all(self):
+        tasks, self.tasks = self.tasks, []
+        for fn, args in tasks:
+            fn(*args)
+
+
+def test_download_does_not_rewrite_the_index(store, tmp_path, monkeypatch):
+    export_id = store.store_export(b"x", "json", "ds", 1, background=False)
+    index = tmp_path / store.INDEX_NAME
+    written = index.read_bytes()
+    accessed_at = store.list_exports()[0]["accessed_at"]
+
+    writer = _QueuedWriter()
+    monkeypatch.setattr(store, "_WRITER", writer)
+    time.sleep(0.01)
+    for _ in range(5):
+        assert store.get_export(export_id) == ("json", b"x")
+
+    # Os acessos ficam pendentes: uma única gravação agendada, índice intacto até ela rodar
+    assert len(writer.tasks) == 1 and index.read_bytes() == written
+    writer.run_all()
+    assert store.list_exports()[0]["accessed_at"] > accessed_at
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import date
+
+import numpy as np
+import pytest
+from conftest import FILTER_CASES, apply_filters, make_filters
+
+from app.services.bitmap import select_positions, select_rows
+from app.utils.filters import ReportFilters, filter_by_date_range, sort_by_date
+
+
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        (date(2023, 3, 1), date(2023, 6, 30)),
+        (None, date(2023, 1, 31)),
+        (date(2024, 12, 1), None),
+        (date(2024, 2, 29), date(2024, 2, 29)),
+        (date(2030, 1, 1), None),
+    ],
+)
+def test_sorted_date_range_is_a_slice(baseline_df, start, end):
+    # user-013: frame ordenado por data, o período vira busca binária e fatia contínua
+    df = sort_by_date(baseline_df.copy(), "data_venda")
+    filtered = filter_by_date_range(df, "data_venda", start, end)
+    expected = apply_filters(baseline_df, ReportFilters(start=start, end=end))
+
+    assert sorted(filtered["id_transacao"]) == sorted(expected["id_transacao"])
+    if len(filtered):
+        assert np.shares_memory(filtered["valor_final"].to_numpy(), df["valor_final"].to_numpy())
+
+
+@pytest.mark.parametrize("params", FILTER_CASES)
+def test_bitmap_selection_matches_pandas_mask(ds, baseline_df, params):
+    # user-014: filtros por bitmaps = mesmo filtro com máscaras do pandas, com e sem índice
+    filters = make_filters(params)
+    expected = apply_filters(baseline_df, filters)
+
+    positions = select_positions(ds.df, ds.bitmaps, filters)
+    unsorted = ds.df.copy()
+    unsorted.attrs = {}
+
+    assert np.array_equal(positions, select_positions(ds.df, None, filters))
+    assert np.array_equal(positions, select_positions(unsorted, None, filters))
+    assert np.array_equal(positions, np.flatnonzero(ds.df.index.isin(apply_filters(ds.df, filters).index)))
+
+    rows = select_rows(ds.df, ds.bitmaps, filters)
+    assert len(rows) == len(expected)
+    assert float(rows["valor_final"].sum()) == pytest.approx(float(expected["valor_final"].sum()))
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from app.services.parser import read_csv_stream_to_dataframe
+from app.utils.validators import restore_id_columns
+from conftest import BASELINE_NUMERIC_COLUMNS, BASELINE_TEXT_COLUMNS, CSV_PATH
+
+
+def assert_matches_baseline(df: pd.DataFrame, baseline: pd.DataFrame) -> None:
+    """Mesmas linhas, na mesma ordem, com os mesmos valores da leitura original."""
+    df = restore_id_columns(df)
+    assert len(df) == len(baseline)
+    assert (df["id_transacao"].astype(str).to_numpy() == baseline["id_transacao"].to_numpy()).all()
+    for col in BASELINE_NUMERIC_COLUMNS:
+        np.testing.assert_allclose(df[col].to_numpy(dtype=float), baseline[col].to_numpy(dtype=float), err_msg=col)
+    for col in BASELINE_TEXT_COLUMNS:
+        assert (df[col].astype(str).to_numpy() == baseline[col].to_numpy()).all(), col
+    assert (df["data_venda"].to_numpy() == baseline["data_venda"].to_numpy()).all()
+
+
+def test_streaming_chunks_match_baseline(baseline_df):
+    # user-001: leitura em chunks pequenos (vários chunks) dá o mesmo frame que a leitura inteira
+    with open(CSV_PATH, "rb") as f:
+        chunked = read_csv_stream_to_dataframe(f, chunk_rows=997)
+    with open(CSV_PATH, "rb") as f:
+        whole = read_csv_stream_to_dataframe(io.BytesIO(f.read()), chunk_rows=1_000_000)
+
+    assert_matches_baseline(chunked, baseline_df)
+    pd.testing.assert_frame_equal(restore_id_columns(chunked), restore_id_columns(whole))
+
+
+def test_byte_ranges_are_line_aligned():
+    # user-003: os intervalos cobrem o arquivo inteiro (sem o cabeçalho) e começam em início de linha
+    from app.services.parser import _split_line_ranges
+
+    header_end, ranges = _split_line_ranges(CSV_PATH, 7)
+    data = CSV_PATH.read_bytes()
+
+    assert len(ranges) == 7
+    assert ranges[0][0] == header_end and ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start and data[start - 1 : start] == b"\n"
+
+
+def test_parallel_parse_matches_baseline(baseline_df):
+    import app.services.parser as parser
+
+    try:
+        df = parser.read_csv_parallel_to_dataframe(CSV_PATH, workers=3)
+    finally:
+        if parser._PROCESS_POOL is not None:
+            parser._PROCESS_POOL.shutdown()
+            parser._PROCESS_POOL = None
+
+    assert_matches_baseline(df, baseline_df)
+
+
+def test_schema_typed_read(source_df):
+    # user-004: larguras do schema aplicadas na leitura; colunas fora do schema ficam como vieram
+    from app.services.schema import SALES_SCHEMA
+
+    with open(CSV_PATH, "rb") as f:
+        df = read_csv_stream_to_dataframe(f)
+
+    assert list(df.columns) == list(source_df.columns)
+    for spec in SALES_SCHEMA:
+        if spec.kind == "numeric":
+            assert str(df[spec.name].dtype) == spec.dtype, spec.name
+    assert pd.api.types.is_datetime64_any_dtype(df["data_venda"])
+    assert (df["nome_cliente"].astype(str).to_numpy() == source_df["nome_cliente"].to_numpy()).all()
+    assert (df["dia_semana"].astype(str).to_numpy() == source_df["dia_semana"].to_numpy()).all()
+    np.testing.assert_allclose(df["custo_produto"].to_numpy(), source_df["custo_produto"].astype(float).to_numpy())
+
+
+def test_schema_invalid_values_are_coerced(source_df):
+    sample = source_df.head(5).copy()
+    sample.loc[0, "valor_final"] = "abc"
+    sample.loc[1, "idade_cliente"] = "?"
+    stream = io.BytesIO(sample.to_csv(index=False).encode("utf-8"))
+
+    df = read_csv_stream_to_dataframe(stream)
+
+    # valor_final é crítica: a linha inválida sai; idade inválida vira nula
+    assert len(df) == 4
+    assert df["idade_cliente"].isna().sum() == 1
+
+
+def test_text_dimensions_are_categorical(baseline_df):
+    # user-005: dimensões de texto guardadas como categoria, com os valores normalizados
+    with open(CSV_PATH, "rb") as f:
+        df = read_csv_stream_to_dataframe(f, chunk_rows=3000)
+
+    for col in BASELINE_TEXT_COLUMNS:
+        assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+        assert sorted(df[col].cat.categories) == sorted(baseline_df[col].unique()), col
+        assert df[col].memory_usage(deep=True) < baseline_df[col].memory_usage(deep=True)
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from conftest import FILTER_CASES, apply_filters, make_filters, rounded
+
+from app.services.calculations import calculate_financial_metrics, calculate_sales_metrics
+from app.services.cube import is_cube, report_source
+from app.services.demographics_region import customer_profile_as_object, regional_metrics
+from app.services.product_analysis import product_totals
+from app.services.report_builder import build_report_dict, pivot_section, timeseries_section
+from app.services.report_engine import TOP_PRODUCTS
+from app.utils.columnar import columns_to_records
+
+
+@pytest.mark.parametrize("params", FILTER_CASES)
+def test_cube_reports_match_raw_rows(ds, baseline_df, params):
+    # user-011: métricas calculadas sobre o cubo (ou as linhas, fora das dimensões dele) = pandas nas linhas
+    filters = make_filters(params)
+    source = report_source(ds, filters)
+    expected = apply_filters(baseline_df, filters)
+
+    assert is_cube(source) == all(col in ("data_venda", "regiao", "estado_cliente", "canal_venda") for col in filters.columns())
+    assert calculate_sales_metrics(source) == pytest.approx(calculate_sales_metrics(expected))
+    assert calculate_financial_metrics(source) == pytest.approx(calculate_financial_metrics(expected))
+
+    by_region = {r.pop("regiao"): r for r in regional_metrics(source)}
+    assert by_region == {r.pop("regiao"): pytest.approx(r) for r in regional_metrics(expected)}
+
+
+@pytest.mark.parametrize("params", FILTER_CASES)
+def test_consolidated_report_matches_section_services(ds, baseline_df, params):
+    # user-015: a passada única do relatório consolidado = cada serviço de seção nas linhas filtradas
+    filters = make_filters(params)
+    expected = apply_filters(baseline_df, filters)
+
+    report = build_report_dict(ds, filters)
+
+    top = product_totals(expected).sort_values("total_arrecadado", ascending=False).head(TOP_PRODUCTS)
+    assert report["linhas_processadas"] == len(expected)
+    assert rounded(report["sales_summary"]) == rounded(calculate_sales_metrics(expected))
+    assert rounded(report["financial_metrics"]) == rounded(calculate_financial_metrics(expected))
+    assert rounded(report["regional_performance"]) == rounded({r.pop("regiao"): r for r in regional_metrics(expected)})
+    assert rounded(report["product_analysis_top20"]) == rounded(top.to_dict("records"))
+    assert rounded(report["customer_profile"]) == rounded(customer_profile_as_object(expected))
+    assert report.get("filtros", {}) == filters.to_dict()
+
+
+PERIODS = {"day": "D", "week": "W-SUN", "month": "M", "quarter": "Q"}
+
+
+@pytest.mark.parametrize(
+    "granularity, metric, params",
+    [
+        ("month", "valor_final", {}),
+        ("week", "quantidade", {"start_date": "2023-03-15", "end_date": "2023-07-10"}),
+        ("quarter", "valor_final", {"estado": "SP,RJ"}),
+        ("day", "valor_final", {"start_date": "2024-01-01", "end_date": "2024-01-31", "categoria": "Audio"}),
+    ],
+)
+def test_timeseries_matches_pandas_resample(ds, baseline_df, granularity, metric, params):
+    # user-018: série pelas somas acumuladas = groupby por período com pandas nas linhas filtradas
+    filters = make_filters(params)
+    expected_rows = apply_filters(baseline_df, filters)
+    period = expected_rows["data_venda"].dt.to_period(PERIODS[granularity]).dt.start_time.dt.date
+
+    result = timeseries_section(ds, filters, granularity=granularity, metric=metric)
+
+    sums = expected_rows.groupby(period)[metric].sum()
+    periods = [date.fromisoformat(p) for p in result["periodos"]]
+    assert set(sums.index) <= set(periods)
+    assert result["valores"] == pytest.approx(sums.reindex(periods, fill_value=0).tolist())
+
+    by_region = timeseries_section(ds, filters, granularity=granularity, metric=metric, dimension="regiao")
+    expected_series = expected_rows.groupby([period, "regiao"])[metric].sum().unstack(fill_value=0).reindex(periods, fill_value=0)
+    assert set(by_region["series"]) == set(expected_series.columns)
+    for regiao, values in by_region["series"].items():
+        assert values == pytest.approx(expected_series[regiao].tolist())
+
+
+@pytest.mark.parametrize(
+    "dimensions, params",
+    [
+        (["regiao"], {}),
+        (["categoria", "vendedor_id"], {"start_date": "2023-01-01", "end_date": "2023-12-31"}),
+        (["canal_venda", "periodo_dia", "status_entrega"], {"estado": "SP,MG"}),
+    ],
+)
+def test_pivot_matches_pandas_groupby(ds, baseline_df, dimensions, params):
+    # user-019: agrupamento por códigos = groupby do pandas nas linhas filtradas
+    filters = make_filters(params)
+    measures = ["valor_final:sum", "quantidade:max", "margem_lucro:mean", "desconto_percent:min", "count"]
+
+    result = pivot_section(ds, filters, dimensions, measures)
+
+    expected = (
+        apply_filters(baseline_df, filters)
+        .groupby(dimensions)
+        .agg(
+            valor_final_sum=("valor_final", "sum"),
+            quantidade_max=("quantidade", "max"),
+            margem_lucro_mean=("margem_lucro", "mean"),
+            desconto_percent_min=("desconto_percent", "min"),
+            transacoes=("valor_final", "size"),
+        )
+    )
+    got = {
+        tuple(str(row[d]).lower() for d in dimensions): {m: row[m] for m in expected.columns}
+        for row in columns_to_records(result)
+    }
+    assert len(got) == len(expected)
+    for key, row in expected.iterrows():
+        key = tuple(str(k).lower() for k in (key if isinstance(key, tuple) else (key,)))
+        assert got[key] == pytest.approx(row.to_dict())
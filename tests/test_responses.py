@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import upload_csv
+
+from app.core.compression import negotiate_encoding
+from app.core.responses import dumps_json
+
+
+def test_dumps_json_converts_numpy_and_pandas_values():
+    # user-024: serializador rápido aceita os tipos dos resultados sem passar pelo jsonable_encoder
+    content = {
+        "total": np.float64(1.5),
+        "linhas": np.int64(3),
+        "valores": np.array([1, 2]),
+        "data": pd.Timestamp("2024-01-02"),
+        "nulo": pd.NaT,
+        "texto": "São Paulo",
+    }
+
+    assert json.loads(dumps_json(content)) == {
+        "total": 1.5,
+        "linhas": 3,
+        "valores": [1, 2],
+        "data": "2024-01-02T00:00:00",
+        "nulo": None,
+        "texto": "São Paulo",
+    }
+
+
+def test_stdlib_fallback_writes_non_finite_floats_as_null(monkeypatch):
+    # Mesma saída do orjson: NaN/Infinity viram null em vez de erro
+    import app.core.responses as responses
+
+    monkeypatch.setattr(responses, "USE_ORJSON", False)
+    content = {
+        "media": float("nan"),
+        "valores": [1.0, float("inf")],
+        "numpy": np.array([np.nan, 2.0]),
+        "escalar": np.float32("nan"),
+    }
+
+    assert json.loads(responses.dumps_json(content)) == {"media": None, "valores": [1.0, None], "numpy": [None, 2.0], "escalar": None}
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", "gzip"),
+        ("gzip;q=0", None),
+        ("br, *;q=0.5", "gzip"),
+    ],
+)
+def test_negotiate_encoding(header, expected, monkeypatch):
+    import app.core.compression as compression
+
+    monkeypatch.setattr(compression, "zstandard", None)
+    assert negotiate_encoding(header) == expected
+
+
+def test_compressed_report_matches_plain_response(client, dataset_id):
+    params = {"dataset_id": dataset_id}
+    plain = client.get("/reports/product-analysis", params=params, headers={"Accept-Encoding": "identity"})
+    compressed = client.get("/reports/product-analysis", params=params, headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in plain.headers
+    assert compressed.headers["content-encoding"] == "gzip"
+    assert compressed.json() == plain.json()
+    assert compressed.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+
+
+def test_compact_download_has_same_report(client, dataset_id):
+    params = {"dataset_id": dataset_id, "format": "json", "regiao": "Norte"}
+    indented = client.get("/reports/download", params=params)
+    compact = client.get("/reports/download", params={**params, "compact": True})
+
+    assert len(compact.content) < len(indented.content)
+    assert json.loads(compact.content) == json.loads(indented.content)
+
+
+def test_report_etag_and_not_modified(client, dataset_id):
+    # user-025: ETag pela versão + consulta normalizada; If-None-Match correspondente dá 304 sem corpo
+    path = "/reports/sales-summary"
+    first = client.get(path, params={"dataset_id": dataset_id, "estado": "SP,RJ"})
+    etag = first.headers["etag"]
+
+    same_query = client.get(path, params=[("dataset_id", dataset_id), ("estado", "rj"), ("estado", "sp")])
+    not_modified = client.get(path, params={"dataset_id": dataset_id, "estado": "SP,RJ"}, headers={"If-None-Match": etag})
+    gzip_tag = client.get(
+        path, params={"dataset_id": dataset_id, "estado": "SP,RJ"}, headers={"If-None-Match": etag[:-1] + '-gzip"'}
+    )
+    other_query = client.get(path, params={"dataset_id": dataset_id, "estado": "SP"})
+
+    assert not etag.startswith("W/")
+    assert same_query.headers["etag"] == etag
+    assert not_modified.status_code == 304 and not_modified.content == b""
+    assert gzip_tag.status_code == 304
+    assert other_query.headers["etag"] != etag
+
+
+def test_download_and_status_etags(client, dataset_id, tmp_path, source_df):
+    params = {"dataset_id": dataset_id, "format": "json"}
+    download = client.get("/reports/download", params=params)
+    assert client.get("/reports/download", params=params, headers={"If-None-Match": download.headers["etag"]}).status_code == 304
+
+    status = client.get("/dataset/status")
+    # Consultas mudam o último acesso e o cache, mas não o registro: o status continua 304
+    client.get("/reports/sales-summary", params={"dataset_id": dataset_id, "estado": "RJ"})
+    assert client.get("/dataset/status", headers={"If-None-Match": status.headers["etag"]}).status_code == 304
+    detailed = client.get("/dataset/status", params={"dataset_id": dataset_id})
+    assert detailed.headers["etag"] != status.headers["etag"]
+    stats = client.get("/dataset/stats")
+    assert "etag" not in stats.headers and stats.headers["cache-control"] == "no-store"
+    assert {"memoria", "cache"} <= set(stats.json()) and "cache" not in status.json()
+
+    # Upload novo: o último dataset muda, então o relatório sem dataset_id tem outro ETag
+    before = client.get("/reports/sales-summary").headers["etag"]
+    path = tmp_path / "pequeno.csv"
+    source_df.head(200).to_csv(path, index=False)
+    job = upload_csv(client, path, "pequeno.csv")
+    after = client.get("/reports/sales-summary", headers={"If-None-Match": before})
+
+    assert job["status"] == "sucesso"
+    assert after.status_code == 200 and after.headers["etag"] != before
+    assert after.json()["numero_transacoes"] == 200
+    assert client.get("/dataset/status", headers={"If-None-Match": status.headers["etag"]}).status_code == 200
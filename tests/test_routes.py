@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import io
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import apply_filters, make_filters, rounded
+
+from app.core.cache import invalidate
+from app.services.product_analysis import PRODUCT_COLUMNS, product_totals
+from app.services.row_export import export_rows
+from app.utils.columnar import columns_to_records, frame_to_columns
+
+
+def test_columnar_materialization_matches_iterrows(baseline_df):
+    # user-016: conversão coluna a coluna = o laço iterrows que os serviços faziam antes
+    totals = product_totals(baseline_df)
+    expected = [
+        {
+            "nome_produto": str(row["nome_produto"]),
+            "quantidade_vendida": int(row["quantidade_vendida"]),
+            "total_arrecadado": float(row["total_arrecadado"]),
+        }
+        for _, row in totals.iterrows()
+    ]
+
+    assert columns_to_records(frame_to_columns(totals, PRODUCT_COLUMNS)) == expected
+
+
+@pytest.mark.parametrize("path", ["/reports/regional-performance", "/reports/product-analysis"])
+def test_column_layout_matches_row_layout(client, dataset_id, path):
+    rows = client.get(path, params={"dataset_id": dataset_id, "regiao": "Sul,Norte"}).json()
+    columns = client.get(path, params={"dataset_id": dataset_id, "regiao": "Sul,Norte", "layout": "colunas"}).json()
+
+    if isinstance(rows, dict):
+        rows = [{"regiao": regiao, **metrics} for regiao, metrics in rows.items()]
+    assert columns_to_records(columns) == rows
+
+
+def _all_pages(client, params: dict) -> tuple[list[dict], int]:
+    items, pages = [], 0
+    response = client.get("/reports/product-analysis", params=params)
+    while True:
+        assert response.status_code == 200, response.text
+        items += response.json()
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return items, pages
+        response = client.get("/reports/product-analysis", params={**params, "cursor": cursor})
+
+
+@pytest.mark.parametrize(
+    "sort_by, order, filters",
+    [
+        ("total_arrecadado", "desc", {}),
+        ("quantidade", "desc", {"regiao": "Sudeste"}),
+        ("quantidade", "asc", {"categoria": "Tablets,Audio"}),
+        ("nome", "asc", {"estado": "SP"}),
+    ],
+)
+def test_product_pages_match_full_sort(client, dataset_id, baseline_df, sort_by, order, filters):
+    # user-017: páginas (top-K com np.partition) seguidas pelo cursor = ordenação completa com pandas
+    column = {"total_arrecadado": "total_arrecadado", "quantidade": "quantidade_vendida", "nome": "nome_produto"}[sort_by]
+    expected = product_totals(apply_filters(baseline_df, make_filters(filters)))
+    descending = order == "desc"
+    if column == "nome_produto":
+        expected = expected.sort_values("nome_produto", ascending=not descending)
+    else:
+        # Empate: nome em ordem alfabética (desc) ou inversa (asc, o inverso exato da desc)
+        expected = expected.sort_values([column, "nome_produto"], ascending=[not descending, descending])
+
+    params = {"dataset_id": dataset_id, "sort_by": sort_by, "order": order, "limit": 3, **filters}
+    items, pages = _all_pages(client, params)
+
+    assert pages == -(-len(expected) // 3)
+    assert [item["nome_produto"] for item in items] == expected["nome_produto"].tolist()
+    assert [item["quantidade_vendida"] for item in items] == expected["quantidade_vendida"].tolist()
+
+
+def test_cursor_is_rejected_for_another_query(client, dataset_id):
+    first = client.get("/reports/product-analysis", params={"dataset_id": dataset_id, "limit": 5})
+    cursor = first.headers["X-Next-Cursor"]
+
+    other = client.get("/reports/product-analysis", params={"dataset_id": dataset_id, "cursor": cursor, "regiao": "Sul"})
+    garbage = client.get("/reports/product-analysis", params={"dataset_id": dataset_id, "cursor": "nao-e-um-cursor"})
+
+    assert other.status_code == 400 and "Cursor inválido" in other.json()["detail"]
+    assert garbage.status_code == 400
+
+
+def test_batch_matches_single_requests_with_one_pass(client, dataset_id, monkeypatch):
+    # user-020: seções do consolidado com os mesmos filtros de valor saem de uma passada (só as pedidas);
+    # repetidas, uma vez; só com período cada seção segue pelo caminho rápido próprio
+    import app.services.batch as batch
+
+    passes = []
+    original = batch.compute_report_sections
+    monkeypatch.setattr(
+        batch, "compute_report_sections", lambda ds, filters, sections: passes.append(set(sections)) or original(ds, filters, sections)
+    )
+
+    filtros = {"regiao": "Sul,Sudeste", "start_date": "2023-01-01"}
+    queries = [
+        {"id": "vendas", "report": "sales-summary", "params": filtros},
+        {"id": "financas", "report": "financial-metrics", "params": filtros},
+        {"id": "regioes", "report": "regional-performance", "params": {**filtros, "layout": "colunas"}},
+        {"id": "clientes", "report": "customer-profile", "params": filtros},
+        {"id": "vendas-de-novo", "report": "sales-summary", "params": {**filtros, "regiao": ["sudeste", "SUL"]}},
+        {"id": "produtos", "report": "product-analysis", "params": {"limit": 5, "sort_by": "quantidade"}},
+        {"id": "pivot", "report": "pivot", "params": {"dimensions": "categoria", "measures": "valor_final:sum"}},
+        {"id": "periodo-vendas", "report": "sales-summary", "params": {"start_date": "2023-01-01"}},
+        {"id": "periodo-financas", "report": "financial-metrics", "params": {"start_date": "2023-01-01"}},
+        {"id": "invalido", "report": "nao-existe", "params": {}},
+    ]
+    response = client.post("/reports/batch", params={"dataset_id": dataset_id}, json={"queries": queries})
+
+    assert response.status_code == 200, response.text
+    results = {r["id"]: r for r in response.json()["resultados"]}
+    assert passes == [{"sales_summary", "financial_metrics", "regional_performance", "customer_profile"}]
+    assert results["invalido"]["status"] == 422
+
+    paths = {
+        "sales-summary": "/reports/sales-summary",
+        "financial-metrics": "/reports/financial-metrics",
+        "regional-performance": "/reports/regional-performance",
+        "customer-profile": "/reports/customer-profile",
+        "product-analysis": "/reports/product-analysis",
+        "pivot": "/reports/pivot",
+    }
+    # Sem o cache preenchido pelo lote, cada GET calcula a própria seção
+    invalidate("teste")
+    for query in queries[:-1]:
+        single = client.get(paths[query["report"]], params={"dataset_id": dataset_id, **query["params"]})
+        assert results[query["id"]]["status"] == 200
+        assert rounded(results[query["id"]]["resultado"]) == rounded(single.json()), query["id"]
+
+
+def test_pdf_is_cached_and_async_export_returns_same_file(client, dataset_id):
+    # user-021: o PDF renderizado fica em cache; a exportação assíncrona entrega o mesmo arquivo
+    params = {"dataset_id": dataset_id, "format": "pdf", "estado": "SP"}
+
+    first = client.get("/reports/download", params=params)
+    again = client.get("/reports/download", params=params)
+
+    assert first.status_code == 200 and first.content.startswith(b"%PDF")
+    assert again.content == first.content
+    assert "pdf;dur=" in first.headers["Server-Timing"] and again.headers["Server-Timing"].startswith("cache;dur=")
+
+    job = client.post("/reports/exports", params=params)
+    assert job.status_code == 202
+    url = job.json()["acompanhar_em"]
+    deadline = time.monotonic() + 60
+    response = client.get(url)
+    while response.status_code == 202 and time.monotonic() < deadline:
+        time.sleep(0.02)
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/pdf"
+    assert response.content == first.content
+
+
+ID_COLUMNS = ["id_transacao", "cliente_id", "produto_id", "vendedor_id"]
+
+
+def test_row_export_matches_filtered_source(client, dataset_id, ds, source_df, baseline_df):
+    # user-023: linhas exportadas em lotes = linhas de origem que atendem o filtro (IDs e datas como no arquivo)
+    params = {"regiao": "Sul", "start_date": "2023-06-01", "end_date": "2024-05-31"}
+    filters = make_filters(params)
+    expected_ids = set(apply_filters(baseline_df, filters)["id_transacao"])
+    expected = source_df[source_df["id_transacao"].isin(expected_ids)].set_index("id_transacao").sort_index()
+
+    response = client.get("/dataset/export", params={"dataset_id": dataset_id, "format": "csv", **params})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == str(len(expected))
+
+    exported = pd.read_csv(io.StringIO(response.text), dtype=str, keep_default_na=False)
+    assert list(exported.columns) == list(ds.df.columns)
+    exported = exported.set_index("id_transacao").sort_index()
+    assert exported.index.tolist() == expected.index.tolist()
+    for col in ["data_venda", *ID_COLUMNS[1:]]:
+        assert exported[col].tolist() == expected[col].tolist(), col
+    np.testing.assert_allclose(exported["valor_final"].astype(float), expected["valor_final"].astype(float))
+
+    ndjson = client.get("/dataset/export", params={"dataset_id": dataset_id, "format": "ndjson", **params})
+    records = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert sorted(r["id_transacao"] for r in records) == expected.index.tolist()
+
+
+def test_row_export_batches_do_not_change_output(ds):
+    filters = make_filters({"categoria": "Audio,Gaming"})
+    _, small = export_rows(ds, filters, "csv", batch_rows=7)
+    _, large = export_rows(ds, filters, "csv", batch_rows=100_000)
+
+    assert b"".join(small) == b"".join(large)
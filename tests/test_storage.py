@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.snapshot import list_snapshots, load_snapshot, load_table, save_snapshot
+
+
+def test_snapshot_round_trip(ds, tmp_path):
+    # user-007: snapshot colunar grava e relê (memory-mapped) o mesmo dataset e as tabelas auxiliares
+    path = save_snapshot(ds.df, ds.filename, ds.uploaded_at, tmp_path, name="teste", version=ds.version, tables=ds.tables)
+
+    df, manifest = load_snapshot(path, mmap=False)
+
+    assert list_snapshots(tmp_path) == [path]
+    assert manifest["rows"] == len(ds.df) and manifest["version"] == ds.version
+    pd.testing.assert_frame_equal(df, ds.df)
+    assert df.attrs == ds.df.attrs
+    for name, table in ds.tables.items():
+        pd.testing.assert_frame_equal(load_table(path, name, manifest, mmap=False), table, obj=name)
+
+    # Warm start: as colunas numéricas apontam para o arquivo, sem cópia
+    mapped, _ = load_snapshot(path, mmap=True)
+    assert isinstance(mapped["valor_final"].values, np.memmap)
+    np.testing.assert_array_equal(mapped["valor_final"].to_numpy(), ds.df["valor_final"].to_numpy())
+
+
+def test_snapshot_never_left_half_written(tmp_path):
+    df = pd.DataFrame({"a": [1, 2], "b": pd.Series([object(), object()])})
+    uploaded_at = datetime.now(timezone.utc)
+
+    try:
+        save_snapshot(df.assign(c=[{"x": 1}, None]), "x.csv", uploaded_at, tmp_path, name="quebrado", tables={"t": None})
+    except Exception:
+        pass
+
+    assert list_snapshots(tmp_path) == []
+    assert not any(p.name.startswith(".tmp_") for p in tmp_path.iterdir())
+
+
+@pytest.fixture()
+def registry(monkeypatch, tmp_path):
+    """
+    Registro de datasets vazio, com snapshots em tmp_path (o registro da sessão volta no final).
+    Testes que usam o dataset da sessão pedem o fixture ds antes deste.
+    """
+    import app.core.storage as storage
+
+    monkeypatch.setattr(storage, "_ENTRIES", OrderedDict())
+    monkeypatch.setattr(storage, "_DEFAULT_ID", None)
+    monkeypatch.setattr(storage, "_SEEN_POINTER", None)
+    monkeypatch.setattr(storage, "SNAPSHOT_DIR", str(tmp_path / "snapshots"))
+    return storage
+
+
+def test_shared_backend_workers_map_the_same_snapshot(ds, registry, monkeypatch):
+    # user-008: o upload publicado por um worker é visto pelos demais (mapeado do mesmo snapshot)
+    monkeypatch.setattr(registry, "STORAGE_BACKEND", "shared")
+
+    published = registry.publish_dataset(ds.df, ds.filename)
+
+    # Outro worker: registro próprio vazio, só o ponteiro em disco em comum
+    monkeypatch.setattr(registry, "_ENTRIES", OrderedDict())
+    monkeypatch.setattr(registry, "_DEFAULT_ID", None)
+    monkeypatch.setattr(registry, "_SEEN_POINTER", None)
+    other = registry.get_dataset()
+
+    assert other is not published
+    assert (other.dataset_id, other.version) == (published.dataset_id, published.version)
+    assert isinstance(other.df["valor_final"].values, np.memmap)
+    # copy() e check_categorical=False: assert_frame_equal compara também a classe dos arrays
+    # (memmap x ndarray), inclusive dos códigos das categóricas; os valores são comparados igual
+    pd.testing.assert_frame_equal(other.df.copy(), ds.df, check_categorical=False)
+    assert registry.list_datasets()[0]["padrao"] is True
+
+
+def test_memory_budget_unloads_least_recent_and_reloads_once(ds, registry, monkeypatch):
+    # user-009: acima do orçamento o dataset menos consultado sai da memória e volta do snapshot
+    monkeypatch.setattr(registry, "DATASET_MEMORY_BUDGET_MB", 1)
+
+    first = registry.publish_dataset(ds.df, "a.csv")
+    second = registry.publish_dataset(ds.df, "b.csv")
+
+    loaded = {d["dataset_id"]: d["em_memoria"] for d in registry.memory_usage()["datasets"]}
+    assert loaded == {first.dataset_id: False, second.dataset_id: True}
+
+    # Requests simultâneas do dataset descarregado esperam uma única recarga
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        states = list(pool.map(lambda _: registry.get_dataset(first.dataset_id), range(8)))
+
+    assert all(state is states[0] for state in states)
+    pd.testing.assert_frame_equal(states[0].df.copy(), ds.df, check_categorical=False)
+    loaded = {d["dataset_id"]: d["em_memoria"] for d in registry.memory_usage()["datasets"]}
+    assert loaded == {first.dataset_id: True, second.dataset_id: False}
+
+
+def test_status_metadata_does_not_reload_an_unloaded_dataset(ds, registry, monkeypatch):
+    # user-009: o status vem do registro e do manifest, sem recarregar o dataset descarregado
+    monkeypatch.setattr(registry, "DATASET_MEMORY_BUDGET_MB", 1)
+
+    first = registry.publish_dataset(ds.df, "a.csv")
+    registry.publish_dataset(ds.df, "b.csv")
+    # Registro recriado a partir dos snapshots (colunas lidas do manifest)
+    monkeypatch.setattr(registry, "_ENTRIES", OrderedDict())
+    monkeypatch.setattr(registry, "_DEFAULT_ID", None)
+    registry.restore_snapshots()
+
+    info = registry.dataset_info(first.dataset_id)
+
+    assert (info["versao"], info["linhas_processadas"]) == (first.version, len(ds.df))
+    assert info["colunas"] == list(ds.df.columns)
+    assert not any(d["em_memoria"] for d in registry.memory_usage()["datasets"])
+    with pytest.raises(registry.DatasetNotFoundError):
+        registry.dataset_info("nao_existe")
+
+
+def test_new_upload_does_not_change_state_held_by_a_request(ds, registry):
+    # user-010: cada upload é uma versão nova; quem já resolveu o DatasetState continua lendo a antiga
+    registry.publish_dataset(ds.df, "a.csv")
+    held = registry.get_dataset()
+
+    newer = registry.publish_dataset(ds.df.iloc[:100], "b.csv")
+
+    assert newer.version > held.version
+    assert registry.get_dataset() is newer
+    assert (held.filename, len(held.df)) == ("a.csv", len(ds.df))
+    assert registry.get_dataset(held.dataset_id) is held
+
+
+def test_pivot_groupings_dropped_on_new_version_and_eviction(ds, registry, monkeypatch):
+    # user-019: os agrupamentos do pivot saem do cache junto com a versão ou o dataset descarregado
+    import app.services.pivot as pivot
+
+    monkeypatch.setattr(pivot, "_GROUPINGS", OrderedDict())
+    monkeypatch.setattr(registry, "DATASET_MEMORY_BUDGET_MB", 1)
+
+    first = registry.publish_dataset(ds.df, "a.csv")
+    pivot._grouping(first, ["categoria"])
+    second = registry.publish_dataset(ds.df, "b.csv")
+    assert not pivot._GROUPINGS
+
+    pivot._grouping(second, ["categoria"])
+    assert [key[0] for key in pivot._GROUPINGS] == [second.dataset_id]
+
+    # Recarregar o primeiro descarrega o segundo (orçamento de 1 MB)
+    registry.get_dataset(first.dataset_id)
+    assert not pivot._GROUPINGS
@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from conftest import upload_csv, wait_job
+
+
+def test_upload_runs_as_background_job(client, baseline_df):
+    # user-002: o upload responde 202 com job_id e o job termina com as linhas processadas
+    job = upload_csv(client)
+
+    assert job["status"] == "sucesso"
+    assert job["stage"] == "concluido"
+    assert job["linhas_processadas"] == len(baseline_df)
+    assert job["resultado"]["linhas_processadas"] == len(baseline_df)
+    assert job["finished_at"] is not None
+
+
+def test_upload_job_reports_validation_error(client, tmp_path):
+    bad = tmp_path / "sem_colunas.csv"
+    bad.write_text("a,b\n1,2\n", encoding="utf-8")
+
+    with open(bad, "rb") as f:
+        response = client.post("/upload", files={"file": ("sem_colunas.csv", f, "text/csv")})
+    assert response.status_code == 202
+    job = wait_job(client, response.json()["acompanhar_em"])
+
+    assert job["status"] == "erro"
+    assert "Colunas ausentes" in job["erro"]
+
+
+def test_upload_rejects_unknown_format(client):
+    response = client.post("/upload", files={"file": ("dados.txt", b"x", "text/plain")})
+    assert response.status_code == 422
+    assert "Formato inválido" in response.json()["detail"]
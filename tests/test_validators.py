@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from app.utils.validators import ID_ENCODINGS_ATTR, concat_frames, encode_prefixed_ids, restore_id_columns
+
+
+def test_id_columns_encode_and_restore(source_df):
+    # user-006: IDs prefixo+número viram inteiros e voltam ao texto original na saída
+    df = source_df[["id_transacao", "cliente_id", "produto_id", "vendedor_id"]].copy()
+    for col in df.columns:
+        df = encode_prefixed_ids(df, col)
+
+    assert set(df.attrs[ID_ENCODINGS_ATTR]) == {"id_transacao", "cliente_id", "produto_id", "vendedor_id"}
+    assert all(pd.api.types.is_integer_dtype(df[col]) for col in df.columns)
+    assert df.attrs[ID_ENCODINGS_ATTR]["cliente_id"] == {"prefix": "CLI", "width": 6}
+
+    restored = restore_id_columns(df)
+    for col in df.columns:
+        assert (restored[col].to_numpy() == source_df[col].to_numpy()).all(), col
+    assert ID_ENCODINGS_ATTR not in restored.attrs
+
+
+def test_id_column_out_of_pattern_stays_text():
+    df = encode_prefixed_ids(pd.DataFrame({"cliente_id": ["CLI000001", "CLI02", "X000003"]}), "cliente_id")
+    assert df["cliente_id"].tolist() == ["CLI000001", "CLI02", "X000003"]
+    assert ID_ENCODINGS_ATTR not in df.attrs
+
+
+def test_concat_keeps_encoding_only_when_parts_agree():
+    a = encode_prefixed_ids(pd.DataFrame({"produto_id": ["PRD001", "PRD002"]}), "produto_id")
+    b = encode_prefixed_ids(pd.DataFrame({"produto_id": ["PRD0003"]}), "produto_id")
+
+    df = concat_frames([a, b])
+
+    assert restore_id_columns(df)["produto_id"].tolist() == ["PRD001", "PRD002", "PRD0003"]